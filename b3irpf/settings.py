@@ -49,7 +49,7 @@ DEBUG = env('DEBUG')
 ALLOWED_HOSTS = env.list("ALLOWED_HOSTS", default=["*"])
 
 # verão do projeto
-IRPF_VERSION = '1.0.0'
+IRPF_VERSION = '1.1.0'
 
 XADMIN_TITLE = "B3 - IRPF"
 XADMIN_FOOTER_TITLE = f'irpf - v{IRPF_VERSION}'
@@ -84,6 +84,8 @@ TICKER_VALIDATOR = "irpf.utils.ticker_validator"
 
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend', # this is default
+    # permissões de objeto do dono do registro (sem consulta ao guardian)
+    'irpf.backends.OwnerPermissionBackend',
     'guardian.backends.ObjectPermissionBackend',
 ]
 
@@ -152,6 +154,14 @@ DATABASES = {
     'default': env.db(default=f"sqlite:////{BASE_DIR / 'irpf.sqlite3'}")
 }
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/ref/settings/#caches
+# 'reports': relatórios mensais já calculados (persistente e compartilhado entre processos)
+CACHES = {
+    'default': env.cache(default="locmemcache://"),
+    'reports': env.cache('REPORTS_CACHE_URL', default=f"filecache://{BASE_DIR / 'cache' / 'reports'}")
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -201,3 +211,20 @@ STATICFILES_STORAGE = "django.contrib.staticfiles.storage.ManifestStaticFilesSto
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # perfil de geração dos relatórios (debug 'ts')
+        'irpf.report': {
+            'handlers': ['console'],
+            'level': env.str('IRPF_REPORT_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
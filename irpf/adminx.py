@@ -12,7 +12,7 @@ from xadmin.models import Log
 from irpf import permissions
 from irpf.models import Asset, Negotiation, Earnings, Position, Institution, Bonus, Bookkeeping, \
 	BrokerageNote, AssetEvent, FoundsAdministrator, Taxes, Subscription, BonusInfo, TaxRate, DayTrade, \
-	SwingTrade, AssetConvert, AssetRefund
+	SwingTrade, AssetConvert, AssetRefund, ImportJob
 from irpf.plugins import ListActionModelPlugin, GuardianAdminPlugin, AssignUserAdminPlugin, \
 	ReportSavePositionAdminPlugin, \
 	ReportStatsAdminPlugin, BrokerageNoteAdminPlugin, BreadcrumbMonthsAdminPlugin
@@ -20,8 +20,8 @@ from irpf.report.earnings import EarningsReportMonth
 from irpf.report.negotiation import NegotiationReportMonth
 from irpf.themes import themes
 from irpf.utils import MonthYearDates
-from irpf.views.import_list import AdminImportListModelView
-from irpf.views.report_irpf import ReportIRPFFAdminView
+from irpf.views.import_list import AdminImportListModelView, AdminImportBrokerageNoteView
+from irpf.views.report_irpf import ReportIRPFFAdminView, ReportEarningsItemsAdminView
 from irpf.views.xlsx_viewer import AdminXlsxViewer
 from irpf.widgets import MonthYearField, MonthYearWidget
 from moneyfield import MoneyModelForm
@@ -29,7 +29,10 @@ from xadmin import sites, site
 from xadmin.adminx import LogAdmin
 from xadmin.views import ListAdminView, ModelFormAdminView, BaseAdminView, ModelAdminView, CommAdminView
 
+site.register_view("^irpf/import/(?P<model_app_label>irpf\\.brokeragenote)/$", AdminImportBrokerageNoteView,
+                   "import_brokeragenote")
 site.register_view("^irpf/import/(?P<model_app_label>.+)/$", AdminImportListModelView, "import_listmodel")
+site.register_view("^irpf/report-items/earnings/$", ReportEarningsItemsAdminView, "reportirpf_earnings_items")
 site.register_view("^irpf/report/(?P<model_app_label>.+)/$", ReportIRPFFAdminView, "reportirpf")
 site.register_view("^irpf/xlsx/viewer", AdminXlsxViewer, "xlsx_viewer")
 
@@ -166,7 +169,7 @@ class TaxRateAdmin(BaseIRPFAdmin):
 class AssetAdmin:
 	model_icon = "fa fa-coffee"
 	list_filter = ("category", "bookkeeping")
-	search_fields = ("code", "name", "cnpj", "administrator__name")
+	search_fields = ("code", "name", "cnpj", "cnpj_digits", "administrator__name")
 	list_display = (
 		'code',
 		'category',
@@ -235,6 +238,35 @@ class PositionAdmin(BaseIRPFAdmin):
 	asset_name.short_description = _get_field_opts("name", Asset).verbose_name
 
 
+@sites.register(ImportJob)
+class ImportJobAdmin(BaseIRPFAdmin):
+	model_icon = "fa fa-upload"
+	list_filter = ("status", "model", "created")
+	list_display = (
+		'created',
+		'model',
+		'status',
+		'read',
+		'inserted',
+		'skipped',
+		'errors',
+		'finished'
+	)
+	readonly_fields = (
+		'filestream',
+		'model',
+		'status',
+		'created',
+		'started',
+		'finished',
+		'read',
+		'inserted',
+		'skipped',
+		'errors',
+		'message'
+	)
+
+
 class NegotiationInline(BaseHorizontalInline):
 	form = MoneyModelForm
 	model = Negotiation
@@ -245,6 +277,9 @@ class NegotiationInline(BaseHorizontalInline):
 @sites.register(BrokerageNote)
 class BrokerageNoteAdmin(BaseIRPFAdmin):
 	model_icon = "fa fa-book"
+	# importação em massa (vários pdfs ou zip)
+	list_action_activate = True
+	list_action_report = False
 	fields = ('note',)
 	list_display = (
 		'reference_id',
@@ -258,20 +293,7 @@ class BrokerageNoteAdmin(BaseIRPFAdmin):
 		'institution',
 		'reference_date'
 	)
-	brokerage_note_field_update = [
-		'reference_id',
-		'reference_date',
-		'settlement_fee',
-		'registration_fee',
-		'term_fee',
-		'ana_fee',
-		'emoluments',
-		'operational_fee',
-		'execution',
-		'custody_fee',
-		'taxes',
-		'others'
-	]
+	brokerage_note_field_update = list(BrokerageNote.note_fields)
 	inlines = [NegotiationInline]
 
 	def negotiation_count(self, instance):
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete
 
 
 class IrpfConfig(AppConfig):
@@ -7,7 +8,13 @@ class IrpfConfig(AppConfig):
 	name = 'irpf'
 
 	def ready(self):
-		from irpf.models import DayTrade, SwingTrade
+		from irpf.models import DayTrade, SwingTrade, ReportDirtyModelMixin
 
 		DayTrade.setup_defaults()
 		SwingTrade.setup_defaults()
+
+		# remoções em lote (queryset.delete) e em cascata não passam pelo 'delete' do modelo
+		for model in self.get_models():
+			if issubclass(model, ReportDirtyModelMixin):
+				post_delete.connect(ReportDirtyModelMixin.report_dirty_post_delete, sender=model,
+				                    dispatch_uid=f"report_dirty_{model._meta.label_lower}")
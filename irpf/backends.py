@@ -0,0 +1,22 @@
+from irpf.permissions import is_owner
+
+
+class OwnerPermissionBackend:
+	"""Permissões de objeto pelo dono do registro (campo 'user' de BaseIRPFModel).
+	O dono tem sobre o objeto as mesmas permissões que possui no modelo, sem registros do guardian.
+	As permissões do guardian ficam somente para objetos compartilhados com outros usuários.
+	"""
+
+	def authenticate(self, request, **credentials):
+		return None
+
+	def has_perm(self, user_obj, perm, obj=None):
+		if obj is None or not user_obj.is_active or not is_owner(obj, user_obj):
+			return False
+		# permissão de modelo (ModelBackend)
+		return user_obj.has_perm(perm)
+
+	def get_all_permissions(self, user_obj, obj=None):
+		if obj is None or not user_obj.is_active or not is_owner(obj, user_obj):
+			return set()
+		return user_obj.get_all_permissions()
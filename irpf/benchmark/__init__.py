@@ -0,0 +1 @@
+"""Ferramentas de medição de desempenho (relatórios e importação)"""
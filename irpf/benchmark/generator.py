@@ -0,0 +1,235 @@
+import datetime
+import random
+import string
+from decimal import Decimal
+
+from openpyxl import Workbook
+
+from irpf.models import Asset, Institution, Negotiation, Earnings, Bonus, Subscription, AssetEvent, AssetConvert, \
+	AssetRefund
+
+
+class PortfolioGenerator:
+	"""Gera uma carteira sintética (determinística pela 'seed') para medições de desempenho.
+	tickers: número de ativos
+	trades: negociações por ativo em cada ano
+	"""
+	asset_model = Asset
+	institution_model = Institution
+	negotiation_model = Negotiation
+	earnings_model = Earnings
+	bonus_model = Bonus
+	subscription_model = Subscription
+	event_model = AssetEvent
+	asset_convert_model = AssetConvert
+	refund_model = AssetRefund
+
+	institution_name = "BENCHMARK CORRETORA DE VALORES S.A."
+
+	def __init__(self, user, tickers: int = 50, trades: int = 24, years: tuple = (), seed: int = 1,
+	             splits: int = 2, bonus: int = 2, subscriptions: int = 2, conversions: int = 1,
+	             refunds: int = 2, code_prefix: str = "B"):
+		self.user = user
+		self.code_prefix = code_prefix
+		self.tickers = tickers
+		self.trades = trades
+		self.years = years or (datetime.date.today().year - 1,)
+		self.random = random.Random(seed)
+		self.splits = splits
+		self.bonus = bonus
+		self.subscriptions = subscriptions
+		self.conversions = conversions
+		self.refunds = refunds
+		self.institution = None
+		self.assets = []
+		self.negotiations = []
+		self.stats = {}
+
+	def get_code(self, index: int) -> str:
+		"""Código com 4 letras (prefixo + índice em base 26)"""
+		letters = []
+		for _ in range(3):
+			index, rest = divmod(index, 26)
+			letters.append(string.ascii_uppercase[rest])
+		return self.code_prefix + "".join(reversed(letters))
+
+	def get_dates(self, year: int, count: int) -> list:
+		"""Datas (dias úteis) ordenadas dentro do ano"""
+		dates = []
+		start_date = datetime.date(year, 1, 2)
+		while len(dates) < count:
+			date = start_date + datetime.timedelta(days=self.random.randrange(360))
+			if date.weekday() < 5:
+				dates.append(date)
+		return sorted(dates)
+
+	def create_assets(self):
+		assets = []
+		for index in range(self.tickers):
+			code = self.get_code(index)
+			if index % 3 == 2:
+				code, category = code + "11", self.asset_model.CATEGORY_FII
+			else:
+				code, category = code + "3", self.asset_model.CATEGORY_STOCK
+			assets.append(self.asset_model(code=code,
+			                               name=f"BENCHMARK {code}",
+			                               cnpj=f"{self.code_prefix}{index:07d}/0001-00",
+			                               category=category))
+		self.asset_model.objects.bulk_create(assets)
+		self.assets = list(self.asset_model.objects.filter(
+			code__in=[asset.code for asset in assets]
+		).order_by('pk'))
+		self.institution, _ = self.institution_model.objects.get_or_create(
+			name=self.institution_name,
+			cnpj="00.000.000/0001-00")
+		return self.assets
+
+	def _negotiation(self, asset, date, kind, quantity, price, **options):
+		total = quantity * price
+		return self.negotiation_model(user=self.user,
+		                              date=date,
+		                              kind=kind,
+		                              institution_name=self.institution.name,
+		                              code=asset.code,
+		                              asset=asset,
+		                              quantity=quantity,
+		                              price=price,
+		                              total=total,
+		                              tax=(total * Decimal("0.0003")).quantize(Decimal("0.01")),
+		                              **options)
+
+	def create_negotiations(self, converted: dict):
+		"""Compras e vendas (vendas nunca superam a posição)"""
+		for asset in self.assets:
+			price, position = Decimal(self.random.randint(500, 15000)) / 100, 0
+			for year in self.years:
+				for date in self.get_dates(year, self.trades):
+					if (convert_date := converted.get(asset.code)) and date >= convert_date:
+						break
+					price *= Decimal(self.random.uniform(0.9, 1.1))
+					price = max(Decimal("0.50"), price.quantize(Decimal("0.01")))
+					if position > 1 and self.random.random() < 0.3:
+						kind, quantity = self.negotiation_model.KIND_SELL, self.random.randint(1, position // 2)
+						position -= quantity
+					else:
+						kind, quantity = self.negotiation_model.KIND_BUY, self.random.randint(1, 100)
+						position += quantity
+					self.negotiations.append(self._negotiation(asset, date, kind, Decimal(quantity), price))
+		self.negotiation_model.objects.bulk_create(self.negotiations, batch_size=1000)
+		return self.negotiations
+
+	def create_earnings(self):
+		earnings = []
+		for asset in self.assets:
+			for year in self.years:
+				months = range(1, 13) if asset.category == self.asset_model.CATEGORY_FII else (3, 6, 9, 12)
+				for month in months:
+					quantity = Decimal(self.random.randint(1, 200))
+					earnings.append(self.earnings_model(
+						user=self.user,
+						date=datetime.date(year, month, 15),
+						flow=self.earnings_model.FLOW_CREDIT,
+						kind="Rendimento" if asset.category == self.asset_model.CATEGORY_FII else "Dividendo",
+						code=asset.code,
+						name=asset.name,
+						asset=asset,
+						institution_name=self.institution.name,
+						quantity=quantity,
+						total=quantity * Decimal("0.05")))
+		self.earnings_model.objects.bulk_create(earnings, batch_size=1000)
+		return earnings
+
+	def create_events(self):
+		"""Desdobramentos, bonificações, subscrições e restituições em ativos aleatórios"""
+		events, bonus, refunds = [], [], []
+		for year in self.years:
+			for asset in self.random.sample(self.assets, min(self.splits, len(self.assets))):
+				date_com, = self.get_dates(year, 1)
+				events.append(self.event_model(user=self.user, asset=asset, date=date_com, date_com=date_com,
+				                               factor_from=1, factor_to=2, event=self.event_model.SPLIT))
+			for asset in self.random.sample(self.assets, min(self.bonus, len(self.assets))):
+				date_com, = self.get_dates(year, 1)
+				bonus.append(self.bonus_model(user=self.user, asset=asset, date_com=date_com,
+				                              date_ex=date_com + datetime.timedelta(days=1),
+				                              date=date_com + datetime.timedelta(days=20),
+				                              base_value=Decimal("10.00"), proportion=Decimal(10)))
+			for asset in self.random.sample(self.assets, min(self.refunds, len(self.assets))):
+				date, = self.get_dates(year, 1)
+				refunds.append(self.refund_model(user=self.user, asset=asset, date=date, value=Decimal("0.10")))
+			for asset in self.random.sample(self.assets, min(self.subscriptions, len(self.assets))):
+				self.create_subscription(asset, *self.get_dates(year, 1))
+		self.event_model.objects.bulk_create(events)
+		self.bonus_model.objects.bulk_create(bonus)
+		self.refund_model.objects.bulk_create(refunds)
+
+	def create_subscription(self, asset, date: datetime.date):
+		"""Recibo de subscrição negociado antes da data de incorporação"""
+		code = asset.code.rstrip("0123456789") + "12"
+		receipt, _ = self.asset_model.objects.get_or_create(
+			code=code,
+			defaults={'name': f"BENCHMARK {code}",
+			          'cnpj': asset.cnpj,
+			          'category': self.asset_model.CATEGORY_STOCK_SUBSCRIPTION})
+		subscription = self.subscription_model.objects.create(
+			user=self.user,
+			asset=asset,
+			created=date,
+			date=date + datetime.timedelta(days=30))
+		negotiation = self._negotiation(receipt, date, self.negotiation_model.KIND_BUY,
+		                                Decimal(self.random.randint(1, 50)), Decimal("10.00"),
+		                                subscription=subscription)
+		negotiation.save()
+		return subscription
+
+	def get_conversions(self) -> dict:
+		"""Ativos convertidos no fim do último ano (não são mais negociados depois disso)"""
+		converted = {}
+		if (count := min(self.conversions, len(self.assets) // 2)) <= 0:
+			return converted
+		date = datetime.date(self.years[-1], 12, 15)
+		for origin, target in zip(self.assets[-count:], self.assets[:count]):
+			converted[origin.code] = (origin, target, date)
+		return converted
+
+	def generate(self) -> dict:
+		"""Cria todos os registros da carteira"""
+		self.create_assets()
+		conversions = self.get_conversions()
+		self.create_negotiations({code: date for code, (_, _, date) in conversions.items()})
+		earnings = self.create_earnings()
+		self.create_events()
+		self.asset_convert_model.objects.bulk_create([
+			self.asset_convert_model(user=self.user, origin=origin, target=target, date=date)
+			for origin, target, date in conversions.values()
+		])
+		self.stats = {
+			'tickers': len(self.assets),
+			'negotiations': len(self.negotiations),
+			'earnings': len(earnings),
+			'years': list(self.years)
+		}
+		return self.stats
+
+	def write_negotiation_xlsx(self, filepath):
+		"""Planilha de negociações no formato de importação (cabeçalhos 'sheet_header')"""
+		opts = self.negotiation_model._meta
+		fields = ['date', 'kind', 'institution_name', 'code', 'quantity', 'price', 'total']
+		headers = []
+		for name in fields:
+			field = opts.get_field(name)
+			headers.append(getattr(field, 'amount_field', field).sheet_header)
+		wb = Workbook()
+		ws = wb.active
+		ws.append(headers)
+		for negotiation in self.negotiations:
+			ws.append([
+				negotiation.date.strftime("%d/%m/%Y"),
+				negotiation.kind,
+				negotiation.institution_name,
+				negotiation.code,
+				int(negotiation.quantity),
+				float(negotiation.price),
+				float(negotiation.total)
+			])
+		wb.save(filepath)
+		return filepath
@@ -3,6 +3,7 @@ import io
 from correpy.parsers.brokerage_notes.b3_parser.b3_parser import B3Parser
 from correpy.parsers.brokerage_notes.nuinvest_parser.nuinvest import NuInvestParser
 from irpf.models import BrokerageNote
+from irpf.notes import ParsedNotesCache, get_digest
 
 
 def init(migration):
@@ -14,7 +15,8 @@ def init(migration):
 		'62169875000179': NuInvestParser
 	}
 
-	for brokerage_note in BrokerageNote.objects.all():
+	cache = ParsedNotesCache()
+	for brokerage_note in BrokerageNote.objects.select_related('institution'):
 		try:
 			b3parser = brokerage_note_parsers[brokerage_note.institution.cnpj_nums]
 		except KeyError:
@@ -22,9 +24,11 @@ def init(migration):
 		try:
 			print(f"Extraindo dados da nota '{brokerage_note.note.name}'...")
 			with brokerage_note.note.file as note_file:
-				parser = b3parser(brokerage_note=io.BytesIO(note_file.read()))
+				content = note_file.read()
+				parser = b3parser(brokerage_note=io.BytesIO(content))
 				has_changed = False
-				for note in parser.parse_brokerage_note():
+				# análise do pdf guardada pelo sha256 do arquivo
+				for note in cache.parse(get_digest(content), parser):
 					brokerage_note.reference_id = note.reference_id
 					if brokerage_note.reference_id:
 						has_changed = True
@@ -0,0 +1,69 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Cast
+from guardian.utils import get_user_obj_perms_model
+
+from irpf.models import Negotiation, Earnings, Institution, Asset, Bookkeeping, FoundsAdministrator
+from irpf.permissions import permission_models, is_owner_model
+from irpf.utils import get_numbers
+
+
+def remove_owner_permissions():
+	"""Remove as permissões de objeto (guardian) dos donos dos registros.
+	Essas permissões passam a ser dadas pelo backend 'OwnerPermissionBackend'.
+	"""
+	for model in permission_models:
+		if not is_owner_model(model):
+			continue
+		perms_model = get_user_obj_perms_model(model)
+		ctype = ContentType.objects.get_for_model(model)
+		owner = model.objects.filter(
+			pk=Cast(OuterRef('object_pk'), output_field=models.BigIntegerField()),
+			user_id=OuterRef('user_id')
+		)
+		count, _ = perms_model.objects.filter(Exists(owner), content_type=ctype).delete()
+		print(f"{model._meta.verbose_name_plural}: {count} permissões removidas")
+
+
+def update_fingerprints(batch_size=1000):
+	"""Preenche a impressão digital dos registros existentes.
+	Duplicatas (mesma chave natural) ficam sem a impressão digital (índice único).
+	"""
+	for model in (Negotiation, Earnings):
+		keys = set(model.objects.filter(fingerprint__isnull=False).values_list('fingerprint', flat=True))
+		queryset = model.objects.filter(fingerprint__isnull=True).order_by('pk')
+		instances, duplicates = [], 0
+		for instance in queryset.iterator(chunk_size=batch_size):
+			fingerprint = instance.get_fingerprint()
+			if fingerprint in keys:
+				duplicates += 1
+				continue
+			keys.add(fingerprint)
+			instance.fingerprint = fingerprint
+			instances.append(instance)
+		model.objects.bulk_update(instances, ['fingerprint'], batch_size=batch_size)
+		print(f"{model._meta.verbose_name_plural}: {len(instances)} atualizados ({duplicates} duplicados)")
+
+
+def update_cnpj_digits(batch_size=1000):
+	"""Preenche a coluna (indexada) com os números do cnpj"""
+	for model in (Institution, Asset, Bookkeeping, FoundsAdministrator):
+		instances = []
+		for instance in model.objects.filter(cnpj_digits="").only('pk', 'cnpj').iterator(chunk_size=batch_size):
+			if digits := get_numbers(instance.cnpj or ""):
+				instance.cnpj_digits = digits
+				instances.append(instance)
+		model.objects.bulk_update(instances, ['cnpj_digits'], batch_size=batch_size)
+		print(f"{model._meta.verbose_name_plural}: {len(instances)} cnpjs atualizados")
+
+
+def init(migration):
+	"""
+	* Permissões de objeto pelo dono do registro
+	* Impressão digital (deduplicação) de negociações e proventos
+	* Números do cnpj (busca indexada) de corretoras, ativos, escrituradores e administradores
+	"""
+	remove_owner_permissions()
+	update_fingerprints()
+	update_cnpj_digits()
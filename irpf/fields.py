@@ -8,6 +8,7 @@ import moneyfield.fields
 from django.db import models
 
 from correpy.domain.entities.security import BDR_TICKER_PATTERN
+from irpf.utils import get_numbers
 
 
 class MoneyField(moneyfield.MoneyField):
@@ -82,6 +83,28 @@ class CharCodeNameField(models.CharField):
 		return value
 
 
+class DigitsField(models.CharField):
+	"""Somente os números do campo 'source' (atualizado ao salvar o registro).
+	Permite buscas indexadas por valores com formatação variável (ex.: cnpj).
+	"""
+	def __init__(self, *args, source: str = None, **kwargs):
+		self.source = source
+		kwargs.setdefault('editable', False)
+		kwargs.setdefault('blank', True)
+		kwargs.setdefault('default', "")
+		super().__init__(*args, **kwargs)
+
+	def deconstruct(self):
+		name, path, args, kwargs = super().deconstruct()
+		kwargs['source'] = self.source
+		return name, path, args, kwargs
+
+	def pre_save(self, model_instance, add):
+		value = get_numbers(getattr(model_instance, self.source) or "")
+		setattr(model_instance, self.attname, value)
+		return value
+
+
 class DateNoneField(DateField):
 
 	@staticmethod
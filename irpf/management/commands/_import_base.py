@@ -1,12 +1,16 @@
 import argparse
+import functools
+import itertools
+from decimal import Decimal
 
-from django.contrib.auth import get_user_model, get_permission_codename
+from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
+from django.db.backends.utils import format_number
 from django.db.transaction import atomic
-from guardian.shortcuts import assign_perm
 from openpyxl import load_workbook
-from irpf.permissions import permission_models
+from irpf.models import Asset, ReportDirtyMonth, ReportDirtyModelMixin, ImportLock
+from irpf.report.cache import AssetCatalog
 
 User = get_user_model()
 
@@ -30,14 +34,26 @@ class UserType:
 
 class Command(BaseCommand):
 	help = """imports data from the xlsx file with information on the earnings."""
-	permission_models = permission_models
 	storage_model = None
 	storage_opts = None
+	asset_model = Asset
+	dirty_model = ReportDirtyMonth
+	lock_model = ImportLock
+	# leitura em fluxo (memória limitada independente do tamanho do arquivo)
+	read_only = True
+	# linhas gravadas por vez (uma consulta de registros existentes por lote)
+	batch_size = 1000
+	# mensagens de erro guardadas (as demais linhas com erro são somente contadas)
+	max_errors = 20
+	# valores convertidos guardados por coluna (códigos, nomes, datas, etc.)
+	memoize_size = 4096
 
 	def add_arguments(self, parser):
 		parser.add_argument("--filepath", type=argparse.FileType('rb'), required=True)
 		parser.add_argument("--user", type=UserType(User.objects.filter(is_active=True)),
 		                    required=True)
+		parser.add_argument("--no-read-only", dest="read_only", action="store_false",
+		                    help="carrega toda a planilha na memória")
 
 	def get_fields_map(self):
 		fields = {}
@@ -46,62 +62,185 @@ class Command(BaseCommand):
 				fields.setdefault(field.sheet_header, []).append(field)
 		return fields
 
-	def _assign_perm(self, instance, user):
-		"""Adiciona permissões padrão para a instância x usuário"""
-		for name in self.permission_models[self.storage_model]:
-			permission_codename = get_permission_codename(name, self.storage_opts)
-			assign_perm(permission_codename, user, instance)
+	def setup(self, progress=None):
+		self.asset_catalog = AssetCatalog(self.asset_model)
+		# impressões digitais já vistas no arquivo (linhas duplicadas)
+		self.keys = set()
+		self.counters = {'read': 0, 'inserted': 0, 'skipped': 0, 'errors': 0}
+		self.errors = []
+		# menor data afetada pela importação (memória constante independente do tamanho do arquivo)
+		self.dirty_date = None
+		# função chamada com os contadores após a gravação de cada lote
+		self.progress = progress
+
+	def add_error(self, sheet_name: str, line: int, exc: Exception):
+		self.counters['errors'] += 1
+		if len(self.errors) < self.max_errors:
+			message = "; ".join(getattr(exc, 'messages', [str(exc)]))
+			self.errors.append(f"{sheet_name} (linha {line}): {message}")
+
+	def get_converter(self, field):
+		"""Conversão (planilha -> python) dos valores de uma coluna (como seriam gravados)"""
+		convert_value = self.storage_model.import_convert_value
+		to_python, name = field.to_python, field.name
+
+		if field.get_internal_type() == "DecimalField":
+			max_digits, decimal_places = field.max_digits, field.decimal_places
+
+			def convert(value):
+				value = to_python(convert_value(name, value))
+				if isinstance(value, Decimal):
+					# mesmo arredondamento do banco de dados (valor gravado)
+					value = Decimal(format_number(value, max_digits, decimal_places))
+				return value
+			return convert
+
+		def convert(value):
+			return to_python(convert_value(name, value))
+		# valores que se repetem (códigos, nomes, datas) são convertidos uma vez
+		return functools.lru_cache(maxsize=self.memoize_size, typed=True)(convert)
+
+	def compile_converters(self, columns: list) -> tuple:
+		"""Plano de conversão da planilha: [(índice da coluna, campo, conversão)] e valores padrão
+		dos campos decimais ausentes.
+		"""
+		converters = [(index, field.name, self.get_converter(field))
+		              for index, header_fields in columns
+		              for field in header_fields]
+		names = {name for _, name, _ in converters}
+		defaults = {name: self.storage_model.import_convert_value(name, None)
+		            for name in self.storage_model.import_decimal_fields
+		            if name not in names}
+		return converters, defaults
+
+	def get_asset_getter(self):
+		"""Ativo pelo código (convertido) com memorização"""
+		ticker_field = self.storage_model.import_ticker_field
+		get_ticker = self.storage_model.import_get_ticker
+
+		@functools.lru_cache(maxsize=self.memoize_size)
+		def get_asset(code):
+			return self.asset_catalog.get(get_ticker({ticker_field: code}))
+		return get_asset
 
 	@atomic
-	def save_instance(self, **data):
-		if hasattr(self.storage_model, "import_before_save_data"):
-			data = self.storage_model.import_before_save_data(**data)
-		instance, created = self.storage_model.objects.get_or_create(**data)
-		if created:
-			self._assign_perm(instance, instance.user)
+	def save_batch(self, rows: list):
+		"""Grava somente as linhas novas do lote (as impressões digitais existentes são ignoradas)"""
+		# lotes de importações simultâneas do usuário são serializados (até o fim da transação): a consulta das
+		# impressões digitais existentes e a gravação são atômicas e os contadores refletem o banco de dados
+		self.lock_model.acquire(rows[0]['user'])
+		instances = {}
+		for data in rows:
+			instance = self.storage_model(**data)
+			instance.fingerprint = instance.get_fingerprint()
+			if instance.fingerprint in self.keys or instance.fingerprint in instances:
+				self.counters['skipped'] += 1
+				continue
+			instances[instance.fingerprint] = instance
+		existing = self.get_existing_keys(set(instances))
+		self.counters['skipped'] += len(existing)
+		instances = [instance for key, instance in instances.items() if key not in existing]
+		self.keys.update(existing)
+		self.keys.update(instance.fingerprint for instance in instances)
+		# conflitos com registros gravados fora da importação (formulário) ainda são ignorados pelo índice
+		# único; nesse caso raro (sem bloqueio) o contador 'inserted' é um limite superior.
+		self.storage_model.objects.bulk_create(instances, batch_size=self.batch_size, ignore_conflicts=True)
+		self.counters['inserted'] += len(instances)
+		# o bulk_create não passa pelo 'save' do modelo
+		if issubclass(self.storage_model, ReportDirtyModelMixin):
+			self.add_dirty_dates([getattr(instance, name)
+			                      for instance in instances
+			                      for name in self.storage_model.report_dirty_fields])
+
+	def add_dirty_dates(self, dates: list):
+		"""Mantém somente a menor data afetada (registrada no fim da importação)"""
+		if dates := self.storage_model.get_report_dirty_months(dates):
+			date = min(dates)
+			if self.dirty_date is None or date < self.dirty_date:
+				self.dirty_date = date
 
 	def process_sheet(self, ws, options):
 		verbosity, level = options.get('verbosity', 0), 2
 		if verbosity > level:
 			print("SHEET ", ws.title)
 
-		rows = ws.iter_rows()
+		# somente os valores das células (sem os objetos 'cell')
+		rows = ws.iter_rows(values_only=True)
 
-		headers = []
-		for cell in next(rows):
-			headers.append(cell.value)
+		try:
+			headers = list(next(rows))
+		except StopIteration:
+			return
 
 		if verbosity > level:
-			print(" / ".join(headers))
+			print(" / ".join(map(str, headers)))
 
 		fields = self.get_fields_map()
+		# colunas importadas (índice, campos)
+		columns = [(index, fields[header]) for index, header in enumerate(headers) if header in fields]
+		converters, defaults = self.compile_converters(columns)
+		ticker_field = self.storage_model.import_ticker_field
+		get_asset = self.get_asset_getter()
+		verbose = verbosity > level
 		user = options['user']
-		for row in rows:
-			cells = []
-			data = {'user': user}
-			for index, cell in enumerate(row):
+
+		def read_rows():
+			# a primeira linha é o cabeçalho
+			for line, row in enumerate(rows, start=2):
+				# no modo de leitura em fluxo a dimensão da planilha pode incluir linhas vazias
+				if not any(value is not None for value in row):
+					continue
+				if verbose:
+					print(" / ".join(map(str, row)))
+				self.counters['read'] += 1
+				data = dict(defaults, user=user)
+				size = len(row)
 				try:
-					header_fields = fields[headers[index]]
-				except KeyError:
+					for index, name, convert in converters:
+						if index >= size:
+							break
+						data[name] = convert(row[index])
+				except (ValidationError, ValueError, ArithmeticError, TypeError) as exc:
+					self.add_error(ws.title, line, exc)
 					continue
-				for field in header_fields:
-					data[field.name] = cell.value
-				cells.append(str(cell.value))
-			if verbosity > level:
-				print(" / ".join(cells))
-			self.save_instance(**data)
+				if data.get(ticker_field) and (asset := get_asset(data[ticker_field])):
+					data['asset'] = asset
+				yield data
+
+		data_rows = read_rows()
+		while batch := list(itertools.islice(data_rows, self.batch_size)):
+			self.save_batch(batch)
+			if self.progress:
+				self.progress(self.counters)
+
+	def process_workbook(self, wb, options):
+		"""Importa todas as planilhas (uma transação por lote).
+		Uma importação interrompida pode ser repetida: as linhas já gravadas são ignoradas.
+		"""
+		try:
+			for sheet_name in wb.sheetnames:
+				self.process_sheet(wb[sheet_name], options)
+		finally:
+			if self.dirty_date is not None:
+				self.dirty_model.register(options['user'].pk, [self.dirty_date],
+				                          position=self.storage_model.report_dirty_position)
 
 	def handle(self, *args, **options):
 		wb = None
+		self.setup(progress=options.get('progress'))
 		with options['filepath'] as filepath:
 			try:
 				wb = load_workbook(
 					filename=filepath,
+					read_only=options.get('read_only', self.read_only),
 					data_only=True
 				)
-
-				for sheet_name in wb.sheetnames:
-					self.process_sheet(wb[sheet_name], options)
+				self.process_workbook(wb, options)
 			finally:
 				if wb:
 					wb.close()
+		if options.get('verbosity', 0) > 0:
+			self.stdout.write(" / ".join(f"{name}: {count}" for name, count in self.counters.items()))
+			for message in self.errors:
+				self.stderr.write(message)
+		return None
@@ -0,0 +1,174 @@
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from irpf.benchmark.generator import PortfolioGenerator
+from irpf.management.commands.import_negotiation import Command as ImportNegotiationCommand
+from irpf.models import Negotiation, Earnings, Position
+from irpf.permissions import permission_models
+from irpf.plugins import ReportSavePositionAdminPlugin
+from irpf.report.earnings import EarningsReportMonth
+from irpf.report.negotiation import NegotiationReportMonth
+from irpf.report.stats import StatsReports
+from irpf.utils import MonthYearDates
+
+User = get_user_model()
+
+# caches na memória (o cache 'reports' padrão é persistente e compartilhado com o banco de dados real)
+BENCHMARK_CACHES = {
+	'default': {'BACKEND': "django.core.cache.backends.locmem.LocMemCache", 'LOCATION': "benchmark"},
+	'reports': {'BACKEND': "django.core.cache.backends.locmem.LocMemCache", 'LOCATION': "benchmark-reports"},
+}
+
+
+class PositionSavePlugin(ReportSavePositionAdminPlugin):
+	"""Salvamento de posições fora de uma requisição (sem a view de relatório)"""
+	guardian_permissions_models = permission_models
+
+	def __init__(self, user):
+		self.user = user
+		self.request = RequestFactory().post('/')
+		self.request.user = user
+		self.request._messages = CookieStorage(self.request)
+		self._caches = {}
+
+
+class Command(BaseCommand):
+	help = """Mede o tempo (e consultas) dos relatórios e da importação com uma carteira sintética.
+	Usa um banco de dados de teste descartável e grava os resultados em JSON."""
+
+	def add_arguments(self, parser):
+		parser.add_argument("--tickers", type=int, default=50)
+		parser.add_argument("--trades", type=int, default=24, help="negociações por ativo em cada ano")
+		parser.add_argument("--years", type=int, default=2)
+		parser.add_argument("--seed", type=int, default=1)
+		parser.add_argument("--splits", type=int, default=2)
+		parser.add_argument("--bonus", type=int, default=2)
+		parser.add_argument("--subscriptions", type=int, default=2)
+		parser.add_argument("--conversions", type=int, default=1)
+		parser.add_argument("--refunds", type=int, default=2)
+		parser.add_argument("--repeat", type=int, default=3, help="melhor tempo de N execuções")
+		parser.add_argument("--output", type=Path, default=None,
+		                    help="arquivo JSON (padrão: benchmark-<data>.json)")
+
+	@staticmethod
+	def get_revision() -> str:
+		try:
+			return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+			                               cwd=settings.BASE_DIR, text=True,
+			                               stderr=subprocess.DEVNULL).strip()
+		except (OSError, subprocess.CalledProcessError):
+			return ""
+
+	def measure(self, func, repeat: int = 1, setup=None) -> dict:
+		"""Melhor tempo (segundos) e número de consultas da função"""
+		timings, queries = [], 0
+		for _ in range(repeat):
+			if setup is not None:
+				setup()
+			with CaptureQueriesContext(connection) as context:
+				start = time.perf_counter()
+				func()
+				timings.append(time.perf_counter() - start)
+			queries = len(context.captured_queries)
+		return {'seconds': round(min(timings), 6), 'queries': queries, 'runs': len(timings)}
+
+	def run_benchmarks(self, **options) -> dict:
+		user = User.objects.create_superuser("benchmark", "benchmark@localhost", "benchmark")
+		generator = PortfolioGenerator(
+			user,
+			tickers=options['tickers'],
+			trades=options['trades'],
+			years=tuple(range(timezone.now().year - options['years'], timezone.now().year)),
+			seed=options['seed'],
+			splits=options['splits'],
+			bonus=options['bonus'],
+			subscriptions=options['subscriptions'],
+			conversions=options['conversions'],
+			refunds=options['refunds'])
+		results = {}
+		start = time.perf_counter()
+		dataset = generator.generate()
+		dataset['seconds'] = round(time.perf_counter() - start, 6)
+
+		cache = caches['reports']
+		now = timezone.now().date()
+		repeat = options['repeat']
+		report_options = dict(consolidation=Position.CONSOLIDATION_YEARLY,
+		                      institution=None, categories=(), asset=None)
+		for year in generator.years:
+			months = MonthYearDates(1, year).get_year_month_range(now)
+			reports = None
+
+			def generate_reports():
+				nonlocal reports
+				reports = NegotiationReportMonth(user, Negotiation)
+				reports.generate(months, **report_options)
+
+			# sem o cache de meses calculados
+			results[f'negotiation_report_{year}'] = self.measure(generate_reports, repeat, setup=cache.clear)
+			results[f'negotiation_report_cached_{year}'] = self.measure(generate_reports, repeat)
+
+			def generate_stats():
+				StatsReports(user, reports).generate()
+
+			results[f'stats_report_{year}'] = self.measure(generate_stats, repeat)
+
+			def generate_earnings():
+				EarningsReportMonth(user, Earnings).generate(months, **report_options)
+
+			results[f'earnings_report_{year}'] = self.measure(generate_earnings, repeat)
+
+			def save_positions():
+				PositionSavePlugin(user).save(reports)
+
+			results[f'save_positions_{year}'] = self.measure(save_positions, repeat)
+
+		# importação da planilha de negociações (outro usuário para não duplicar a carteira)
+		import_user = User.objects.create_superuser("benchmark-import", "import@localhost", "benchmark")
+		with tempfile.TemporaryDirectory() as tmpdir:
+			filepath = generator.write_negotiation_xlsx(Path(tmpdir, "negotiation.xlsx"))
+
+			def import_negotiation():
+				with open(filepath, "rb") as fp:
+					ImportNegotiationCommand().handle(filepath=fp, user=import_user, verbosity=0)
+
+			results['import_negotiation'] = self.measure(import_negotiation)
+		return {'dataset': dataset, 'results': results}
+
+	def handle(self, *args, **options):
+		runner = DiscoverRunner(verbosity=0, interactive=False)
+		old_config = runner.setup_databases()
+		try:
+			with override_settings(CACHES=BENCHMARK_CACHES):
+				benchmark = self.run_benchmarks(**options)
+		finally:
+			runner.teardown_databases(old_config)
+		benchmark.update({
+			'revision': self.get_revision(),
+			'created': timezone.now().isoformat(),
+			'database': connection.vendor,
+			'python': platform.python_version(),
+			'options': {name: options[name] for name in ('tickers', 'trades', 'years', 'seed', 'splits', 'bonus',
+			                                             'subscriptions', 'conversions', 'refunds', 'repeat')}
+		})
+		output = options['output'] or Path(f"benchmark-{timezone.now():%Y%m%d%H%M%S}.json")
+		with open(output, "w") as fp:
+			json.dump(benchmark, fp, indent=2)
+		for name, result in benchmark['results'].items():
+			self.stdout.write(f"{name:40} {result['seconds']:>10.4f}s {result['queries']:>8} queries")
+		self.stdout.write(f"Resultados gravados em {output}")
@@ -0,0 +1,182 @@
+import argparse
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import django
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.transaction import atomic
+
+from irpf.management.commands._import_base import UserType, User
+from irpf.models import BrokerageNote, Institution
+from irpf.notes import ParsedNotesCache, NoteSerializer, get_digest, iter_note_files, parse_note_content
+from irpf.permissions import permission_models
+from irpf.plugins import BrokerageNoteAdminPlugin
+
+
+class BrokerageNoteWriter(BrokerageNoteAdminPlugin):
+	"""Gravação das notas analisadas fora de uma requisição (mesmas regras do formulário)"""
+	guardian_permissions_models = permission_models
+	brokerage_note_field_update = BrokerageNote.note_fields
+	brokerage_note_model = BrokerageNote
+	# as negociações da nota são sempre registradas
+	is_save_transactions = True
+
+	def __init__(self, user):
+		self.user = user
+		self.request = None
+		self.setup()
+
+	def add_parser(self, content: bytes) -> str:
+		"""Cria o 'parser' do arquivo (sem analisar o pdf)"""
+		digest, _ = self._get_parser(io.BytesIO(content))
+		return digest
+
+	def get_parser(self, digest: str):
+		return self._parsed_notes[digest]['parser']
+
+	def set_notes(self, digest: str, notes: list):
+		self._parsed_notes[digest]['notes'] = notes
+
+	def has_notes(self, digest: str) -> bool:
+		return 'notes' in self._parsed_notes[digest]
+
+	@atomic
+	def write(self, name: str, content: bytes):
+		"""Registra a nota e suas negociações (ValidationError para notas duplicadas)"""
+		instance = self.brokerage_note_model(user=self.user, note=File(io.BytesIO(content), name=name))
+		notes = self._parser_and_update(instance)
+		if not (instance.reference_id and instance.reference_date):
+			raise ValueError(f"{instance._meta.verbose_name} invalida!")
+		instance.validate_unique()
+		instance.save()
+		self.set_guardian_object_perms(instance)
+		for note in notes:
+			self._add_transactions(note, instance)
+		return instance
+
+
+class Command(BaseCommand):
+	help = """Importa notas de corretagem (arquivos pdf ou zip com vários pdfs).
+	Os pdfs são analisados em paralelo (processos) e gravados em sequência."""
+	writer_class = BrokerageNoteWriter
+	cache_class = ParsedNotesCache
+	STATUS_SAVED = "importada"
+	STATUS_DUPLICATE = "duplicada"
+	STATUS_ERROR = "erro"
+
+	def add_arguments(self, parser):
+		parser.add_argument("--filepath", type=argparse.FileType('rb'), nargs='+', required=True)
+		parser.add_argument("--user", type=UserType(User.objects.filter(is_active=True)),
+		                    required=True)
+		parser.add_argument("--workers", type=int, default=None,
+		                    help="processos usados na análise dos pdfs (padrão: número de cpus)")
+
+	def setup(self, user, progress=None):
+		self.writer = self.writer_class(user)
+		self.cache = self.cache_class()
+		self.serializer = NoteSerializer()
+		self.counters = {'read': 0, 'inserted': 0, 'skipped': 0, 'errors': 0}
+		# relatório por arquivo (nome: situação)
+		self.report = []
+		self.errors = []
+		self.progress = progress
+
+	def add_result(self, name: str, status: str, message: str = ""):
+		line = f"{name}: {status}" + (f" ({message})" if message else "")
+		self.report.append(line)
+		if status == self.STATUS_SAVED:
+			self.counters['inserted'] += 1
+		elif status == self.STATUS_DUPLICATE:
+			self.counters['skipped'] += 1
+		else:
+			self.counters['errors'] += 1
+			self.errors.append(line)
+		if self.progress:
+			self.progress(self.counters)
+
+	def read_files(self, files) -> list:
+		"""Arquivos a gravar (nome, conteúdo, sha256). Cria os 'parsers' e usa as análises do cache."""
+		pending, digests = [], set()
+		for name, content in iter_note_files(files):
+			self.counters['read'] += 1
+			digest = get_digest(content)
+			if digest in digests:
+				self.add_result(name, self.STATUS_DUPLICATE, "arquivo repetido")
+				continue
+			digests.add(digest)
+			try:
+				self.writer.add_parser(content)
+			except Exception as exc:
+				self.add_result(name, self.STATUS_ERROR, str(exc))
+				continue
+			if (notes := self.cache.get(digest, self.writer.get_parser(digest))) is not None:
+				self.writer.set_notes(digest, notes)
+			pending.append((name, content, digest))
+		return pending
+
+	def parse_files(self, pending: list, workers: int = None) -> dict:
+		"""Análise dos pdfs em paralelo. Retorna os erros de análise por sha256."""
+		errors = {}
+		if not (contents := {digest: content for _, content, digest in pending
+		                     if not self.writer.has_notes(digest)}):
+			return errors
+		# os processos não usam o banco de dados (as conexões não devem ser compartilhadas)
+		connections.close_all()
+		workers = min(workers or os.cpu_count() or 1, len(contents))
+		with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+			futures = {executor.submit(parse_note_content, content): digest
+			           for digest, content in contents.items()}
+			for future in as_completed(futures):
+				digest = futures[future]
+				try:
+					notes = self.serializer.load(future.result())
+				except Exception as exc:
+					errors[digest] = exc
+					continue
+				self.cache.set(digest, self.writer.get_parser(digest), notes)
+				self.writer.set_notes(digest, notes)
+		return errors
+
+	def write_files(self, pending: list, errors: dict):
+		"""Gravação (única) das notas analisadas"""
+		for name, content, digest in pending:
+			if exc := errors.get(digest):
+				self.add_result(name, self.STATUS_ERROR, str(exc))
+				continue
+			try:
+				self.writer.write(name, content)
+			except ValidationError as exc:
+				self.add_result(name, self.STATUS_DUPLICATE, "; ".join(exc.messages))
+			except KeyError:
+				self.add_result(name, self.STATUS_ERROR, "corretora ainda não suportada")
+			except Institution.DoesNotExist:
+				self.add_result(name, self.STATUS_ERROR, "corretora ainda não cadastrada")
+			except Exception as exc:
+				self.add_result(name, self.STATUS_ERROR, str(exc))
+			else:
+				self.add_result(name, self.STATUS_SAVED)
+
+	def handle(self, *args, **options):
+		self.setup(options['user'], progress=options.get('progress'))
+		filepaths = options['filepath']
+		# o worker de importação (import_worker) envia um único arquivo
+		if not isinstance(filepaths, (list, tuple)):
+			filepaths = [filepaths]
+		try:
+			files = [(Path(filepath.name).name, filepath) for filepath in filepaths]
+			pending = self.read_files(files)
+		finally:
+			for filepath in filepaths:
+				filepath.close()
+		errors = self.parse_files(pending, workers=options.get('workers'))
+		self.write_files(pending, errors)
+		if options.get('verbosity', 0) > 0:
+			for line in self.report:
+				self.stdout.write(line)
+			self.stdout.write(" / ".join(f"{name}: {count}" for name, count in self.counters.items()))
+		return None
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management import get_commands, load_command_class
+from django.core.management.base import BaseCommand
+
+from irpf.models import ImportJob
+
+
+class Command(BaseCommand):
+	help = """Executa as importações de planilhas da fila (ImportJob)"""
+	job_model = ImportJob
+
+	def add_arguments(self, parser):
+		parser.add_argument("--once", action="store_true",
+		                    help="processa as importações pendentes e termina")
+		parser.add_argument("--sleep", type=float, default=5.0,
+		                    help="intervalo (segundos) entre as consultas à fila vazia")
+
+	def run_job(self, job: ImportJob):
+		"""Executa o comando de importação do modelo atualizando o progresso"""
+		command = load_command_class(get_commands()[job.command_name], job.command_name)
+		try:
+			with job.filestream.open("rb") as filestream:
+				command.handle(filepath=filestream,
+				               user=job.user,
+				               verbosity=0,
+				               progress=job.update_counters)
+		except Exception as exc:
+			if counters := getattr(command, 'counters', None):
+				job.update_counters(counters)
+			job.finish(job.STATUS_FAILED, str(exc))
+		else:
+			job.update_counters(command.counters)
+			# relatório por arquivo (quando existir) ou os erros das linhas
+			job.finish(job.STATUS_DONE, "\n".join(getattr(command, 'report', command.errors)))
+		return job
+
+	def handle(self, *args, **options):
+		while True:
+			if (job := self.job_model.claim()) is None:
+				if options['once']:
+					break
+				time.sleep(options['sleep'])
+				continue
+			self.stdout.write(f"Importando {job}...")
+			self.run_job(job)
+			self.stdout.write(f"{job}: lidas {job.read} / inseridas {job.inserted} / "
+			                  f"ignoradas {job.skipped} / erros {job.errors}")
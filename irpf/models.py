@@ -1,17 +1,19 @@
 import datetime
 import decimal
+import hashlib
 from collections import defaultdict
 from decimal import Decimal
 from pathlib import Path
 
 from django.conf import settings
 from django.db import models
+from django.db.backends.utils import format_number
 from django.utils import timezone
 from django.utils.formats import date_format
 from django.utils.functional import cached_property, classproperty
 from django.utils.text import slugify
 
-from irpf.fields import CharCodeField, DateField, CharCodeNameField, DecimalBRField, MoneyField
+from irpf.fields import CharCodeField, DateField, CharCodeNameField, DecimalBRField, MoneyField, DigitsField
 from irpf.storage import FileSystemOverwriteStorage
 from irpf.utils import get_numbers
 
@@ -34,6 +36,9 @@ class Bookkeeping(models.Model):
 	name = models.CharField(verbose_name="Nome", max_length=512)
 	cnpj = models.CharField(verbose_name="CNPJ", max_length=32,
 	                        blank=True, null=True)
+	# números do cnpj (busca indexada sem a formatação)
+	cnpj_digits = DigitsField(verbose_name="CNPJ (números)", source='cnpj',
+	                          max_length=32, db_index=True)
 	link = models.URLField(verbose_name="Portal do investidor")
 
 	def __str__(self):
@@ -52,6 +57,9 @@ class FoundsAdministrator(models.Model):
 	"""Geralmente quem administra FIIS"""
 	name = models.CharField(verbose_name="Nome", max_length=512)
 	cnpj = models.CharField(verbose_name="CNPJ", max_length=32)
+	# números do cnpj (busca indexada sem a formatação)
+	cnpj_digits = DigitsField(verbose_name="CNPJ (números)", source='cnpj',
+	                          max_length=32, db_index=True)
 
 	def __str__(self):
 		return f"{self.name} / {self.cnpj}"
@@ -65,6 +73,34 @@ class FoundsAdministrator(models.Model):
 		]
 
 
+class AssetQuerySet(models.QuerySet):
+	"""Alterações em lote também invalidam os catálogos de ativos"""
+
+	def update(self, **kwargs):
+		try:
+			return super().update(**kwargs)
+		finally:
+			self.model.catalog_clear()
+
+	def delete(self):
+		try:
+			return super().delete()
+		finally:
+			self.model.catalog_clear()
+
+	def bulk_create(self, *args, **kwargs):
+		try:
+			return super().bulk_create(*args, **kwargs)
+		finally:
+			self.model.catalog_clear()
+
+	def bulk_update(self, *args, **kwargs):
+		try:
+			return super().bulk_update(*args, **kwargs)
+		finally:
+			self.model.catalog_clear()
+
+
 class Asset(models.Model):
 	CATEGORY_STOCK = 1
 	CATEGORY_FII = 2
@@ -93,6 +129,9 @@ class Asset(models.Model):
 	                               help_text="Nome, segmento e classificação.")
 	name = models.CharField(verbose_name="Nome", max_length=512)
 	cnpj = models.CharField(verbose_name="CNPJ", max_length=32)
+	# números do cnpj (busca indexada sem a formatação)
+	cnpj_digits = DigitsField(verbose_name="CNPJ (números)", source='cnpj',
+	                          max_length=32, db_index=True)
 
 	category = models.IntegerField(verbose_name="Categoria",
 	                               default=None, null=True, blank=True,
@@ -110,6 +149,11 @@ class Asset(models.Model):
 	                                  on_delete=models.SET_NULL,
 	                                  null=True, blank=True)
 
+	# alterada sempre que um ativo é salvo (invalida os catálogos de ativos carregados no processo)
+	catalog_version = 0
+
+	objects = AssetQuerySet.as_manager()
+
 	@classproperty
 	def category_choices(cls) -> dict:
 		return dict(cls.CATEGORY_CHOICES)
@@ -149,6 +193,24 @@ class Asset(models.Model):
 	def __str__(self):
 		return f"{self.code} - {self.name}"
 
+	@classmethod
+	def catalog_clear(cls):
+		cls.catalog_version += 1
+		# versão persistente (compartilhada entre processos)
+		AssetCatalogVersion.increment()
+
+	def save(self, *args, **kwargs):
+		try:
+			return super().save(*args, **kwargs)
+		finally:
+			type(self).catalog_clear()
+
+	def delete(self, *args, **kwargs):
+		try:
+			return super().delete(*args, **kwargs)
+		finally:
+			type(self).catalog_clear()
+
 	class Meta:
 		ordering = ("name", "code")
 		verbose_name = "Ativo"
@@ -160,17 +222,41 @@ class Asset(models.Model):
 		]
 
 
+class AssetCatalogVersion(models.Model):
+	"""Versão persistente do catálogo de ativos (faz parte da chave dos relatórios mensais em cache)"""
+	version = models.PositiveBigIntegerField(verbose_name="Versão", default=0)
+
+	def __str__(self):
+		return f"v{self.version}"
+
+	@classmethod
+	def get_version(cls) -> int:
+		return cls.objects.values_list('version', flat=True).first() or 0
+
+	@classmethod
+	def increment(cls):
+		if not cls.objects.update(version=models.F('version') + 1):
+			cls.objects.create(version=1)
+
+	class Meta:
+		verbose_name = "Versão do catálogo de ativos"
+		verbose_name_plural = "Versões do catálogo de ativos"
+
+
 class Institution(models.Model):
 	"""Corretora de valores"""
 	name = models.CharField(verbose_name="Instituição", max_length=512)
 	cnpj = models.CharField(verbose_name="CNPJ", max_length=32)
+	# números do cnpj (busca indexada sem a formatação)
+	cnpj_digits = DigitsField(verbose_name="CNPJ (números)", source='cnpj',
+	                          max_length=32, db_index=True)
 
 	def __str__(self):
 		return f"{self.name[:2].upper()} - {self.cnpj}"
 
 	@cached_property
 	def cnpj_nums(self):
-		return get_numbers(self.cnpj)
+		return self.cnpj_digits or get_numbers(self.cnpj)
 
 	class Meta:
 		verbose_name = "Corretora"
@@ -192,7 +278,113 @@ class BaseIRPFModel(models.Model):
 		abstract = True
 
 
+class ReportDirtyMonth(BaseIRPFModel):
+	"""Registro do mês a partir do qual os relatórios já calculados do usuário deixam de ser válidos"""
+	date = models.DateField(verbose_name="Mês afetado")
+	position = models.BooleanField(verbose_name="Posição", default=False,
+	                               help_text="Alteração de posição (afeta somente relatórios iniciados no mês).")
+	changed = models.DateTimeField(verbose_name="Data da alteração", default=timezone.now)
+
+	def __str__(self):
+		return f"{date_format(self.date, 'F Y')} - {date_format(self.changed)}"
+
+	@classmethod
+	def register(cls, user_id, dates, position=False):
+		"""Registra a alteração de dados para o mês da menor data"""
+		if not (dates := [date for date in dates if date]):
+			return
+		date = min(dates).replace(day=1)
+		qs_options = dict(user_id=user_id, date=date, position=position)
+		if not cls.objects.filter(**qs_options).update(changed=timezone.now()):
+			cls.objects.get_or_create(**qs_options)
+
+	class Meta:
+		verbose_name = "Mês alterado"
+		verbose_name_plural = "Meses alterados"
+		unique_together = ('user', 'date', 'position')
+		indexes = [
+			models.Index(fields=['user', '-changed'])
+		]
+
+
+class ReportDirtyQuerySet(models.QuerySet):
+	"""Registra os meses afetados pelas alterações em lote (update)"""
+
+	def update(self, **kwargs):
+		model = self.model
+		fields = model.report_dirty_fields
+		queryset = self.order_by()
+		if model.report_dirty_position:
+			# cada posição afeta somente os relatórios iniciados no mês seguinte (datas distintas)
+			rows = list(queryset.values_list('user_id', *fields).distinct())
+		else:
+			# menor data de cada campo por usuário (sem carregar os registros)
+			rows = [(row['user_id'], *(row[f"{name}__min"] for name in fields))
+			        for row in queryset.values('user_id').annotate(*[models.Min(name) for name in fields])]
+		# novas datas atribuídas pela alteração
+		values = [value for name, value in kwargs.items()
+		          if name in fields and isinstance(value, datetime.date)]
+		retval = super().update(**kwargs)
+		for user_id, *dates in rows:
+			ReportDirtyMonth.register(user_id, model.get_report_dirty_months(dates + values),
+			                          position=model.report_dirty_position)
+		return retval
+
+
+class ReportDirtyModelMixin:
+	"""Registra o mês afetado sempre que o registro é salvo/removido (recálculo incremental dos relatórios).
+	Remoções (inclusive em lote ou em cascata) são registradas pelo sinal 'post_delete' (irpf.apps).
+	"""
+	report_dirty_fields = ('date',)
+	report_dirty_position = False
+
+	@classmethod
+	def get_report_dirty_months(cls, dates) -> list:
+		"""Datas dos registros convertidas nas datas dos relatórios afetados"""
+		return [date for date in dates if date]
+
+	def get_report_dirty_dates(self, saved=False) -> list:
+		"""Datas que afetam o relatório (incluindo as anteriores à alteração)"""
+		opts = self._meta
+		dates = [opts.get_field(name).to_python(getattr(self, name))
+		         for name in self.report_dirty_fields]
+		if saved and self.pk is not None:
+			queryset = type(self).objects.filter(pk=self.pk)
+			dates.extend(queryset.values_list(*self.report_dirty_fields).first() or ())
+		return self.get_report_dirty_months(dates)
+
+	def save(self, *args, **kwargs):
+		dates = self.get_report_dirty_dates(saved=True)
+		retval = super().save(*args, **kwargs)
+		ReportDirtyMonth.register(self.user_id, dates, position=self.report_dirty_position)
+		return retval
+
+	@staticmethod
+	def report_dirty_post_delete(sender, instance, origin=None, **kwargs):
+		user_model = instance._meta.get_field('user').related_model
+		# os meses alterados do usuário removido também são removidos
+		if isinstance(origin, user_model) or getattr(origin, 'model', None) is user_model:
+			return
+		ReportDirtyMonth.register(instance.user_id, instance.get_report_dirty_dates(),
+		                          position=instance.report_dirty_position)
+
+
 class ImportModelMixin:
+	# campo com o código do ativo (relaciona o registro importado ao ativo)
+	import_ticker_field = "code"
+	# campos com valores decimais no formato da planilha ('1,5' ou '-')
+	import_decimal_fields = ()
+
+	@classmethod
+	def import_convert_value(cls, name: str, value):
+		"""Conversão do valor de uma coluna da planilha (sem consultas ao banco de dados)"""
+		if name in cls.import_decimal_fields:
+			value = cls._convert_decimal(value, Decimal(0))
+		return value
+
+	@classmethod
+	def import_get_ticker(cls, data: dict) -> str:
+		return cls._meta.get_field(cls.import_ticker_field).to_python(data[cls.import_ticker_field])
 
 	@staticmethod
 	def _convert_decimal(value, *args):
@@ -213,7 +405,47 @@ class ImportModelMixin:
 		return value
 
 
-class Negotiation(ImportModelMixin, BaseIRPFModel):
+class FingerprintModelMixin:
+	"""Impressão digital (sha256) da chave natural do registro (deduplicação por índice único)"""
+	fingerprint_fields = ()
+
+	@classmethod
+	def get_fingerprint_value(cls, field, value) -> str:
+		"""Valor normalizado (independente da origem: planilha, nota ou formulário)"""
+		if value is None:
+			return ""
+		value = field.to_python(value)
+		if field.get_internal_type() == "DecimalField":
+			return format_number(value, field.max_digits, field.decimal_places)
+		if isinstance(value, datetime.date):
+			return value.isoformat()
+		return str(value).strip().casefold()
+
+	def get_fingerprint(self) -> str:
+		opts, values = self._meta, []
+		for name in self.fingerprint_fields:
+			field = opts.get_field(name)
+			# MoneyField (valor no campo 'amount')
+			field = getattr(field, 'amount_field', field)
+			if field.is_relation:
+				field = field.target_field
+				value = getattr(self, opts.get_field(name).attname)
+			else:
+				value = getattr(self, field.attname)
+			values.append(self.get_fingerprint_value(field, value))
+		return hashlib.sha256("\x1f".join(values).encode()).hexdigest()
+
+	def save(self, *args, **kwargs):
+		fingerprint = self.get_fingerprint()
+		queryset = type(self).objects.filter(fingerprint=fingerprint)
+		if self.pk is not None:
+			queryset = queryset.exclude(pk=self.pk)
+		# duplicatas cadastradas manualmente ficam sem a impressão digital
+		self.fingerprint = None if queryset.exists() else fingerprint
+		return super().save(*args, **kwargs)
+
+
+class Negotiation(ReportDirtyModelMixin, ImportModelMixin, FingerprintModelMixin, BaseIRPFModel):
 	"""Data do Negócio / Tipo de Movimentação / Mercado / Prazo/Vencimento / Instituição /
 	Código de Negociação / Quantidade / Preço / Valor"""
 	KIND_BUY = "Compra"
@@ -272,6 +504,11 @@ class Negotiation(ImportModelMixin, BaseIRPFModel):
 	                                 verbose_name="Subscrição",
 	                                 null=True,
 	                                 editable=False)
+	fingerprint = models.CharField(verbose_name="Impressão digital",
+	                               max_length=64,
+	                               unique=True,
+	                               null=True,
+	                               editable=False)
 
 	# relates the name of the headers with the fields.
 	date.sheet_header = "Data do Negócio"
@@ -282,17 +519,9 @@ class Negotiation(ImportModelMixin, BaseIRPFModel):
 	price.amount_field.sheet_header = "Preço"
 	total.amount_field.sheet_header = "Valor"
 
-	@classmethod
-	def import_before_save_data(cls, **data):
-		opts = cls._meta
-		data['price'] = cls._convert_decimal(data.get('price'), Decimal(0))
-		data['total'] = cls._convert_decimal(data.get('total'), Decimal(0))
-		try:
-			ticker = opts.get_field("code").to_python(data['code'])
-			data['asset'] = Asset.objects.get(code__iexact=ticker)
-		except Asset.DoesNotExist:
-			pass
-		return data
+	fingerprint_fields = ('user', 'date', 'kind', 'code', 'quantity', 'price', 'total', 'institution_name')
+
+	import_decimal_fields = ('price', 'total')
 
 	@cached_property
 	def is_sell(self):
@@ -307,6 +536,8 @@ class Negotiation(ImportModelMixin, BaseIRPFModel):
 	def __str__(self):
 		return f'{self.code}:{self.kind[0]}/{self.quantity} ({self.institution_name})'
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Negociação"
 		verbose_name_plural = "Negociações"
@@ -320,7 +551,8 @@ class Negotiation(ImportModelMixin, BaseIRPFModel):
 		]
 
 
-class Bonus(BaseIRPFModel):
+class Bonus(ReportDirtyModelMixin, BaseIRPFModel):
+	report_dirty_fields = ('date_com', 'date')
 	asset = models.ForeignKey(Asset, on_delete=models.CASCADE,
 	                          verbose_name="Ativo",
 	                          null=False)
@@ -344,6 +576,8 @@ class Bonus(BaseIRPFModel):
 	def __str__(self):
 		return f"{self.asset} / {self.base_value} {self.proportion}%"
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Bonificação"
 		verbose_name_plural = "Bonificações"
@@ -378,7 +612,7 @@ class BonusInfo(BaseIRPFModel):
 		verbose_name_plural = verbose_name
 
 
-class Subscription(BaseIRPFModel):
+class Subscription(ReportDirtyModelMixin, BaseIRPFModel):
 	"""
 	 Em muitas ocasiões, quando Fundos Listados (Fundos Imobiliários, FI Agro, etc.) ou empresas
 	desejam aumentar o seu capital via nova emissão de cotas/ações, elas concedem aos seus
@@ -398,6 +632,8 @@ class Subscription(BaseIRPFModel):
 	                          upload_to='subscription/notice',
 	                          null=True, blank=True)
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Subscrição"
 		verbose_name_plural = "Subscrições"
@@ -410,7 +646,7 @@ class Subscription(BaseIRPFModel):
 		return f"{self.asset}"
 
 
-class Earnings(ImportModelMixin, BaseIRPFModel):
+class Earnings(ReportDirtyModelMixin, ImportModelMixin, FingerprintModelMixin, BaseIRPFModel):
 	BONIFICAO_EM_ATIVOS = "bonificacao_em_ativos"
 	LEILAO_DE_FRACAO = "leilao_de_fracao"
 	FRACAO_EM_ATIVOS = "fracao_em_ativos"
@@ -439,6 +675,11 @@ class Earnings(ImportModelMixin, BaseIRPFModel):
 	total = MoneyField(verbose_name="Valor da operação",
 	                   max_digits=DECIMAL_MAX_DIGITS,
 	                   decimal_places=DECIMAL_PLACES)
+	fingerprint = models.CharField(verbose_name="Impressão digital",
+	                               max_length=64,
+	                               unique=True,
+	                               null=True,
+	                               editable=False)
 
 	date.sheet_header = "Data"
 	flow.sheet_header = "Entrada/Saída"
@@ -449,20 +690,17 @@ class Earnings(ImportModelMixin, BaseIRPFModel):
 	quantity.sheet_header = "Quantidade"
 	total.amount_field.sheet_header = "Valor da Operação"
 
-	@classmethod
-	def import_before_save_data(cls, **data):
-		opts = cls._meta
-		data['total'] = cls._convert_decimal(data.get('total'), Decimal(0))
-		try:
-			ticker = opts.get_field("code").to_python(data['code'])
-			data['asset'] = Asset.objects.get(code__iexact=ticker)
-		except Asset.DoesNotExist:
-			pass
-		return data
+	fingerprint_fields = ('user', 'date', 'flow', 'kind', 'code', 'quantity', 'total', 'institution_name')
+
+	import_decimal_fields = ('total',)
+
+	@staticmethod
+	def get_kind_slug(kind: str) -> str:
+		return slugify(kind).replace('-', "_")
 
 	@cached_property
 	def kind_slug(self):
-		return slugify(self.kind).replace('-', "_")
+		return self.get_kind_slug(self.kind)
 
 	@cached_property
 	def is_credit(self):
@@ -477,6 +715,8 @@ class Earnings(ImportModelMixin, BaseIRPFModel):
 	def __str__(self):
 		return f'{self.code} - {self.name} - {self.total}'
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Provento"
 		verbose_name_plural = "Proventos"
@@ -541,6 +781,22 @@ class BrokerageNote(BaseIRPFModel):
 	                    max_digits=DECIMAL_MAX_DIGITS,
 	                    decimal_places=2)
 
+	# campos preenchidos com os dados da nota analisada (mesmos nomes do correpy)
+	note_fields = (
+		'reference_id',
+		'reference_date',
+		'settlement_fee',
+		'registration_fee',
+		'term_fee',
+		'ana_fee',
+		'emoluments',
+		'operational_fee',
+		'execution',
+		'custody_fee',
+		'taxes',
+		'others'
+	)
+
 	def __str__(self):
 		return f"{self.note} / {self.institution.name}"
 
@@ -556,7 +812,26 @@ class BrokerageNote(BaseIRPFModel):
 		ordering = ('-reference_date',)
 
 
-class AssetEvent(BaseIRPFModel):
+class ParsedBrokerageNote(models.Model):
+	"""Resultado da análise (pdf) de uma nota de corretagem.
+	Identificado pelo sha256 do arquivo e pela versão do 'parser' (nova análise somente quando o parser mudar).
+	"""
+	digest = models.CharField(verbose_name="SHA-256", max_length=64)
+	parser_version = models.CharField(verbose_name="Versão do parser", max_length=255)
+	data = models.JSONField(verbose_name="Notas")
+	created = models.DateTimeField(verbose_name="Criado em", default=timezone.now)
+
+	def __str__(self):
+		return f"{self.digest} ({self.parser_version})"
+
+	class Meta:
+		verbose_name = "Análise de nota de corretagem"
+		verbose_name_plural = "Análises de notas de corretagem"
+		unique_together = ('digest', 'parser_version')
+
+
+class AssetEvent(ReportDirtyModelMixin, BaseIRPFModel):
+	report_dirty_fields = ('date', 'date_com')
 	SPLIT, INPLIT = 1, 2
 	EVENT_CHOICES = (
 		(SPLIT, "Desdobramento"),
@@ -590,12 +865,14 @@ class AssetEvent(BaseIRPFModel):
 	def event_name(self):
 		return self.event_choices[self.event]
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Evento"
 		verbose_name_plural = verbose_name + "s"
 
 
-class AssetConvert(BaseIRPFModel):
+class AssetConvert(ReportDirtyModelMixin, BaseIRPFModel):
 	"""Modelo usado na conversão de ativos.
 	Na data dado por 'date' o ativo de origem sofre conversão para o ativo de destino.
 	"""
@@ -617,12 +894,14 @@ class AssetConvert(BaseIRPFModel):
 	def __str__(self):
 		return f'{self.origin.code} x {self.target.code}'
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Conversão de ativo"
 		verbose_name_plural = verbose_name + "s"
 
 
-class AssetRefund(BaseIRPFModel):
+class AssetRefund(ReportDirtyModelMixin, BaseIRPFModel):
 	"""Restituição / Amortização de capital investido
 	"""
 	asset = models.ForeignKey(Asset, on_delete=models.CASCADE, verbose_name="Ativo",
@@ -638,12 +917,16 @@ class AssetRefund(BaseIRPFModel):
 	def __str__(self):
 		return f'{self.asset.code} / {self.value}'
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		verbose_name = "Restituição"
 		verbose_name_plural = "Restituições"
 
 
-class Position(BaseIRPFModel):
+class Position(ReportDirtyModelMixin, BaseIRPFModel):
+	# a posição do final do mês é usada pelos relatórios iniciados no mês seguinte
+	report_dirty_position = True
 	CONSOLIDATION_YEARLY = 1
 	CONSOLIDATION_MONTHLY = 2
 	CONSOLIDATION_CHOICES = [
@@ -682,6 +965,12 @@ class Position(BaseIRPFModel):
 	def consolidation_choices(cls):
 		return dict(cls.CONSOLIDATION_CHOICES)
 
+	@classmethod
+	def get_report_dirty_months(cls, dates) -> list:
+		# a posição do fim do mês é o início do mês seguinte
+		return [date + datetime.timedelta(days=1)
+		        for date in super().get_report_dirty_months(dates)]
+
 	def __str__(self):
 		msg = []
 		if self.asset:
@@ -693,6 +982,8 @@ class Position(BaseIRPFModel):
 			msg.append(f" - {self.institution.name}")
 		return ' '.join(msg)
 
+	objects = ReportDirtyQuerySet.as_manager()
+
 	class Meta:
 		unique_together = ("asset", "institution", "user", "date")
 		ordering = ('asset__code', '-date',)
@@ -980,3 +1271,92 @@ class SwingTrade(AbstractTradeRate):
 	class Meta:
 		verbose_name = "Swing trade (negociações)"
 		verbose_name_plural = verbose_name
+
+
+class ImportLock(BaseIRPFModel):
+	"""Linha bloqueada (select_for_update) pelos lotes de importação do usuário.
+	Serializa importações simultâneas sem bloquear o registro do usuário (login, etc.).
+	"""
+
+	def __str__(self):
+		return str(self.user_id)
+
+	@classmethod
+	def acquire(cls, user):
+		"""Bloqueia a linha do usuário até o fim da transação (criada na primeira importação)"""
+		queryset = cls.objects.select_for_update().filter(user=user)
+		if not list(queryset.values_list('pk', flat=True)):
+			cls.objects.get_or_create(user=user)
+			list(queryset.values_list('pk', flat=True))
+
+	class Meta:
+		verbose_name = "Bloqueio de importação"
+		verbose_name_plural = "Bloqueios de importação"
+		unique_together = ('user',)
+
+
+class ImportJob(BaseIRPFModel):
+	"""Importação de planilha executada em segundo plano (fila no banco de dados)"""
+	STATUS_PENDING = "pending"
+	STATUS_RUNNING = "running"
+	STATUS_DONE = "done"
+	STATUS_FAILED = "failed"
+	STATUS_CHOICES = (
+		(STATUS_PENDING, "Na fila"),
+		(STATUS_RUNNING, "Em execução"),
+		(STATUS_DONE, "Concluída"),
+		(STATUS_FAILED, "Falhou")
+	)
+	filestream = models.FileField(verbose_name="Arquivo", upload_to="imports/%Y/%m")
+	model = models.CharField(verbose_name="Modelo", max_length=128,
+	                         help_text="app_label.model_name")
+	status = models.CharField(verbose_name="Situação", max_length=16,
+	                          choices=STATUS_CHOICES,
+	                          default=STATUS_PENDING)
+	created = models.DateTimeField(verbose_name="Criada em", default=timezone.now)
+	started = models.DateTimeField(verbose_name="Iniciada em", null=True, blank=True)
+	finished = models.DateTimeField(verbose_name="Finalizada em", null=True, blank=True)
+	read = models.PositiveIntegerField(verbose_name="Linhas lidas", default=0)
+	inserted = models.PositiveIntegerField(verbose_name="Inseridas", default=0)
+	skipped = models.PositiveIntegerField(verbose_name="Ignoradas", default=0)
+	errors = models.PositiveIntegerField(verbose_name="Erros", default=0)
+	message = models.TextField(verbose_name="Mensagem", blank=True, default="")
+
+	counter_fields = ('read', 'inserted', 'skipped', 'errors')
+
+	@property
+	def command_name(self) -> str:
+		"""Comando de importação do modelo"""
+		return f"import_{self.model.split('.', 1)[-1].lower()}"
+
+	@classmethod
+	def claim(cls):
+		"""Próxima importação da fila (marcada como em execução) ou None"""
+		for job in cls.objects.filter(status=cls.STATUS_PENDING).order_by('created', 'pk')[:10]:
+			started = timezone.now()
+			# outro worker pode ter iniciado a mesma importação
+			if cls.objects.filter(pk=job.pk, status=cls.STATUS_PENDING).update(
+					status=cls.STATUS_RUNNING, started=started):
+				job.status, job.started = cls.STATUS_RUNNING, started
+				return job
+		return None
+
+	def update_counters(self, counters: dict):
+		for name in self.counter_fields:
+			setattr(self, name, counters.get(name, 0))
+		self.save(update_fields=self.counter_fields)
+
+	def finish(self, status: str, message: str = ""):
+		self.status, self.message, self.finished = status, message, timezone.now()
+		self.save(update_fields=('status', 'message', 'finished'))
+
+	def __str__(self):
+		return f"{self.model} - {self.get_status_display()} ({date_format(self.created)})"
+
+	class Meta:
+		verbose_name = "Importação"
+		verbose_name_plural = "Importações"
+		ordering = ("-created",)
+		indexes = [
+			models.Index(fields=['status', 'created'])
+		]
@@ -0,0 +1,139 @@
+import dataclasses
+import datetime
+import enum
+import hashlib
+import importlib.metadata
+import io
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.utils.module_loading import import_string
+
+from correpy.domain.entities.brokerage_note import BrokerageNote
+from correpy.parsers.brokerage_notes.base_parser import BaseBrokerageNoteParser
+from correpy.parsers.brokerage_notes.parser_factory import ParserFactory
+from irpf.models import ParsedBrokerageNote
+
+# alterar quando o formato dos dados serializados mudar
+SERIALIZER_VERSION = 1
+
+
+def get_digest(content: bytes) -> str:
+	"""sha256 do conteúdo do arquivo"""
+	return hashlib.sha256(content).hexdigest()
+
+
+def iter_note_files(files):
+	"""Arquivos pdf (nome, conteúdo) de uma sequência de arquivos pdf ou zip (nome, arquivo)"""
+	for name, fileobj in files:
+		if zipfile.is_zipfile(fileobj):
+			fileobj.seek(0)
+			with zipfile.ZipFile(fileobj) as zf:
+				for info in zf.infolist():
+					if not info.is_dir() and info.filename.lower().endswith(".pdf"):
+						yield Path(info.filename).name, zf.read(info)
+		else:
+			fileobj.seek(0)
+			yield name, fileobj.read()
+
+
+class NoteSerializer:
+	"""Converte as notas (dataclasses do correpy) em dados json e vice-versa"""
+	# somente classes desses módulos são recriadas
+	allowed_modules = ("correpy.",)
+
+	def get_path(self, obj) -> str:
+		cls = type(obj)
+		return f"{cls.__module__}.{cls.__qualname__}"
+
+	def get_class(self, path: str):
+		if not path.startswith(self.allowed_modules):
+			raise ValueError(f"class '{path}' not allowed")
+		return import_string(path)
+
+	def dump(self, value):
+		if dataclasses.is_dataclass(value):
+			return {'__class__': self.get_path(value),
+			        'fields': {field.name: self.dump(getattr(value, field.name))
+			                   for field in dataclasses.fields(value)}}
+		elif isinstance(value, enum.Enum):
+			return {'__enum__': self.get_path(value), 'value': value.value}
+		elif isinstance(value, Decimal):
+			return {'__decimal__': str(value)}
+		elif isinstance(value, datetime.date):
+			return {'__date__': value.isoformat()}
+		elif isinstance(value, (list, tuple)):
+			return [self.dump(item) for item in value]
+		return value
+
+	def load(self, value):
+		if isinstance(value, list):
+			return [self.load(item) for item in value]
+		elif not isinstance(value, dict):
+			return value
+		elif '__class__' in value:
+			cls = self.get_class(value['__class__'])
+			values = {name: self.load(item) for name, item in value['fields'].items()}
+			obj = cls(**{field.name: values[field.name] for field in dataclasses.fields(cls)
+			             if field.init and field.name in values})
+			# restaura os valores alterados no '__post_init__' (ou que não são parâmetros)
+			for name, item in values.items():
+				setattr(obj, name, item)
+			return obj
+		elif '__enum__' in value:
+			return self.get_class(value['__enum__'])(value['value'])
+		elif '__decimal__' in value:
+			return Decimal(value['__decimal__'])
+		elif '__date__' in value:
+			return datetime.date.fromisoformat(value['__date__'])
+		return value
+
+
+class ParsedNotesCache:
+	"""Cache persistente (banco de dados) da análise de pdfs de notas de corretagem"""
+	model = ParsedBrokerageNote
+	serializer_class = NoteSerializer
+
+	def __init__(self):
+		self.serializer = self.serializer_class()
+
+	@staticmethod
+	def get_package_version() -> str:
+		try:
+			return importlib.metadata.version("correpy")
+		except importlib.metadata.PackageNotFoundError:
+			return "0"
+
+	def get_version(self, parser: BaseBrokerageNoteParser) -> str:
+		"""Versão da análise: classe do parser, versão do correpy e do formato serializado"""
+		cls = type(parser)
+		return f"{cls.__module__}.{cls.__qualname__}:{self.get_package_version()}:{SERIALIZER_VERSION}"
+
+	def get(self, digest: str, parser: BaseBrokerageNoteParser):
+		"""As notas guardadas ou None"""
+		try:
+			obj = self.model.objects.get(digest=digest, parser_version=self.get_version(parser))
+		except self.model.DoesNotExist:
+			return None
+		return self.serializer.load(obj.data)
+
+	def set(self, digest: str, parser: BaseBrokerageNoteParser, notes: list[BrokerageNote]):
+		self.model.objects.bulk_create([
+			self.model(digest=digest,
+			           parser_version=self.get_version(parser),
+			           data=self.serializer.dump(notes))
+		], ignore_conflicts=True)
+
+	def parse(self, digest: str, parser: BaseBrokerageNoteParser) -> list[BrokerageNote]:
+		"""As notas do arquivo (a análise é feita somente se ainda não estiver no cache)"""
+		if (notes := self.get(digest, parser)) is None:
+			notes = list(parser.parse_brokerage_note())
+			self.set(digest, parser, notes)
+		return notes
+
+
+def parse_note_content(content: bytes) -> list:
+	"""Análise do pdf (executada em outro processo). Retorna as notas serializadas."""
+	parser = ParserFactory(brokerage_note=io.BytesIO(content)).get_parser()
+	return NoteSerializer().dump(list(parser.parse_brokerage_note()))
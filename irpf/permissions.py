@@ -1,5 +1,6 @@
 from assetprice.models import AssetEarningHistory
 from irpf.models import (
+	BaseIRPFModel,
 	Bookkeeping,
 	FoundsAdministrator,
 	Asset,
@@ -18,7 +19,8 @@ from irpf.models import (
 	TaxRate,
 	DayTrade,
 	SwingTrade,
-	AssetRefund
+	AssetRefund,
+	ImportJob
 )
 
 permission_all = ('view', 'add', 'change', 'delete')
@@ -44,4 +46,15 @@ permission_models = {
 	Position: permission_all,
 	Taxes: permission_all,
 	Statistic: permission_all,
+	ImportJob: ('view', 'delete'),
 }
+
+
+def is_owner_model(model) -> bool:
+	"""Modelos com dono (campo 'user') usam permissões de objeto pelo dono do registro"""
+	return issubclass(model, BaseIRPFModel)
+
+
+def is_owner(obj, user) -> bool:
+	"""Se o usuário é o dono do registro"""
+	return is_owner_model(type(obj)) and obj.user_id is not None and obj.user_id == user.pk
@@ -6,18 +6,21 @@ import io
 import operator
 import urllib
 import urllib.parse
+from decimal import Decimal
 import django.forms as django_forms
 from django.contrib.auth import get_permission_codename
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.core.management import get_commands
-from django.db.models import Count, Value, Q
+from django.db.models import Count, Q
 from django.db.models.functions import ExtractMonth
 from django.db.transaction import atomic
 from django.template.loader import render_to_string
 from django.utils.functional import cached_property
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
+from django.contrib.contenttypes.models import ContentType
 from guardian.shortcuts import get_objects_for_user, assign_perm
+from guardian.utils import get_user_obj_perms_model, get_group_obj_perms_model
 
 from correpy.domain.entities.brokerage_note import BrokerageNote
 from correpy.domain.entities.security import Security
@@ -26,12 +29,15 @@ from correpy.domain.enums import TransactionType
 from correpy.parsers.brokerage_notes.base_parser import BaseBrokerageNoteParser
 from correpy.parsers.brokerage_notes.parser_factory import ParserFactory
 from irpf.fields import CharCodeField
-from irpf.funcs import RegexReplace
-from irpf.models import Negotiation, Position, Asset, Statistic, BrokerageNote as IrpfBrokerageNote, Institution
+from irpf.models import Negotiation, Position, Asset, Statistic, BrokerageNote as IrpfBrokerageNote, Institution, \
+	ReportDirtyMonth, Taxes
+from irpf.notes import ParsedNotesCache, get_digest
+from irpf.permissions import is_owner_model, is_owner
 from irpf.report import BaseReport
 from irpf.report.base import BaseReportMonth
 from irpf.report.cache import Cache
-from irpf.report.stats import StatsReport, StatsReports
+from irpf.report.profiler import null_profiler, NullProfiler
+from irpf.report.stats import StatsReports
 from irpf.report.utils import Assets, Stats, OrderedDictResults, TransactionGroup, MoneyLC
 from irpf.utils import update_defaults, get_numbers, OrderedDefaultDict
 from xadmin.plugins.utils import get_context_dict
@@ -41,18 +47,47 @@ from xadmin.views import BaseAdminPlugin
 class GuardianAdminPluginMixin(BaseAdminPlugin):
 	guardian_permissions_models = {}
 
+	@staticmethod
+	def get_concrete_fields(model, names) -> list:
+		"""Campos de banco de dados (moneyfield grava o valor em 'amount_field')"""
+		opts = model._meta
+		return [getattr(field := opts.get_field(name), 'amount_field', field).name for name in names]
+
+	def get_guardian_model_perms(self, model, user) -> list:
+		"""Permissões de modelo que o usuário deve ter para ter permissão de objeto"""
+		perms = []
+		for perm_name in self.guardian_permissions_models[model]:
+			permission_codename = self.get_model_perm(model, perm_name)
+			# tem que ter permissão de modelo para ter permissão de objeto
+			if not user.has_perm(permission_codename):
+				raise PermissionDenied(permission_codename)
+			perms.append(permission_codename)
+		return perms
+
 	def set_guardian_object_perms(self, obj, user=None):
 		"""Configura permissões de objeto para o usuário da seção"""
 		model = type(obj)
 		if user is None:
 			user = self.user
-		for perm_name in self.guardian_permissions_models[model]:
-			permission_codename = self.get_model_perm(model, perm_name)
-			# tem que ter permissão de modelo para ter permissão de objeto
-			if user.has_perm(permission_codename):
-				assign_perm(permission_codename, user, obj)
-			else:
-				raise PermissionDenied(permission_codename)
+		perms = self.get_guardian_model_perms(model, user)
+		# o dono do registro tem permissão de objeto pelo backend (OwnerPermissionBackend)
+		if is_owner(obj, user):
+			return
+		for permission_codename in perms:
+			assign_perm(permission_codename, user, obj)
+
+	def set_guardian_objects_perms(self, model, queryset, user=None):
+		"""Configura (em massa) permissões de objeto dos registros do queryset para o usuário da seção"""
+		if user is None:
+			user = self.user
+		perms = self.get_guardian_model_perms(model, user)
+		if is_owner_model(model):
+			# somente registros de outros usuários precisam de permissões do guardian
+			queryset = queryset.exclude(user_id=user.pk)
+			if not queryset.exists():
+				return
+		for permission_codename in perms:
+			assign_perm(permission_codename, user, queryset)
 
 
 class GuardianAdminPlugin(GuardianAdminPluginMixin):
@@ -62,7 +97,16 @@ class GuardianAdminPlugin(GuardianAdminPluginMixin):
 	def init_request(self, *args, **kwargs):
 		return self.guardian_protected
 
-	def queryset(self, __):
+	def has_shared_objects(self) -> bool:
+		"""Se existem registros do modelo compartilhados (permissões do guardian) com o usuário"""
+		ctype = ContentType.objects.get_for_model(self.model)
+		user_perms_model = get_user_obj_perms_model(self.model)
+		group_perms_model = get_group_obj_perms_model(self.model)
+		return (user_perms_model.objects.filter(user=self.user, content_type=ctype).exists() or
+		        group_perms_model.objects.filter(group__user=self.user, content_type=ctype).exists())
+
+	def get_shared_queryset(self):
+		"""Registros com permissões de objeto do guardian"""
 		model_perms = self.admin_view.get_model_perms()
 		model_perms = [get_permission_codename(name, self.opts)
 		               for name in model_perms if model_perms[name]]
@@ -75,6 +119,15 @@ class GuardianAdminPlugin(GuardianAdminPluginMixin):
 			accept_global_perms=False)
 		return queryset
 
+	def queryset(self, __):
+		if not is_owner_model(self.model):
+			return self.get_shared_queryset()
+		# registros do usuário (dono) sem o join com a tabela de permissões
+		owner = Q(user_id=self.user.pk)
+		if self.has_shared_objects():
+			owner |= Q(pk__in=self.get_shared_queryset().values('pk'))
+		return __().filter(owner)
+
 	def save_models(self):
 		new_obj = getattr(self.admin_view, "new_obj", None)
 		if new_obj and new_obj.pk:
@@ -110,6 +163,7 @@ class AssignUserAdminPlugin(GuardianAdminPluginMixin):
 
 class ListActionModelPlugin(BaseAdminPlugin):
 	list_action_activate = False
+	list_action_report = True
 
 	def init_request(self, *args, **kwargs):
 		return self.list_action_activate
@@ -136,7 +190,8 @@ class ListActionModelPlugin(BaseAdminPlugin):
 		if command_name in get_commands():
 			list_actions_group['import_list'] = self.get_import_action()
 
-		list_actions_group["report_irpf"] = self.get_report_action()
+		if self.list_action_report:
+			list_actions_group["report_irpf"] = self.get_report_action()
 
 		context['list_actions_group'] = list_actions_group
 		return render_to_string("irpf/adminx.block.listtoolbar_action.html",
@@ -151,6 +206,9 @@ class ListActionModelPlugin(BaseAdminPlugin):
 
 class ReportBaseAdminPlugin(GuardianAdminPluginMixin):
 	report_for_model = Negotiation
+	# nome da fase de salvamento no perfil do relatório
+	profile_phase = "save"
+	bulk_batch_size = 500
 
 	def init_request(self, *args, **kwargs):
 		activate = False
@@ -166,6 +224,35 @@ class ReportBaseAdminPlugin(GuardianAdminPluginMixin):
 		"""Atualiza, se necessário a instância com valores padrão"""
 		return update_defaults(instance, defaults)
 
+	def bulk_upsert(self, queryset, instances: dict, get_key, fields) -> tuple[list, list]:
+		"""Cria ou atualiza em massa as instâncias não salvas de 'instances' ({chave: instância}).
+		queryset: registros existentes que podem corresponder às chaves (get_key(obj) -> chave).
+		fields: campos atualizados nos registros existentes.
+		Retorna as listas de registros criados e atualizados.
+		"""
+		model = queryset.model
+		existing = {get_key(obj): obj for obj in queryset}
+		created, updated = [], []
+		for key, instance in instances.items():
+			if (obj := existing.get(key)) is None:
+				created.append(instance)
+				continue
+			changed = False
+			for name in fields:
+				if getattr(obj, name) != (value := getattr(instance, name)):
+					setattr(obj, name, value)
+					changed = True
+			if changed:
+				updated.append(obj)
+		if created:
+			model.objects.bulk_create(created, batch_size=self.bulk_batch_size)
+			# nem todos os bancos de dados retornam a chave primária do bulk_create
+			self.set_guardian_objects_perms(model, queryset.exclude(pk__in=[obj.pk for obj in existing.values()]))
+		if updated:
+			model.objects.bulk_update(updated, self.get_concrete_fields(model, fields),
+			                          batch_size=self.bulk_batch_size)
+		return created, updated
+
 	@cached_property
 	def is_save_position(self):
 		field = django_forms.BooleanField(initial=False)
@@ -176,9 +263,13 @@ class ReportBaseAdminPlugin(GuardianAdminPluginMixin):
 			value = field.initial
 		return value
 
+	def get_profiler(self) -> NullProfiler:
+		return getattr(self.admin_view, 'profiler', None) or null_profiler
+
 	def report_generate(self, reports: BaseReportMonth, form):
 		if self.is_save_position and reports:
-			self.save(reports)
+			with self.get_profiler().phase(self.profile_phase):
+				self.save(reports)
 		return reports
 
 	def save(self, reports: BaseReportMonth):
@@ -188,35 +279,57 @@ class ReportBaseAdminPlugin(GuardianAdminPluginMixin):
 class ReportSavePositionAdminPlugin(ReportBaseAdminPlugin):
 	"""Salva os dados de posição do relatório"""
 	position_model = Position
+	profile_phase = "save_positions"
+	dirty_model = ReportDirtyMonth
+	position_fields = ('quantity', 'avg_price', 'total', 'tax', 'is_valid')
 
 	def block_form_buttons(self, context, nodes):
 		if self.admin_view.reports:
 			return render_to_string("irpf/blocks/blocks.form.buttons.button_save_position.html")
 
-	def save_position(self, report: BaseReport, asset: Assets):
-		consolidation = report.get_opts('consolidation')
-		end_date = report.get_opts('end_date')
-		institution = asset.institution
-
-		defaults = {
-			'quantity': asset.buy.quantity,
-			'avg_price': asset.buy.avg_price,
-			'total': asset.buy.total,
-			'tax': asset.buy.tax,
-			'is_valid': True
-		}
-		instance, created = self.position_model.objects.get_or_create(
-			defaults=defaults,
-			date=end_date,
+	def get_position(self, report: BaseReport, asset: Assets) -> Position:
+		"""Posição (não salva) do ativo na data final do relatório"""
+		return self.position_model(
+			date=report.get_opts('end_date'),
 			user=self.user,
 			asset=asset.instance,
-			institution=institution,
-			consolidation=consolidation
+			institution=asset.institution,
+			consolidation=report.get_opts('consolidation'),
+			quantity=asset.buy.quantity,
+			avg_price=asset.buy.avg_price.money,
+			total=asset.buy.total.money,
+			tax=asset.buy.tax.money,
+			is_valid=True
 		)
-		if created:
-			self.set_guardian_object_perms(instance)
-		else:
-			self._update_defaults(instance, defaults)
+
+	def save_positions(self, reports: BaseReportMonth):
+		"""Salva (em massa) as posições de todos os meses fechados"""
+		positions = {}
+		for month in reports:
+			report: BaseReport = reports[month]
+			# só salva para relatório fechado (mês completo)
+			if not report.is_closed:
+				continue
+			for asset in report.get_results():
+				# ignora ativo não cadastrado ou com posição zerada
+				if asset.buy.quantity <= 0 or asset.instance is None:
+					continue
+				position = self.get_position(report, asset)
+				positions[(position.asset_id, position.institution_id, position.date)] = position
+		if not positions:
+			return
+		queryset = self.position_model.objects.filter(
+			user=self.user,
+			date__in={position.date for position in positions.values()},
+			consolidation=reports.get_first().get_opts('consolidation')
+		)
+		created, updated = self.bulk_upsert(queryset, positions,
+		                                    lambda obj: (obj.asset_id, obj.institution_id, obj.date),
+		                                    self.position_fields)
+		# o bulk_create não passa pelo 'save' do modelo (o bulk_update é registrado pelo 'update' do queryset);
+		# cada posição afeta somente os relatórios iniciados no mês seguinte
+		for date in self.position_model.get_report_dirty_months({position.date for position in created}):
+			self.dirty_model.register(self.user.pk, [date], position=True)
 
 	def _invalidate_positions(self, report: BaseReport):
 		"""Remove todos os dados de posição a partir da data 'end_date' relatório"""
@@ -234,23 +347,16 @@ class ReportSavePositionAdminPlugin(ReportBaseAdminPlugin):
 			qs_options['asset'] = asset
 		if categories := report.get_opts('categories', None):
 			qs_options['asset__category__in'] = categories
-		self.position_model.objects.filter(**qs_options).update(is_valid=False)
+		queryset = self.position_model.objects.filter(**qs_options)
+		# os relatórios mensais calculados a partir das posições invalidadas são registrados pelo 'update'
+		queryset.update(is_valid=False)
 
 	@atomic
 	def save(self, reports: BaseReportMonth):
 		try:
 			if reports:
 				self._invalidate_positions(reports.get_first())
-			for month in reports:
-				report: BaseReport = reports[month]
-				# só salva para relatório fechado (mês completo)
-				if not report.is_closed:
-					continue
-				for asset in report.get_results():
-					# ignora ativo não cadastrado ou com posição zerada
-					if asset.buy.quantity <= 0 or asset.instance is None:
-						continue
-					self.save_position(report, asset)
+				self.save_positions(reports)
 		except Exception as exc:
 			self.message_user(f"Falha ao salvar posições: {exc}", level="error")
 		else:
@@ -265,12 +371,16 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 	brokerage_note_negotiation = Negotiation
 	brokerage_note_asset_model = Asset
 	brokerage_note_field_update = ()
+	brokerage_note_cache_class = ParsedNotesCache
 
 	def init_request(self, *args, **kwargs):
 		return bool(len(self.brokerage_note_field_update))
 
 	def setup(self, *args, **kwargs):
 		self._cache = Cache()
+		# análises de notas da requisição (validação e salvamento) pelo sha256 do arquivo
+		self._parsed_notes = {}
+		self.brokerage_note_cache = self.brokerage_note_cache_class()
 
 	def block_submit_more_btns(self, context, nodes):
 		return render_to_string("irpf/blocks/blocks.form.save_transactions.html")
@@ -297,34 +407,39 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 	def _get_institution(self, parser: BaseBrokerageNoteParser) -> Institution:
 		"""Obtém e retorna a instituição (corretora) com base no 'parser' usado"""
 		cnpj = self._get_cnpj_from_parser(type(parser))
-		# remove formatação do texto
-		institution = Institution.objects.annotate(
-			cnpj_nums=RegexReplace('cnpj',
-			                       Value(r'[^\d]'),
-			                       Value('')
-			                       ),
-		).get(
-			cnpj_nums=cnpj,
-		)
-		return institution
+		# cnpj sem formatação (coluna indexada)
+		return Institution.objects.get(cnpj_digits=cnpj)
 
-	@atomic
-	def _parser_and_update(self, instance: IrpfBrokerageNote) -> list[BrokerageNote]:
-		"""Atualiza a instância com os dados da nota"""
-		notes = []
+	def _get_parser(self, note_file) -> tuple[str, BaseBrokerageNoteParser]:
+		"""O 'parser' do arquivo da nota (um por conteúdo na requisição)"""
 		try:
-			factory = self._get_parser_factory(io.BytesIO(instance.note.read()))
+			content = note_file.read()
 		finally:
-			instance.note.seek(0)
+			note_file.seek(0)
+		digest = get_digest(content)
+		if (parsed := self._parsed_notes.get(digest)) is None:
+			factory = self._get_parser_factory(brokerage_note=io.BytesIO(content))
+			parsed = self._parsed_notes[digest] = {'parser': factory.get_parser()}
+		return digest, parsed['parser']
+
+	def _get_notes(self, digest: str) -> list[BrokerageNote]:
+		"""As notas do arquivo (a análise do pdf é feita uma única vez e guardada no cache persistente)"""
+		parsed = self._parsed_notes[digest]
+		if (notes := parsed.get('notes')) is None:
+			notes = parsed['notes'] = self.brokerage_note_cache.parse(digest, parsed['parser'])
+		return notes
 
-		parser = factory.get_parser()
+	@atomic
+	def _parser_and_update(self, instance: IrpfBrokerageNote) -> list[BrokerageNote]:
+		"""Atualiza a instância com os dados da nota"""
+		digest, parser = self._get_parser(instance.note)
 		if instance.institution_id is None:
 			instance.institution = self._get_institution(parser)
 
-		for note in parser.parse_brokerage_note():
+		notes = self._get_notes(digest)
+		for note in notes:
 			for field_name in self.brokerage_note_field_update:
 				setattr(instance, field_name, getattr(note, field_name))
-			notes.append(note)
 		return notes
 
 	def get_asset(self, ticker: str):
@@ -347,25 +462,42 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 			self._cache.set(name, asset)
 		return asset
 
-	def _save_transaction(self, transaction: Transaction, instance, **options) -> Negotiation:
-		"""Cria uma nova 'transaction' com os dados da nota"""
+	def _get_transaction(self, transaction: Transaction, instance, **options) -> Negotiation:
+		"""Nova negociação (não salva) com os dados da nota"""
 		ticker = options['code']
-		options.update(
+		negotiation = self.brokerage_note_negotiation(
 			date=instance.reference_date,
 			quantity=transaction.amount,
 			price=transaction.unit_price,
+			total=transaction.amount * transaction.unit_price,
 			brokerage_note=instance,
 			irrf=transaction.source_withheld_taxes,
 			institution_name=instance.institution.name,
 			asset=self.get_asset(ticker),
-			user=self.user
+			user=self.user,
+			**options
 		)
-		defaults = options.setdefault('defaults', {})
-		defaults['total'] = transaction.amount * transaction.unit_price
-		obj, created = self.brokerage_note_negotiation.objects.get_or_create(**options)
-		if created:
-			self.set_guardian_object_perms(obj)
-		return obj
+		# o bulk_create não passa pelo 'save' do modelo
+		negotiation.fingerprint = negotiation.get_fingerprint()
+		return negotiation
+
+	@staticmethod
+	def _clear_duplicate_fingerprints(model, negotiations: list):
+		"""Duplicatas (impressão digital já gravada, ex.: importada da planilha) ficam sem a impressão digital,
+		como no 'save' do modelo (FingerprintModelMixin).
+		"""
+		keys = set(model.objects.filter(
+			fingerprint__in=[negotiation.fingerprint for negotiation in negotiations]
+		).values_list('fingerprint', flat=True))
+		for negotiation in negotiations:
+			if negotiation.fingerprint in keys:
+				negotiation.fingerprint = None
+			else:
+				keys.add(negotiation.fingerprint)
+
+	def get_transaction_key(self, code: str, kind: str, quantity) -> tuple:
+		"""Chave (sem diferenciar maiúsculas) usada para relacionar as negociações com as transações da nota"""
+		return code.upper(), kind.lower(), Decimal(quantity)
 
 	def _get_transaction_type(self, transaction: Transaction) -> str:
 		# filtro para a categoria de transação
@@ -413,7 +545,7 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 		return results
 
 	def _add_transactions(self, note: BrokerageNote, instance):
-		queryset = self.brokerage_note_negotiation.objects.all()
+		model = self.brokerage_note_negotiation
 		tax = sum([note.settlement_fee,
 		           note.term_fee,
 		           note.ana_fee,
@@ -428,32 +560,41 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 		paid = sum([(transaction.amount * transaction.unit_price)
 		            for ticker, transaction in transaction_groups])
 
+		# negociações do dia na corretora (uma consulta para todas as transações)
+		negotiations = collections.defaultdict(list)
+		for negotiation in model.objects.filter(date=instance.reference_date,
+		                                        institution_name=instance.institution.name,
+		                                        user=self.user):
+			key = self.get_transaction_key(negotiation.code, negotiation.kind, negotiation.quantity)
+			negotiations[key].append(negotiation)
+
+		created, updated = [], []
 		for ticker, transaction in transaction_groups:
 			if (kind := self._get_transaction_type(transaction)) is None:
 				continue
 			# rateio de taxas proporcional ao valor pago
 			avg_tax = MoneyLC(tax * ((transaction.amount * transaction.unit_price) / paid))
-			qs = queryset.filter(
-				date=instance.reference_date,
-				code__iexact=ticker,
-				kind__iexact=kind,
-				quantity=transaction.amount,
-				institution_name=instance.institution.name,
-				user=self.user
-			)
-			if self.is_save_transactions and not qs.exists():
-				self._save_transaction(
-					transaction, instance,
-					code=ticker,
-					kind=kind,
-					defaults={'tax': avg_tax}
-				)
+			matches = negotiations.get(self.get_transaction_key(ticker, kind, transaction.amount), ())
+			if self.is_save_transactions and not matches:
+				created.append(self._get_transaction(transaction, instance,
+				                                     code=ticker,
+				                                     kind=kind,
+				                                     tax=avg_tax))
 			else:
-				for negotiation in qs:
-					update_defaults(negotiation, {
-						'brokerage_note': instance,
-						'tax': avg_tax,
-					})
+				for negotiation in matches:
+					if negotiation.brokerage_note_id != instance.pk or negotiation.tax != avg_tax:
+						negotiation.brokerage_note = instance
+						negotiation.tax = avg_tax
+						updated.append(negotiation)
+		if created:
+			self._clear_duplicate_fingerprints(model, created)
+			model.objects.bulk_create(created)
+			self.set_guardian_objects_perms(model, model.objects.filter(brokerage_note=instance))
+		if updated:
+			model.objects.bulk_update(updated, self.get_concrete_fields(model, ('brokerage_note', 'tax')))
+		if created or updated:
+			# o bulk_create/update não passa pelo 'save' do modelo
+			ReportDirtyMonth.register(self.user.pk, [instance.reference_date])
 
 	def _get_parser_factory(self, brokerage_note: io.BytesIO) -> ParserFactory:
 		"""Retorna o 'factory' de notas"""
@@ -466,13 +607,8 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 			self.admin_view.save_forms()
 			new_obj = self.admin_view.new_obj
 			cleaned_data = self.admin_view.form_obj.cleaned_data
-			note_file = cleaned_data['note']
-			try:
-				factory = self._get_parser_factory(brokerage_note=io.BytesIO(note_file.read()))
-			finally:
-				note_file.seek(0)
-
-			parser = factory.get_parser()
+			# a análise é reaproveitada no salvamento (save_models)
+			digest, parser = self._get_parser(cleaned_data['note'])
 			if new_obj.institution_id is None:
 				try:
 					new_obj.institution = self._get_institution(parser)
@@ -487,7 +623,7 @@ class BrokerageNoteAdminPlugin(GuardianAdminPluginMixin):
 					self.message_user(mark_safe(f"{escape(Institution._meta.verbose_name)} cnpj '{url}' ainda cadastrada!"),
 					                  level='error')
 					return False
-			for note in parser.parse_brokerage_note():
+			for note in self._get_notes(digest):
 				new_obj.reference_date = note.reference_date
 				new_obj.reference_id = note.reference_id
 				new_obj.user = self.user
@@ -527,6 +663,9 @@ class ReportStatsAdminPlugin(ReportBaseAdminPlugin):
 	statistic_model = Statistic
 	position_model = Position
 	asset_model = Asset
+	taxes_model = Taxes
+	profile_phase = "save_stats"
+	statistic_fields = ('residual_taxes', 'cumulative_losses', 'valid')
 
 	def setup(self, *args, **kwargs):
 		super().setup(*args, **kwargs)
@@ -538,7 +677,8 @@ class ReportStatsAdminPlugin(ReportBaseAdminPlugin):
 			if self.is_save_position:
 				# remove os dados salvos para o meses antes do recalculo.
 				self._invalidate_stats(reports.get_first())
-			self.admin_view.stats = self.get_stats(reports)
+			with self.get_profiler().phase('stats'):
+				self.admin_view.stats = self.get_stats(reports)
 		return super().report_generate(reports, form)
 
 	def _invalidate_stats(self, report: BaseReport):
@@ -554,59 +694,75 @@ class ReportStatsAdminPlugin(ReportBaseAdminPlugin):
 			consolidation=consolidation,
 		).update(valid=False)
 
-	def save_stats(self, report: BaseReport, stats: StatsReport):
-		"""Salva dados de estatística"""
-		institution = report.get_opts('institution', None)
-		consolidation = report.get_opts('consolidation')
-		end_date = report.get_opts('end_date')
-
-		stats_results = stats.get_results()
-		for category_name in stats_results:
-			stats_category: Stats = stats_results[category_name]
-			category = self.asset_model.get_category_by_name(category_name)
-			defaults = {
-				'residual_taxes': stats_category.taxes.residual,
-				'cumulative_losses': stats_category.cumulative_losses,
-				'valid': True
-			}
-			instance, created = self.statistic_model.objects.get_or_create(
-				category=category,
-				consolidation=consolidation,
-				institution=institution,
-				date=end_date,
-				user=self.user,
-				defaults=defaults
-			)
-			if created:
-				self.set_guardian_object_perms(instance)
-			elif self._update_defaults(instance, defaults):
-				...
-			if stats_category.taxes.paid:
-				# configura a data do pagamento do valor de imposto cadastrado pelo usuário
-				for taxes in stats_category.taxes.items:
-					taxes.pay_date = end_date
-					taxes.paid = True
-					taxes.save()
-				stats_category.taxes.items.clear()
-			elif stats_category.taxes.items:
-				# imposto cadastrado pelo usuário
-				instance.taxes_set.add(*stats_category.taxes.items)
+	def get_statistic(self, report: BaseReport, category_name: str, stats_category: Stats) -> Statistic:
+		"""Estatística (não salva) da categoria na data final do relatório"""
+		return self.statistic_model(
+			category=self.asset_model.get_category_by_name(category_name),
+			consolidation=report.get_opts('consolidation'),
+			institution=report.get_opts('institution', None),
+			date=report.get_opts('end_date'),
+			user=self.user,
+			residual_taxes=stats_category.taxes.residual.money,
+			cumulative_losses=stats_category.cumulative_losses.money,
+			valid=True
+		)
 
-	@atomic
-	def save(self, reports: BaseReportMonth):
-		if not self.admin_view.stats:
-			return
+	def save_stats(self, reports: BaseReportMonth):
+		"""Salva (em massa) os dados de estatística de todos os meses fechados"""
+		statistics, taxes_paid, taxes_stats = {}, {}, []
 		for month in reports:
 			report: BaseReport = reports[month]
 			# só salva para relatório fechado (mês completo)
 			if not report.is_closed:
 				continue
-			stats = self.admin_view.stats[month]
-			self.save_stats(report, stats)
+			end_date = report.get_opts('end_date')
+			stats_results = self.admin_view.stats[month].get_results()
+			for category_name in stats_results:
+				stats_category: Stats = stats_results[category_name]
+				instance = self.get_statistic(report, category_name, stats_category)
+				key = (instance.category, instance.date)
+				statistics[key] = instance
+				if stats_category.taxes.paid:
+					# configura a data do pagamento do valor de imposto cadastrado pelo usuário
+					for taxes in stats_category.taxes.items:
+						taxes.pay_date = end_date
+						taxes.paid = True
+						taxes_paid[taxes.pk] = taxes
+					stats_category.taxes.items.clear()
+				elif stats_category.taxes.items:
+					# imposto cadastrado pelo usuário
+					taxes_stats.extend((key, taxes) for taxes in stats_category.taxes.items)
+		if not statistics:
+			return
+		first = reports.get_first()
+		queryset = self.statistic_model.objects.filter(
+			user=self.user,
+			date__in={instance.date for instance in statistics.values()},
+			institution=first.get_opts('institution', None),
+			consolidation=first.get_opts('consolidation')
+		)
+		self.bulk_upsert(queryset, statistics, lambda obj: (obj.category, obj.date),
+		                 self.statistic_fields)
+		if taxes_paid:
+			self.taxes_model.objects.bulk_update(taxes_paid.values(), ['pay_date', 'paid'],
+			                                     batch_size=self.bulk_batch_size)
+		if taxes_stats:
+			saved = {(obj.category, obj.date): obj.pk for obj in queryset.all()}
+			through = self.taxes_model.stats.through
+			through.objects.bulk_create([
+				through(taxes_id=taxes.pk, statistic_id=saved[key])
+				for key, taxes in taxes_stats
+			], batch_size=self.bulk_batch_size, ignore_conflicts=True)
+
+	@atomic
+	def save(self, reports: BaseReportMonth):
+		if not self.admin_view.stats:
+			return
+		self.save_stats(reports)
 
 	def get_stats(self, reports: BaseReportMonth):
 		"""Gera dados estatísticos"""
-		stats = self.stats_reports_class(self.user, reports)
+		stats = self.stats_reports_class(self.user, reports, profiler=self.get_profiler())
 		# gera dados de estatística para cada relatório mensal
 		stats.generate()
 		return stats
@@ -5,12 +5,22 @@ from irpf.utils import MonthYearDates
 
 
 class Base:
+	# opções de execução que não são armazenadas com o relatório (pickle)
+	transient_options = ()
+
 	def __init__(self, user, **options):
 		self.user = user
 		self.options = options
 		self.cache = Cache()
 		self.results = []
 
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		state['options'] = {name: value for name, value in self.options.items()
+		                    if name not in self.transient_options}
+		state['cache'] = Cache()
+		return state
+
 	def get_results(self):
 		return self.results
 
@@ -1,3 +1,6 @@
+from django.core.cache import caches
+
+
 class EmptyCacheError(KeyError):
 	...
 
@@ -25,3 +28,87 @@ class Cache:
 
 	def clear(self):
 		self._cache.clear()
+
+
+class AssetCatalog:
+	"""Catálogo de ativos carregado uma única vez e indexado pelo código normalizado.
+	É recarregado quando algum ativo é salvo (versão do catálogo no modelo).
+	"""
+
+	def __init__(self, model):
+		self.model = model
+		self._assets = None
+		self._version = None
+
+	@staticmethod
+	def normalize(code: str) -> str:
+		return code.strip().upper()
+
+	def load(self) -> dict:
+		queryset = self.model.objects.select_related('bookkeeping', 'administrator')
+		self._version = self.model.catalog_version
+		self._assets = {self.normalize(asset.code): asset for asset in queryset}
+		return self._assets
+
+	@property
+	def assets(self) -> dict:
+		if self._assets is None or self._version != self.model.catalog_version:
+			self.load()
+		return self._assets
+
+	def get(self, code: str):
+		"""Retorna o ativo com o código ou None"""
+		return self.assets.get(self.normalize(code))
+
+	def __contains__(self, code: str):
+		return self.normalize(code) in self.assets
+
+
+class MonthsCache:
+	"""Cache persistente (django cache) dos relatórios mensais já calculados.
+	Um mês é reaproveitado enquanto nenhum registro do usuário que o afete ('dirty_model') for alterado
+	depois do seu cálculo. Os meses seguintes a um mês inválido são sempre recalculados.
+	Usa o cache 'reports' (settings.CACHES), que deve ser persistente e compartilhado entre processos.
+	"""
+	timeout = 60 * 60 * 24 * 30
+
+	def __init__(self, user, dirty_model, months_range: list, key_prefix: str, cache_alias: str = 'reports'):
+		self.user = user
+		self.dirty_model = dirty_model
+		self.months_range = months_range
+		self.key_prefix = key_prefix
+		self.cache = caches[cache_alias]
+
+	def get_key(self, start_date, end_date) -> str:
+		# o mês inicial faz parte da chave porque somente ele usa a posição salva
+		first_date = self.months_range[0][0]
+		return (f"irpf:{self.user.pk}:{self.key_prefix}:{first_date.isoformat()}:"
+		        f"{start_date.isoformat()}:{end_date.isoformat()}")
+
+	def get_many(self) -> dict:
+		"""Relatórios válidos do início do intervalo (até o primeiro mês alterado)"""
+		keys = [self.get_key(start_date, end_date) for start_date, end_date in self.months_range]
+		entries = self.cache.get_many(keys)
+		if not entries:
+			return {}
+		changed = min(computed for computed, report in entries.values())
+		changes = list(self.dirty_model.objects.filter(
+			user=self.user,
+			changed__gt=changed
+		).values_list('date', 'position', 'changed'))
+		reports = {}
+		for index, key in enumerate(keys):
+			if (entry := entries.get(key)) is None:
+				break
+			computed, report = entry
+			start_date = self.months_range[index][0]
+			if any((date == start_date and index == 0) if position else (date <= start_date)
+			       for date, position, date_changed in changes
+			       if date_changed > computed):
+				break
+			reports[start_date] = report
+		return reports
+
+	def set(self, start_date, end_date, report, computed):
+		"""Armazena o relatório do mês calculado a partir de 'computed'"""
+		self.cache.set(self.get_key(start_date, end_date), (computed, report), self.timeout)
@@ -1,17 +1,30 @@
 import datetime
 from collections import OrderedDict
 
+from django.db.models import Sum
+from django.db.models.functions import Trim, Upper
+
 from irpf.models import Asset, Earnings
 from irpf.report.base import BaseReport, BaseReportMonth
+from irpf.report.cache import AssetCatalog
 from irpf.report.utils import Assets, Event
 
 
 class EarningsReport(BaseReport):
 	asset_model = Asset
+	transient_options = ('asset_catalog',)
+	# totais calculados pelo banco de dados (os registros são carregados sob demanda)
+	aggregate = True
 
 	def __init__(self, model, user, **options):
 		super().__init__(model, user, **options)
 
+	def get_asset_catalog(self) -> AssetCatalog:
+		"""Catálogo de ativos compartilhado pelos meses do relatório"""
+		if (catalog := self.options.get('asset_catalog')) is None:
+			catalog = self.options['asset_catalog'] = AssetCatalog(self.asset_model)
+		return catalog
+
 	def consolidate(self, instance: Earnings, asset: Assets):
 		obj = getattr(asset, "credit" if instance.is_credit else "debit")
 		kind_slug = instance.kind_slug
@@ -24,6 +37,19 @@ class EarningsReport(BaseReport):
 		event.quantity += instance.quantity
 		event.value += instance.total
 
+	def consolidate_totals(self, totals: dict, asset: Assets):
+		"""Totais (SUM/GROUP BY) de um tipo de movimentação do ativo"""
+		is_credit = totals['flow'].lower() == self.model.FLOW_CREDIT.lower()
+		obj = getattr(asset, "credit" if is_credit else "debit")
+		kind_slug = self.model.get_kind_slug(totals['kind'])
+		try:
+			event = obj[kind_slug]
+		except KeyError:
+			obj[kind_slug] = event = Event(totals['kind'])
+
+		event.quantity += totals['quantity_sum']
+		event.value += totals['total_sum']
+
 	def get_queryset(self, start_date: datetime.date, end_date: datetime.date, **options):
 		qs_options = dict(
 			user=self.user,
@@ -38,28 +64,62 @@ class EarningsReport(BaseReport):
 		queryset = self.model.objects.filter(**qs_options)
 		return queryset
 
+	def get_code_queryset(self, start_date: datetime.date, end_date: datetime.date, **options):
+		"""Registros com o código normalizado (mesma chave do catálogo de ativos)"""
+		return self.get_queryset(start_date, end_date, **options).annotate(
+			code_key=Upper(Trim('code'))
+		)
+
+	def get_totals_queryset(self, start_date: datetime.date, end_date: datetime.date, **options):
+		"""Quantidade e valor somados por ativo, fluxo e tipo de movimentação"""
+		total_field = self.model._meta.get_field('total').amount_field
+		queryset = self.get_code_queryset(start_date, end_date, **options).values(
+			'code_key', 'flow', 'kind'
+		).annotate(
+			quantity_sum=Sum('quantity'),
+			total_sum=Sum(total_field.name)
+		).order_by()
+		return queryset
+
+	def get_items(self, code: str, flow: str, kind_slug: str,
+	              start_date: datetime.date, end_date: datetime.date, **options) -> list:
+		"""Registros de um tipo de movimentação do ativo (carregados sob demanda)"""
+		options.setdefault('categories', ())
+		queryset = self.get_code_queryset(start_date, end_date, **options).filter(
+			code_key=AssetCatalog.normalize(code),
+			flow__iexact=flow
+		).order_by('date', 'pk')
+		return [instance for instance in queryset if instance.kind_slug == kind_slug]
+
 	def generate(self, start_date: datetime.date, end_date: datetime.date, **options):
 		self.options.setdefault('start_date', start_date)
 		self.options.setdefault('end_date', end_date)
 		self.options.update(**options)
 		institution = options.get('institution')
-		asset = options.get('asset')
+		catalog = self.get_asset_catalog()
 		assets = {}
-		if asset:
-			options['asset'] = asset
-			assets[asset.code] = Assets(ticker=asset.code,
-			                            institution=institution,
-			                            instance=asset)
-			for obj in self.get_queryset(start_date, end_date, **options):
-				self.consolidate(obj, assets[asset.code])
+
+		def get_asset(code: str):
+			"""Agrupa pelo código do provento (o ativo é resolvido pelo catálogo)"""
+			if (instance := catalog.get(code)) is None:
+				# sem ativo cadastrado com o código
+				return None
+			if (_asset := assets.get(instance.code)) is None:
+				_asset = assets[instance.code] = Assets(ticker=instance.code,
+				                                        institution=institution,
+				                                        instance=instance)
+			return _asset
+
+		if self.options.get('aggregate', self.aggregate):
+			# totais agrupados pelo banco de dados
+			for totals in self.get_totals_queryset(start_date, end_date, **options):
+				if (_asset := get_asset(totals['code_key'])) is not None:
+					self.consolidate_totals(totals, _asset)
 		else:
-			for asset in self.asset_model.objects.all():
-				assets[asset.code] = Assets(ticker=asset.code,
-				                            institution=institution,
-				                            instance=asset)
-				options['asset'] = asset
-				for obj in self.get_queryset(start_date, end_date, **options):
-					self.consolidate(obj, assets[asset.code])
+			# uma única consulta no período (agrupada por ativo em memória)
+			for obj in self.get_queryset(start_date, end_date, **options):
+				if (_asset := get_asset(obj.code)) is not None:
+					self.consolidate(obj, _asset)
 
 		# atualização resultados
 		self.results.clear()
@@ -80,6 +140,8 @@ class EarningsReportMonth(BaseReportMonth):
 			[(start_date, end_date, ...)]
 		"""
 		self.options.update(**options)
+		# ativos carregados uma única vez para todos os meses
+		self.options.setdefault('asset_catalog', AssetCatalog(self.report_class.asset_model))
 
 		for start_date, end_date in months_range:
 			report = self.report_class(self.user, self.model)
@@ -2,12 +2,19 @@ import calendar
 import datetime
 from collections import OrderedDict
 from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+
 from irpf.models import Asset, Earnings, Bonus, Position, AssetEvent, Subscription, BonusInfo, \
-	AssetConvert, AssetRefund
+	AssetConvert, AssetRefund, ReportDirtyMonth, AssetCatalogVersion
 from irpf.report.base import BaseReport, BaseReportMonth
-from irpf.report.cache import EmptyCacheError
-from irpf.report.utils import Event, Assets, Buy, MoneyLC, OrderedDictResults
-from irpf.utils import range_dates, update_defaults
+from irpf.report.cache import AssetCatalog, MonthsCache
+from irpf.report.profiler import null_profiler, NullProfiler
+from irpf.report.timeline import Timeline
+from irpf.report.utils import Event, Assets, Buy, Fixed, OrderedDictResults
+from irpf.utils import update_defaults
 
 
 class NegotiationReport(BaseReport):
@@ -20,18 +27,42 @@ class NegotiationReport(BaseReport):
 	subscription_model = Subscription
 	bonus_model = Bonus
 	bonus_info_model = BonusInfo
+	# ordem de aplicação dos registros de uma mesma data
+	timeline_kinds = (
+		'asset_convert',
+		'bonus',
+		'subscription',
+		'refund',
+		'negotiation',
+		'earnings',
+		'events',
+		'bonus_registry'
+	)
+	transient_options = ('timeline', 'asset_catalog', 'assets_position', 'profiler')
 
 	def __init__(self, *args, **kwargs):
 		super().__init__(*args, **kwargs)
 		self.assets = {}
+		self.timeline: Timeline = None
+
+	def __getstate__(self):
+		state = super().__getstate__()
+		state['timeline'] = None
+		return state
+
+	def get_profiler(self) -> NullProfiler:
+		"""Perfil de tempo/consultas das fases do relatório (desativado por padrão)"""
+		return self.options.get('profiler') or null_profiler
+
+	def get_asset_catalog(self) -> AssetCatalog:
+		"""Catálogo de ativos compartilhado pelo relatório (carregado uma única vez)"""
+		if (catalog := self.options.get('asset_catalog')) is None:
+			catalog = self.options['asset_catalog'] = AssetCatalog(self.asset_model)
+		return catalog
 
 	def get_asset(self, code: str) -> Asset:
-		"""Retorna o registro do ativo (vindo do banco de dados)"""
-		try:
-			asset = self.asset_model.objects.get(code__iexact=code)
-		except self.asset_model.DoesNotExist:
-			asset = None
-		return asset
+		"""Retorna o registro do ativo (vindo do catálogo de ativos)"""
+		return self.get_asset_catalog().get(code)
 
 	def get_assets(self, ticker: str, instance: Asset = None, institution=None, **options):
 		"""Retorna o registro de asset (agrupamentos de todas as negociações)"""
@@ -70,25 +101,17 @@ class NegotiationReport(BaseReport):
 		"""Atualiza, se necessário a instância com valores padrão"""
 		return update_defaults(instance, defaults)
 
-	def get_bonus_registry_by_date(self, **options) -> dict:
-		"""Agrupamento de todos os registros de bônus no intervalo pela data"""
-		try:
-			return self.cache.get('bonus_registry_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('bonus_registry_by_date', {})
+	def get_bonus_registry_queryset(self, **options):
+		"""Registros de bônus do intervalo (pela 'data com')"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date_com__range'] = [options['start_date'],
 		                                 options['end_date']]
-		for instance in self.bonus_model.objects.filter(**qs_options):
-			by_date.setdefault(instance.date_com, []).append(instance)
-		return by_date
+		queryset = self.bonus_model.objects.filter(**qs_options)
+		# o histórico (BonusInfo) já registrado é carregado com o bônus (registry_bonus)
+		return queryset.select_related('asset', 'bonusinfo').order_by('date_com', 'pk')
 
-	def get_bonus_by_date(self, **options) -> dict:
-		"""Cache dos bônus registrados para a data de incorporação"""
-		try:
-			return self.cache.get('bonus_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('bonus_by_date', {})
+	def get_bonus_info_queryset(self, **options):
+		"""Bônus registrados do intervalo (pela data de incorporação)"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['bonus__date__range'] = [options['start_date'],
 		                                    options['end_date']]
@@ -97,248 +120,213 @@ class NegotiationReport(BaseReport):
 		if categories := qs_options.pop('asset__category__in', None):
 			qs_options['bonus__asset__category__in'] = categories
 		queryset = self.bonus_info_model.objects.filter(**qs_options)
-		queryset = queryset.select_related("bonus")
-		for instance in queryset:
-			by_date.setdefault(instance.bonus.date, []).append(instance)
-		return by_date
+		return queryset.select_related("bonus", "bonus__asset").order_by('bonus__date', 'pk')
 
-	def add_bonus(self, date, **options):
+	def add_bonus(self, bonus_info: BonusInfo, **options):
 		"""Adiciona ações bonificadas na data considerando o histórico"""
-		bonus_by_date = self.get_bonus_by_date(**options)
-		for bonus_info in bonus_by_date.get(date, ()):
-			bonus = bonus_info.bonus
-			asset = self.get_assets(bonus.asset.code,
-			                        instance=bonus.asset,
-			                        institution=options.get('institution'))
-			# ignora os registros que já foram contabilizados na posição
-			if asset.is_position_interval(bonus.date):
-				continue
+		bonus = bonus_info.bonus
+		# o registro foi substituído por uma versão atualizada (registry_bonus)
+		if self.timeline.is_replaced('bonus', bonus.pk, bonus_info):
+			return
+		asset = self.get_assets(bonus.asset.code,
+		                        instance=bonus.asset,
+		                        institution=options.get('institution'))
+		# ignora os registros que já foram contabilizados na posição
+		if asset.is_position_interval(bonus.date):
+			return
 
-			# rebalanceando a carteira
-			if active := bonus_info.quantity > 0:
-				asset.buy.quantity += bonus_info.quantity
-				asset.buy.total += bonus_info.total
-				# total recebido de bônus que precisa ser declarado
-				asset.bonus.quantity += bonus_info.quantity
-				asset.bonus.value += bonus_info.total
-
-			try:
-				events = asset.events['bonus']
-			except KeyError:
-				events = asset.events['bonus'] = []
-
-			_events = []
-			for event in events:
-				if event['bonus_info'] == bonus_info:
-					event['active'] = active
-					_events.append(event)
-					break
-
-			# um evento proveniente do registro já existe
-			if not _events:
-				event = Event("Valor da bonificação",
-				              quantity=bonus_info.quantity,
-				              value=bonus_info.total)
-				events.append({
-					'instance': bonus,
-					'active': active,
-					'bonus_info': bonus_info,
-					'event': event
-				})
+		# rebalanceando a carteira
+		if active := bonus_info.quantity > 0:
+			asset.buy.quantity += bonus_info.quantity
+			asset.buy.total += bonus_info.total
+			# total recebido de bônus que precisa ser declarado
+			asset.bonus.quantity += bonus_info.quantity
+			asset.bonus.value += bonus_info.total
 
-	def registry_bonus(self, date, **options):
-		"""Adiciona ações bonificadas na data considerando o histórico"""
-		bonus_by_date = self.get_bonus_registry_by_date(**options)
-		for bonus in bonus_by_date.get(date, ()):
-			asset = self.get_assets(bonus.asset.code,
-			                        instance=bonus.asset,
-			                        institution=options.get('institution'))
-			# ignora os registros que já foram contabilizados na posição
-			if asset.is_position_interval(bonus.date):
-				continue
-			try:
-				events = asset.events['bonus']
-			except KeyError:
-				events = asset.events['bonus'] = []
-
-			# valor e quantidade dos valores recebidos de bonificação
-			quantity = asset.buy.quantity * (bonus.proportion / 100)
-			bonus_quantity = int(quantity)
-			bonus_value = bonus_quantity * bonus.base_value
-			defaults = {
-				'from_quantity': asset.buy.quantity,
-				'from_total': asset.buy.total,
-				'quantity': bonus_quantity,
-				'total': bonus_value,
-				'user': self.user
-			}
-			bonus_info, created = self.bonus_info_model.objects.get_or_create(
-				bonus=bonus,
-				defaults=defaults
-			)
-			if created:
-				# sempre é necessário limpar o cache para garantir que esse novo registro vai ser calculado no futuro
-				self.cache.remove('bonus_by_date')
-			# atualiza os dados sempre que necessário
-			elif self._update_defaults(bonus_info, defaults):
-				# sempre é necessário limpar o cache para garantir que esse novo registro vai ser calculado no futuro
-				self.cache.remove('bonus_by_date')
+		try:
+			events = asset.events['bonus']
+		except KeyError:
+			events = asset.events['bonus'] = []
+
+		_events = []
+		for event in events:
+			if event['bonus_info'] == bonus_info:
+				event['active'] = active
+				_events.append(event)
+				break
 
+		# um evento proveniente do registro já existe
+		if not _events:
 			event = Event("Valor da bonificação",
-			              quantity=quantity,
-			              value=bonus_value)
+			              quantity=bonus_info.quantity,
+			              value=bonus_info.total)
 			events.append({
 				'instance': bonus,
+				'active': active,
 				'bonus_info': bonus_info,
-				'active': False,
 				'event': event
 			})
 
-	def get_subscription_by_date(self, **options) -> dict:
-		"""Agrupamento de todos os registros de subscrição pela 'data com'"""
+	def registry_bonus(self, bonus: Bonus, **options):
+		"""Adiciona ações bonificadas na data considerando o histórico"""
+		asset = self.get_assets(bonus.asset.code,
+		                        instance=bonus.asset,
+		                        institution=options.get('institution'))
+		# ignora os registros que já foram contabilizados na posição
+		if asset.is_position_interval(bonus.date):
+			return
 		try:
-			return self.cache.get('subscription_registry_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('subscription_registry_by_date', {})
+			events = asset.events['bonus']
+		except KeyError:
+			events = asset.events['bonus'] = []
+
+		# valor e quantidade dos valores recebidos de bonificação
+		quantity = asset.buy.quantity * (bonus.proportion / 100)
+		bonus_quantity = int(quantity)
+		bonus_value = bonus_quantity * bonus.base_value
+		defaults = {
+			'from_quantity': asset.buy.quantity,
+			'from_total': asset.buy.total.money,
+			'quantity': bonus_quantity,
+			'total': bonus_value,
+			'user': self.user
+		}
+		try:
+			bonus_info, created = bonus.bonusinfo, False
+		except self.bonus_info_model.DoesNotExist:
+			bonus_info, created = self.bonus_info_model.objects.get_or_create(
+				bonus=bonus,
+				defaults=defaults
+			)
+		# sempre é necessário agendar o registro novo (ou atualizado) para que seja calculado no futuro
+		if (created or self._update_defaults(bonus_info, defaults)) and bonus.date > bonus.date_com:
+			self.timeline.replace('bonus', bonus.pk, bonus.date, bonus_info)
+
+		event = Event("Valor da bonificação",
+		              quantity=quantity,
+		              value=bonus_value)
+		events.append({
+			'instance': bonus,
+			'bonus_info': bonus_info,
+			'active': False,
+			'event': event
+		})
+
+	def get_subscription_queryset(self, **options):
+		"""Registros de subscrição do intervalo (pela data de incorporação)"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date__range'] = [options['start_date'], options['end_date']]
-		for instance in self.subscription_model.objects.filter(**qs_options):
-			by_date.setdefault(instance.date, []).append(instance)
-		return by_date
-
-	def add_subscription(self, date, **options):
+		queryset = self.subscription_model.objects.filter(**qs_options)
+		# negociações dos recibos carregadas com as subscrições (uma consulta para todo o intervalo)
+		negotiations = self.model.objects.select_related('asset').order_by('date', 'pk')
+		queryset = queryset.prefetch_related(Prefetch('negotiation_set', queryset=negotiations))
+		# mesma ordem do modelo (subscrições do mesmo dia), com a chave primária para desempate
+		return queryset.select_related('asset').order_by('date', '-created', 'pk')
+
+	def add_subscription(self, subscription: Subscription, **options):
 		"""Adiciona ativos da subscrição na data da incorporação (composição do preço médio)"""
-		subscription_by_date = self.get_subscription_by_date(**options)
-		for subscription in subscription_by_date.get(date, ()):
-			asset = self.get_assets(subscription.asset.code,
-			                        instance=subscription.asset,
-			                        institution=options.get('institution'))
-			# ignora os registros que já foram contabilizados na posição
-			if asset.is_position_interval(subscription.date):
-				continue
+		asset = self.get_assets(subscription.asset.code,
+		                        instance=subscription.asset,
+		                        institution=options.get('institution'))
+		# ignora os registros que já foram contabilizados na posição
+		if asset.is_position_interval(subscription.date):
+			return
 
-			subscription_assets = OrderedDict()
-			for instance in subscription.negotiation_set.all().order_by('date'):
-				if (subscription_asset := subscription_assets.get(instance.code)) is None:
-					subscription_asset = Assets(ticker=instance.code,
-					                            institution=options.get('institution'),
-					                            instance=(instance or self.get_asset(instance.code)))
-					subscription_assets[instance.code] = subscription_asset
-
-				subscription_asset.items.append(instance)
-				self.consolidate(instance, subscription_asset)
-
-			for subscription_asset in subscription_assets.values():
-				if subscription_asset.buy.quantity > 0:
-					# rebalanceando a carteira
-					asset.buy.quantity += subscription_asset.buy.quantity
-					asset.buy.total += subscription_asset.buy.total
-					asset.items.extend(subscription_asset.items)
-					# o ativo deixar se existir porque foi incorporado
-					if _subscription_asset := self.assets.get(subscription_asset.ticker):
-						# zera o histórico de compras
-						_subscription_asset.empty()
-					try:
-						events = asset.events['subscription']
-					except KeyError:
-						events = asset.events['subscription'] = []
-
-					event = Event("Subscrição",
-					              quantity=subscription_asset.buy.quantity,
-					              value=subscription_asset.buy.total)
-					events.append({
-						'subscription_asset': subscription_asset,
-						'instance': subscription,
-						'active': True,
-						'event': event,
-					})
-
-	def get_events_group_by_date(self, **options) -> dict:
-		"""Agrupamento de todos os registros de eventos no intervalo pela data"""
-		try:
-			return self.cache.get('events_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('events_by_date', {})
+		subscription_assets = OrderedDict()
+		for instance in subscription.negotiation_set.all():
+			if (subscription_asset := subscription_assets.get(instance.code)) is None:
+				subscription_asset = Assets(ticker=instance.code,
+				                            institution=options.get('institution'),
+				                            instance=(instance or self.get_asset(instance.code)))
+				subscription_assets[instance.code] = subscription_asset
+
+			subscription_asset.items.append(instance)
+			self.consolidate(instance, subscription_asset)
+
+		for subscription_asset in subscription_assets.values():
+			if subscription_asset.buy.quantity > 0:
+				# rebalanceando a carteira
+				asset.buy.quantity += subscription_asset.buy.quantity
+				asset.buy.total += subscription_asset.buy.total
+				asset.items.extend(subscription_asset.items)
+				# o ativo deixar se existir porque foi incorporado
+				if _subscription_asset := self.assets.get(subscription_asset.ticker):
+					# zera o histórico de compras
+					_subscription_asset.empty()
+				try:
+					events = asset.events['subscription']
+				except KeyError:
+					events = asset.events['subscription'] = []
+
+				event = Event("Subscrição",
+				              quantity=subscription_asset.buy.quantity,
+				              value=subscription_asset.buy.total)
+				events.append({
+					'subscription_asset': subscription_asset,
+					'instance': subscription,
+					'active': True,
+					'event': event,
+				})
+
+	def get_events_queryset(self, **options):
+		"""Eventos de desdobramento/grupamento do intervalo (pela 'data com')"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date_com__range'] = [options['start_date'],
 		                                 options['end_date']]
-		related_fields = []
-		if (field_name := 'asset') in qs_options:
-			related_fields.append(field_name)
 		queryset = self.event_model.objects.filter(**qs_options)
-		if related_fields:
-			queryset = queryset.select_related(*related_fields)
-		for instance in queryset:
-			by_date.setdefault(instance.date, []).append(instance)
-		return by_date
+		return queryset.select_related('asset').order_by('date', 'pk')
 
-	def apply_events(self, date, **options):
+	def apply_events(self, instance: AssetEvent, **options):
 		"""Eventos de desdobramento/grupamento"""
-		events_group_by_date = self.get_events_group_by_date(**options)
-		for instance in events_group_by_date.get(date, ()):
-			try:
-				asset = self.assets[instance.asset.code]
-			except KeyError:
-				continue
-			# posição na data
-			if asset.buy.quantity == 0:
-				continue
-			# ignora os registros que já foram contabilizados na posição
-			elif asset.is_position_interval(instance.date_com):
-				continue
-			elif instance.event == self.event_model.SPLIT:  # Desdobramento
-				quantity = asset.buy.quantity / instance.factor_from  # correção
-				fraction, quantity = quantity % 1, Decimal(int(quantity))
-				# nova quantidade altera o preço médio
-				asset.buy.quantity = quantity * instance.factor_to
-				# reduz a fração valor da fração com o novo preço médio
-				asset.buy.total -= fraction * asset.buy.avg_price
-
-			elif instance.event == self.event_model.INPLIT:  # Grupamento
-				quantity = asset.buy.quantity / instance.factor_from
-				fraction, quantity = quantity % 1, Decimal(int(quantity))
-				# nova quantidade altera o preço médio
-				asset.buy.quantity = quantity * instance.factor_to  # correção
-				# reduz a fração valor da fração com o novo preço médio
-				asset.buy.total -= fraction * asset.buy.avg_price
-
-	def get_refund_group_by_date(self, **options) -> dict:
-		"""Agrupamento de todos os registros de restituição/amortização do intervalo pela data"""
+		# somente eventos com 'data com' no intervalo do relatório
+		if not options['start_date'] <= instance.date_com <= options['end_date']:
+			return
 		try:
-			return self.cache.get('refund_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('refund_by_date', {})
+			asset = self.assets[instance.asset.code]
+		except KeyError:
+			return
+		# posição na data
+		if asset.buy.quantity == 0:
+			return
+		# ignora os registros que já foram contabilizados na posição
+		elif asset.is_position_interval(instance.date_com):
+			return
+		elif instance.event == self.event_model.SPLIT:  # Desdobramento
+			quantity = asset.buy.quantity / instance.factor_from  # correção
+			fraction, quantity = quantity % 1, Decimal(int(quantity))
+			# nova quantidade altera o preço médio
+			asset.buy.quantity = quantity * instance.factor_to
+			# reduz a fração valor da fração com o novo preço médio
+			asset.buy.total -= fraction * asset.buy.avg_price
+
+		elif instance.event == self.event_model.INPLIT:  # Grupamento
+			quantity = asset.buy.quantity / instance.factor_from
+			fraction, quantity = quantity % 1, Decimal(int(quantity))
+			# nova quantidade altera o preço médio
+			asset.buy.quantity = quantity * instance.factor_to  # correção
+			# reduz a fração valor da fração com o novo preço médio
+			asset.buy.total -= fraction * asset.buy.avg_price
+
+	def get_refund_queryset(self, **options):
+		"""Registros de restituição/amortização do intervalo"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date__range'] = [options['start_date'], options['end_date']]
-		related_fields = []
-		if (field_name := 'asset') in qs_options:
-			related_fields.append(field_name)
 		queryset = self.refund_model.objects.filter(**qs_options)
-		if related_fields:
-			queryset = queryset.select_related(*related_fields)
-		for instance in queryset:
-			by_date.setdefault(instance.date, []).append(instance)
-		return by_date
+		return queryset.select_related('asset').order_by('date', 'pk')
 
-	def apply_refund(self, date, **options):
+	def apply_refund(self, instance: AssetRefund, **options):
 		"""Eventos de restituição/amortização"""
-		refund_group_by_date = self.get_refund_group_by_date(**options)
-		for instance in refund_group_by_date.get(date, ()):
-			try:
-				asset = self.assets[instance.asset.code]
-			except KeyError:
-				continue
+		try:
+			asset = self.assets[instance.asset.code]
+		except KeyError:
+			return
 
-			# o preço médio é resultado de: total / quantity
-			# reduzir o total ajusta para novo preço médio.
-			asset.buy.total -= (instance.value * asset.buy.quantity)
+		# o preço médio é resultado de: total / quantity
+		# reduzir o total ajusta para novo preço médio.
+		asset.buy.total -= (instance.value * asset.buy.quantity)
 
-	def get_asset_convert_group_by_date(self, **options) -> dict:
-		"""Agrupamento de todos os registros de eventos de conversão do intervalo pela data"""
-		try:
-			return self.cache.get('asset_convert_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('asset_convert_by_date', {})
+	def get_asset_convert_queryset(self, **options):
+		"""Registros de eventos de conversão do intervalo"""
 		related_fields = ['origin', 'target']
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date__range'] = [options['start_date'], options['end_date']]
@@ -348,74 +336,85 @@ class NegotiationReport(BaseReport):
 			qs_options['target__category__in'] = categories
 		queryset = self.asset_convert_model.objects.filter(**qs_options)
 		queryset = queryset.select_related(*related_fields)
-		for instance in queryset:
-			by_date.setdefault(instance.date, []).append(instance)
-		return by_date
+		return queryset.order_by('date', 'pk')
 
-	def apply_asset_convert(self, date, **options):
+	def apply_asset_convert(self, convert: AssetConvert, **options):
 		"""Aplica a conversão de ativo na data"""
-		asset_convert_by_date = self.get_asset_convert_group_by_date(**options)
-		for convert in asset_convert_by_date.get(date, ()):
-			institution = options.get('institution')
+		institution = options.get('institution')
 
-			origin, target = convert.origin, convert.target
+		origin, target = convert.origin, convert.target
 
-			asset_origin = self.get_assets(origin.code, instance=origin,
-			                               institution=institution)
-			asset_target = self.get_assets(target.code, instance=target,
-			                               institution=institution)
+		asset_origin = self.get_assets(origin.code, instance=origin,
+		                               institution=institution)
+		asset_target = self.get_assets(target.code, instance=target,
+		                               institution=institution)
 
-			# ignora os registros que já foram contabilizados na posição
-			if asset_target.is_position_interval(convert.date):
-				continue
+		# ignora os registros que já foram contabilizados na posição
+		if asset_target.is_position_interval(convert.date):
+			return
+
+		origin_buy_avg_price = asset_origin.buy.avg_price
+		origin_buy_tax_avg_price = asset_origin.buy.avg_tax
 
-			origin_buy_avg_price = asset_origin.buy.avg_price
-			origin_buy_tax_avg_price = asset_origin.buy.avg_tax
+		origin_buy_quantity = asset_origin.buy.quantity
+		origin_buy_total = asset_origin.buy.total
+		origin_buy_tax = asset_origin.buy.tax
 
-			origin_buy_quantity = asset_origin.buy.quantity
-			origin_buy_total = asset_origin.buy.total
-			origin_buy_tax = asset_origin.buy.tax
+		# factores de conversão
+		factor_from = convert.factor_from if convert.factor_from > 0 else 1
+		factor_to = convert.factor_to if convert.factor_to > 0 else 1
 
-			# factores de conversão
-			factor_from = convert.factor_from if convert.factor_from > 0 else 1
-			factor_to = convert.factor_to if convert.factor_to > 0 else 1
+		convert_limit = convert.limit if convert.limit and 0 < convert.limit < origin_buy_quantity else 0
 
-			convert_limit = convert.limit if convert.limit and 0 < convert.limit < origin_buy_quantity else 0
+		if convert_limit and convert_limit < origin_buy_quantity:
+			asset_origin.buy.quantity -= convert_limit
+			asset_origin.buy.total = asset_origin.buy.quantity * origin_buy_avg_price
+			origin_buy_quantity = convert_limit
+			origin_buy_total = origin_buy_quantity * origin_buy_avg_price
+			origin_buy_tax = origin_buy_quantity * origin_buy_tax_avg_price
 
-			if convert_limit and convert_limit < origin_buy_quantity:
-				asset_origin.buy.quantity -= convert_limit
-				asset_origin.buy.total = asset_origin.buy.quantity * origin_buy_avg_price
-				origin_buy_quantity = convert_limit
-				origin_buy_total = origin_buy_quantity * origin_buy_avg_price
-				origin_buy_tax = origin_buy_quantity * origin_buy_tax_avg_price
+		asset_target.buy.quantity += int((origin_buy_quantity / factor_from) * factor_to)
+		asset_target.buy.total += origin_buy_total
+		asset_target.buy.tax += origin_buy_tax
 
-			asset_target.buy.quantity += int((origin_buy_quantity / factor_from) * factor_to)
-			asset_target.buy.total += origin_buy_total
-			asset_target.buy.tax += origin_buy_tax
+		# o ativo deixa de existir a partir da data
+		if not convert_limit and (asset := self.assets.pop(convert.origin.code)) not in asset_target.conv:
+			asset_target.conv.insert(0, asset)
 
-			# o ativo deixa de existir a partir da data
-			if not convert_limit and (asset := self.assets.pop(convert.origin.code)) not in asset_target.conv:
-				asset_target.conv.insert(0, asset)
+	def add_negotiation(self, instance, **options):
+		"""Cálculo de compra e venda da negociação"""
+		asset = self.get_assets(instance.code,
+		                        instance=instance.asset or options.get('asset'),
+		                        institution=options.get('institution'))
+		# ignora os registros que já foram contabilizados na posição
+		if asset.is_position_interval(instance.date):
+			return
+		asset.items.append(instance)
+		# cálculo de compra e venda
+		with self.get_profiler().phase('consolidate'):
+			self.consolidate(instance, asset)
 
 	def consolidate(self, instance, asset: Assets):
+		# valores monetários convertidos uma única vez para ponto fixo
+		price, tax = Fixed(instance.price), Fixed(instance.tax)
 		if instance.is_buy:
 			# valores de compras
-			asset.buy.tax += instance.tax
+			asset.buy.tax += tax
 			asset.buy.quantity += instance.quantity
-			asset.buy.total += ((instance.quantity * instance.price) + instance.tax)
+			asset.buy.total += ((instance.quantity * price) + tax)
 		elif instance.is_sell:
 			# valores de vendas
-			sell_total = instance.quantity * instance.price
+			sell_total = instance.quantity * price
 
 			# taxas de venda (proporcional ao total)
-			asset.sell.tax += instance.tax
+			asset.sell.tax += tax
 			# imposto de renda retido na fonte
 			asset.sell.irrf += instance.irrf
 			asset.sell.quantity += instance.quantity
 			asset.sell.total += sell_total
 
 			# preço médio de venda
-			sell_avg_price = (sell_total - instance.tax) / instance.quantity
+			sell_avg_price = (sell_total - tax) / instance.quantity
 
 			# preço médio de compras
 			buy_avg_price = asset.buy.avg_price
@@ -426,7 +425,7 @@ class NegotiationReport(BaseReport):
 			capital = instance.quantity * (sell_avg_price - buy_avg_price)
 
 			# registra lucros e prejuízos
-			if capital > MoneyLC(0):
+			if capital > 0:
 				asset.sell.profits += capital
 			else:
 				asset.sell.losses += capital
@@ -437,11 +436,8 @@ class NegotiationReport(BaseReport):
 			asset.buy.total = asset.buy.quantity * buy_avg_price
 		return asset
 
-	def get_earnings_group_by_date(self, **options):
-		try:
-			return self.cache.get('earnings_by_date')
-		except EmptyCacheError:
-			by_date = self.cache.set('earnings_by_date', {})
+	def get_earnings_queryset(self, **options):
+		"""Proventos do intervalo"""
 		qs_options = self.get_common_qs_options(**options)
 		qs_options['date__range'] = [options['start_date'],
 		                             options['end_date']]
@@ -450,9 +446,7 @@ class NegotiationReport(BaseReport):
 		if assetft := qs_options.pop('asset', None):
 			qs_options['code__iexact'] = assetft.code
 		queryset = self.earnings_model.objects.filter(**qs_options)
-		for instance in queryset:
-			by_date.setdefault(instance.date, []).append(instance)
-		return by_date
+		return queryset.order_by('date', 'pk')
 
 	def calc_earnings(self, instance: Earnings, asset: Assets):
 		kind_slug = instance.kind_slug
@@ -484,13 +478,46 @@ class NegotiationReport(BaseReport):
 				# debito do frações
 				...
 
-	def apply_earnings(self, date, **options):
-		earnings_group_by_date = self.get_earnings_group_by_date(**options)
-		for instance in earnings_group_by_date.get(date, ()):
-			try:
-				self.calc_earnings(instance, self.assets[instance.code])
-			except KeyError:
-				continue
+	def apply_earnings(self, instance: Earnings, **options):
+		try:
+			self.calc_earnings(instance, self.assets[instance.code])
+		except KeyError:
+			return
+
+	def get_timeline(self, **options) -> Timeline:
+		"""Linha do tempo com os registros de todas as fontes de eventos do intervalo"""
+		timeline = Timeline(self.timeline_kinds)
+		timeline.extend('asset_convert', ((obj.date, obj) for obj in self.get_asset_convert_queryset(**options)))
+		timeline.extend('bonus', ((obj.bonus.date, obj) for obj in self.get_bonus_info_queryset(**options)))
+		timeline.extend('subscription', ((obj.date, obj) for obj in self.get_subscription_queryset(**options)))
+		timeline.extend('refund', ((obj.date, obj) for obj in self.get_refund_queryset(**options)))
+		timeline.extend('negotiation', ((obj.date, obj) for obj in self.get_negotiation_queryset(**options)))
+		timeline.extend('earnings', ((obj.date, obj) for obj in self.get_earnings_queryset(**options)))
+		timeline.extend('events', ((obj.date, obj) for obj in self.get_events_queryset(**options)))
+		timeline.extend('bonus_registry', ((obj.date_com, obj) for obj in self.get_bonus_registry_queryset(**options)))
+		return timeline
+
+	def get_timeline_handlers(self) -> dict:
+		"""Funções que aplicam os registros de cada fonte da linha do tempo"""
+		return {
+			'asset_convert': self.apply_asset_convert,
+			# inclusão de bônus considera a data da incorporação
+			'bonus': self.add_bonus,
+			# inclusão de subscrições na data de incorporação
+			'subscription': self.add_subscription,
+			# restituição/amortização de capital
+			'refund': self.apply_refund,
+			'negotiation': self.add_negotiation,
+			'earnings': self.apply_earnings,
+			'events': self.apply_events,
+			# cria um registro de bônus para os ativos do dia
+			'bonus_registry': self.registry_bonus
+		}
+
+	def get_negotiation_queryset(self, **options):
+		"""Negociações do intervalo"""
+		queryset = self.get_queryset(**options)
+		return queryset.select_related('asset').order_by('date', 'pk')
 
 	def get_position_queryset(self, date: datetime.date, **options):
 		"""Monta e retorna a queryset de posição"""
@@ -523,18 +550,7 @@ class NegotiationReport(BaseReport):
 		# usa a posição do mês anterior em cache (sempre calculada para relatório anual).
 		if assets_position := options.get('assets_position'):
 			for asset in assets_position:
-				assets = Assets(
-					ticker=asset.ticker,
-					institution=asset.institution,
-					instance=asset.instance,
-					position=asset.position,
-					buy=Buy(
-						quantity=asset.buy.quantity,
-						total=asset.buy.total,
-						tax=asset.buy.tax
-					)
-				)
-				positions[assets.ticker] = assets
+				positions[asset.ticker] = asset.snapshot()
 		else:
 			# usa posições salvas para relatórios mensais
 			queryset = self.get_position_queryset(date, **options)
@@ -560,38 +576,23 @@ class NegotiationReport(BaseReport):
 		self.options.setdefault('categories', ())
 		self.options.update(options)
 
+		profiler = self.get_profiler()
 		# cache
-		self.assets = self.get_assets_position(date=start_date, **self.options)
-		assets_queryset = self.get_queryset(**self.options)
-
-		institution = self.options.get('institution')
-		asset_instance = self.options.get('asset')
-
-		for date in range_dates(start_date, end_date):  # calcula um dia por vez
-			self.apply_asset_convert(date, **self.options)
-			# inclusão de bônus considera a data da incorporação
-			self.add_bonus(date, **self.options)
-			# inclusão de subscrições na data de incorporação
-			self.add_subscription(date, **self.options)
-			# restituição/amortização de capital
-			self.apply_refund(date, **self.options)
-
-			queryset = assets_queryset.filter(date=date)
-			for instance in queryset:
-				asset = self.get_assets(instance.code,
-				                        instance=instance.asset or asset_instance,
-				                        institution=institution)
-				# ignora os registros que já foram contabilizados na posição
-				if asset.is_position_interval(instance.date):
-					continue
-				asset.items.append(instance)
-				# cálculo de compra e venda
-				self.consolidate(instance, asset)
-
-			self.apply_earnings(date, **self.options)
-			self.apply_events(date, **self.options)
-			# cria um registro de bônus para os ativos do dia
-			self.registry_bonus(date, **self.options)
+		with profiler.phase('positions'):
+			self.assets = self.get_assets_position(date=start_date, **self.options)
+		# a linha do tempo pode ser compartilhada entre relatórios (cada um consome o seu intervalo)
+		if (timeline := self.options.get('timeline')) is None:
+			with profiler.phase('timeline'):
+				timeline = self.get_timeline(**self.options)
+		self.timeline = timeline
+
+		handlers = profiler.wrap_all(self.get_timeline_handlers())
+		# aplica os registros em ordem (somente as datas com negociações ou eventos)
+		for event in self.timeline.pop_until(end_date):
+			# eventos (desdobramento/grupamento) são filtrados pela 'data com', mas aplicados na data do anúncio
+			if event.date < start_date:
+				continue
+			handlers[event.kind](event.instance, **self.options)
 
 		# limpeza de resultados anteriores
 		self.results.clear()
@@ -605,6 +606,21 @@ class NegotiationReport(BaseReport):
 class NegotiationReportMonth(BaseReportMonth):
 	"""Relatório de todos os meses de um range"""
 	report_class = NegotiationReport
+	dirty_model = ReportDirtyMonth
+
+	def get_months_cache(self, months_range: list) -> MonthsCache:
+		"""Cache dos meses já calculados (válidos até que algum registro do mês seja alterado)"""
+		institution, asset = self.options.get('institution'), self.options.get('asset')
+		key_prefix = ":".join([
+			self.report_class.__name__,
+			settings.IRPF_VERSION,
+			# ativos alterados (código, categoria, etc.) invalidam todos os meses
+			str(AssetCatalogVersion.get_version()),
+			str(institution.pk if institution else ''),
+			str(asset.pk if asset else ''),
+			",".join(sorted(map(str, self.options['categories'])))
+		])
+		return MonthsCache(self.user, self.dirty_model, months_range, key_prefix)
 
 	def generate(self, months_range: list, **options) -> OrderedDictResults:
 		"""Gera um relatório para cada mês
@@ -612,22 +628,48 @@ class NegotiationReportMonth(BaseReportMonth):
 			[(start_date, end_date, ...)]
 		"""
 		self.options.update(**options)
+		self.options.setdefault('categories', ())
+		# ativos carregados uma única vez para todos os meses
+		self.options.setdefault('asset_catalog', AssetCatalog(self.report_class.asset_model))
+
+		profiler = self.options.get('profiler') or null_profiler
+
+		months_cache = self.get_months_cache(months_range)
+		# início do cálculo (antes de qualquer consulta): alterações gravadas durante o cálculo
+		# ficam com data posterior e invalidam os meses armazenados
+		computed = timezone.now()
+		# meses inalterados desde o último cálculo
+		with profiler.phase('months_cache'):
+			reports = months_cache.get_many()
+		if months_pending := [dates for dates in months_range if dates[0] not in reports]:
+			# registros dos meses pendentes carregados uma única vez (cada mês consome a sua parte)
+			with profiler.phase('timeline'):
+				self.options['timeline'] = self.get_timeline(months_pending, **self.options)
 
 		for start_date, end_date in months_range:
-			report = self.report_class(self.user, self.model)
-			opts = dict(self.options, consolidation=self.report_class.position_model.CONSOLIDATION_MONTHLY)
+			if (report := reports.get(start_date)) is None:
+				report = self.report_class(self.user, self.model)
+				opts = dict(self.options, consolidation=self.report_class.position_model.CONSOLIDATION_MONTHLY)
 
-			# relatório do mês anterior (usado como posição para o mês atual)
-			if report_month := self.results.get(start_date.month - 1):
-				opts['assets_position'] = report_month.get_results()
+				# relatório do mês anterior (usado como posição para o mês atual)
+				if report_month := self.results.get(start_date.month - 1):
+					opts['assets_position'] = report_month.get_results()
 
-			report.generate(start_date, end_date, **opts)
+				report.generate(start_date, end_date, **opts)
+				with profiler.phase('months_cache'):
+					months_cache.set(start_date, end_date, report, computed)
 
 			self.results[start_date.month] = report
 		# datas inicial e final do range
 		self.set_dates_range(months_range)
 		return self.results
 
+	def get_timeline(self, months_range: list, **options) -> Timeline:
+		"""Linha do tempo com os registros de todo o intervalo de meses"""
+		options['start_date'], options['end_date'] = months_range[0][0], months_range[-1][1]
+		report = self.report_class(self.user, self.model, **options)
+		return report.get_timeline(**options)
+
 	def compile(self) -> list:
 		"""Junta os relatórios de todos os meses como se fossem um só"""
 		if len(self.results) == 1:
@@ -0,0 +1,123 @@
+import contextlib
+import functools
+import json
+import logging
+import time
+
+from django.db import connection
+
+logger = logging.getLogger("irpf.report")
+
+
+class Phase:
+	"""Tempo e consultas (acumulados) de uma fase do relatório"""
+	__slots__ = ('name', 'calls', 'seconds', 'queries')
+
+	def __init__(self, name: str):
+		self.name = name
+		self.calls = 0
+		self.seconds = 0.0
+		self.queries = 0
+
+	def as_dict(self) -> dict:
+		return {
+			'name': self.name,
+			'calls': self.calls,
+			'seconds': round(self.seconds, 6),
+			'queries': self.queries
+		}
+
+
+class NullProfiler:
+	"""Perfil desativado (nenhum custo além da chamada)"""
+	enabled = False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		return None
+
+	def phase(self, name: str):
+		return contextlib.nullcontext()
+
+	def wrap(self, name: str, func):
+		return func
+
+	def wrap_all(self, handlers: dict) -> dict:
+		return handlers
+
+	def __bool__(self):
+		return False
+
+
+null_profiler = NullProfiler()
+
+
+class ReportProfiler(NullProfiler):
+	"""Registra o tempo e o número de consultas SQL de cada fase de geração do relatório.
+	As fases podem ser aninhadas (o tempo da fase externa inclui o das internas).
+	"""
+	enabled = True
+
+	def __init__(self, user=None, **context):
+		self.user = user
+		self.context = context
+		self.phases = {}
+		self.queries = 0
+		self._wrapper = None
+
+	def _count_queries(self, execute, sql, params, many, context):
+		self.queries += 1
+		return execute(sql, params, many, context)
+
+	def __enter__(self):
+		self._wrapper = connection.execute_wrapper(self._count_queries)
+		self._wrapper.__enter__()
+		return self
+
+	def __exit__(self, *exc_info):
+		wrapper, self._wrapper = self._wrapper, None
+		return wrapper.__exit__(*exc_info)
+
+	@contextlib.contextmanager
+	def phase(self, name: str):
+		if (phase := self.phases.get(name)) is None:
+			phase = self.phases[name] = Phase(name)
+		queries, start = self.queries, time.perf_counter()
+		try:
+			yield phase
+		finally:
+			phase.seconds += time.perf_counter() - start
+			phase.queries += self.queries - queries
+			phase.calls += 1
+
+	def wrap(self, name: str, func):
+		"""Função que executa dentro da fase 'name'"""
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			with self.phase(name):
+				return func(*args, **kwargs)
+		return wrapper
+
+	def wrap_all(self, handlers: dict) -> dict:
+		"""Cada handler (da linha do tempo) vira uma fase com o nome da função"""
+		return {kind: self.wrap(handler.__name__, handler) for kind, handler in handlers.items()}
+
+	def get_results(self) -> list:
+		return [phase.as_dict() for phase in self.phases.values()]
+
+	def log(self, level=logging.INFO):
+		"""Emite as fases como log estruturado (extra 'irpf_profile')"""
+		profile = {
+			'user': getattr(self.user, 'pk', None),
+			'queries': self.queries,
+			'phases': self.get_results(),
+			**self.context
+		}
+		logger.log(level, "report profile %s", json.dumps(profile, default=str),
+		           extra={'irpf_profile': profile})
+		return profile
+
+	def __bool__(self):
+		return True
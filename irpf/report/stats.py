@@ -1,12 +1,14 @@
 import calendar
 import datetime
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 
+from django.db.models import Exists, OuterRef
 from django.utils.functional import cached_property
 
 from irpf.models import Asset, Statistic, Taxes, TaxRate
 from irpf.report.base import Base, BaseReportMonth, BaseReport
-from irpf.report.utils import Stats, MoneyLC, OrderedDictResults
+from irpf.report.profiler import null_profiler
+from irpf.report.utils import Stats, Fixed, OrderedDictResults
 
 
 class StatsReport(Base):
@@ -23,46 +25,69 @@ class StatsReport(Base):
 		self.end_date = self.report.get_opts('end_date')
 		self.tax_rate = tax_rate
 
-	def _get_statistics(self, date: datetime.date, category: int, **options):
+	@staticmethod
+	def get_statistics_date(date: datetime.date) -> datetime.date:
+		"""A data de posição é sempre o último dia do mês anterior"""
+		if date.month - 1 > 0:
+			max_day = calendar.monthrange(date.year, date.month - 1)[1]
+			return datetime.date(date.year, date.month - 1, max_day)
+		max_day = calendar.monthrange(date.year - 1, 12)[1]
+		return datetime.date(date.year - 1, 12, max_day)
+
+	def get_statistics(self, date: datetime.date, **options) -> dict:
+		"""Estatísticas salvas de todas as categorias (com os impostos pré-carregados)"""
 		options.setdefault('consolidation', self.report.get_opts('consolidation'))
 		query = dict(
 			consolidation=options['consolidation'],
-			category=category,
+			date=self.get_statistics_date(date),
 			user=self.user
 		)
 		if institution := options.get('institution'):
 			query['institution'] = institution
+		queryset = self.statistic_model.objects.filter(**query).prefetch_related('taxes_set')
+		return {instance.category: instance for instance in queryset}
 
-		# a data de posição é sempre o último dia do mês ou ano.
-		if date.month - 1 > 0:
-			max_day = calendar.monthrange(date.year, date.month - 1)[1]
-			query['date'] = datetime.date(date.year, date.month - 1, max_day)
-		else:
-			max_day = calendar.monthrange(date.year - 1, 12)[1]
-			query['date'] = datetime.date(date.year - 1, 12, max_day)
-		try:
-			instance = self.statistic_model.objects.get(**query)
-		except self.statistic_model.DoesNotExist:
-			instance = None
-		return instance
+	def _get_statistics(self, date: datetime.date, category: int, **options):
+		if (statistics := options.get('statistics')) is None:
+			statistics = self.options['statistics'] = self.get_statistics(date, **options)
+		return statistics.get(category)
+
+	def get_taxes_queryset(self, start_date: datetime.date, end_date: datetime.date):
+		"""Impostos cadastrados no período (com a marcação de vínculo com estatísticas)"""
+		stats_model = self.taxes_model.stats.through
+		queryset = self.taxes_model.objects.filter(
+			created_date__range=[start_date, end_date],
+			user=self.user,
+			total__gt=0
+		).annotate(
+			has_stats=Exists(stats_model.objects.filter(taxes_id=OuterRef('pk')))
+		)
+		return queryset
+
+	def get_taxes(self, start_date: datetime.date, end_date: datetime.date) -> dict:
+		"""Impostos do período agrupados por categoria"""
+		taxes = defaultdict(list)
+		for instance in self.get_taxes_queryset(start_date, end_date):
+			taxes[instance.category].append(instance)
+		return taxes
 
 	def generate_residual_taxes(self, **options):
 		"""Atualiza impostos residuais (aqueles abaixo de R$ 10,00 que devem ser pagos posteriormente)
 		"""
 		# impostos não pagos aparecem no mês para pagamento(repeita o mínimo de R$ 10)
-		taxes_qs = self.taxes_model.objects.filter(
-			created_date__range=[self.start_date, self.end_date],
-			user=self.user,
-			total__gt=0
-		)
+		if (taxes_categories := options.get('taxes')) is None:
+			taxes_categories = self.get_taxes(self.start_date, self.end_date)
 		for category_name in self.results:
 			category = self.asset_model.get_category_by_name(category_name)
 			stats_category: Stats = self.results[category_name]
 
 			# impostos cadastrados pelo usuário
-			for taxes in taxes_qs.filter(category=category):
+			for taxes in taxes_categories.get(category, ()):
+				# os impostos podem ser de todo o período de relatórios
+				if not (self.start_date <= taxes.created_date <= self.end_date):
+					continue
 				# nesse caso o imposto é só uma anotação para o usuário
-				if taxes.paid and not taxes.stats.exists():
+				if taxes.paid and not taxes.has_stats:
 					continue
 				taxes_to_pay = taxes.taxes_to_pay
 
@@ -80,7 +105,7 @@ class StatsReport(Base):
 			for category_name in self.results:
 				stats_category: Stats = self.results[category_name]
 				stats_category.taxes.value += stats_category.taxes.residual
-				stats_category.taxes.residual = MoneyLC(0)
+				stats_category.taxes.residual = Fixed()
 				stats_category.taxes.paid = True
 		else:
 			# categorias de renda variável que sofrem descontos do irrf
@@ -98,7 +123,7 @@ class StatsReport(Base):
 				if stats_category.taxes.value and category in irrf_categories:
 					stats_category.taxes.value += stats_category.irrf
 				stats_category.taxes.residual += stats_category.taxes.value
-				stats_category.taxes.value = MoneyLC(0)
+				stats_category.taxes.value = Fixed()
 
 	def _get_stats(self, category_name: str, date: datetime.date, **options) -> Stats:
 		if (stats := self.results.get(category_name)) is None:
@@ -118,8 +143,8 @@ class StatsReport(Base):
 				# prejuízos acumulados no ano continuam contando em datas futuras
 				if statistics:
 					stats.instance = statistics
-					stats.cumulative_losses = statistics.cumulative_losses
-					stats.taxes.residual = statistics.residual_taxes
+					stats.cumulative_losses = Fixed(statistics.cumulative_losses)
+					stats.taxes.residual = Fixed(statistics.residual_taxes)
 					stats.taxes.items.update(list(statistics.taxes_set.all()))
 		return stats
 
@@ -146,11 +171,11 @@ class StatsReport(Base):
 			if cumulative_losses >= profits:
 				stats.compensated_losses += profits
 				stats.cumulative_losses += profits
-				profits = MoneyLC(0)
+				profits = Fixed()
 			else:
 				profits -= cumulative_losses
 				stats.compensated_losses += cumulative_losses
-				stats.cumulative_losses = MoneyLC(0)
+				stats.cumulative_losses = Fixed()
 		return profits
 
 	def generate_taxes(self):
@@ -179,8 +204,8 @@ class StatsReport(Base):
 				else:
 					# lucro isento no swing trade
 					stats.exempt_profit += stats.profits
-					stats.profits = MoneyLC(0)
-					stats.irrf = MoneyLC(0)
+					stats.profits = Fixed()
+					stats.irrf = Fixed()
 			elif category == self.asset_model.CATEGORY_BDR:
 				# compensação de prejuízos da categoria
 				if ((profits := self.calc_profits(stats.profits, stats)) and
@@ -265,10 +290,13 @@ class StatsReport(Base):
 			# total de todos os períodos
 			stats.patrimony += asset.buy.total
 
+		profiler = self.options.get('profiler') or null_profiler
 		# taxas de período
-		self.generate_taxes()
+		with profiler.phase('taxes'):
+			self.generate_taxes()
 		_ = self.stats_results
-		self.generate_residual_taxes(**self.options)
+		with profiler.phase('residual_taxes'):
+			self.generate_residual_taxes(**self.options)
 		self.cache.clear()
 		return self.results
 
@@ -289,12 +317,17 @@ class StatsReports(Base):
 
 	def generate(self, **options) -> OrderedDict[int]:
 		"""Gera dados de estatística para cada mês de relatório"""
+		self.options.update(options)
+		taxes = None
 
 		for month in self.reports:
 			report = self.reports[month]
 			stats = self.report_class(self.user, report, self.tax_rate)
+			if taxes is None:
+				# impostos de todos os meses carregados uma única vez
+				taxes = stats.get_taxes(self.start_date, self.end_date)
 
-			opts = dict(options)
+			opts = dict(self.options, taxes=taxes)
 			if stats_month := self.results.get(month - 1):
 				opts['stats_position'] = stats_month.get_results()
 
@@ -0,0 +1,60 @@
+import datetime
+import heapq
+import itertools
+from typing import Iterable, Iterator, NamedTuple
+
+
+class TimelineEvent(NamedTuple):
+	date: datetime.date
+	order: int
+	seq: int
+	kind: str
+	instance: object
+
+
+class Timeline:
+	"""Fluxo único, ordenado por data, com os registros de todas as fontes de eventos do relatório.
+	Registros de uma mesma data seguem a ordem das fontes ('kinds') e depois a ordem de inclusão.
+	"""
+
+	def __init__(self, kinds: Iterable[str]):
+		self.order = {kind: index for index, kind in enumerate(kinds)}
+		self._counter = itertools.count()
+		self._heap = []
+		# registros que substituem outros (da mesma fonte) já incluídos
+		self._replaced = {}
+
+	def push(self, kind: str, date: datetime.date, instance):
+		"""Inclui um registro na linha do tempo"""
+		heapq.heappush(self._heap, TimelineEvent(date, self.order[kind], next(self._counter), kind, instance))
+
+	def replace(self, kind: str, key, date: datetime.date, instance):
+		"""Inclui um registro que substitui o anterior com a mesma chave (o antigo passa a ser ignorado)"""
+		self._replaced[(kind, key)] = instance
+		self.push(kind, date, instance)
+
+	def is_replaced(self, kind: str, key, instance) -> bool:
+		"""Se o registro foi substituído por outro com a mesma chave"""
+		return self._replaced.get((kind, key), instance) is not instance
+
+	def extend(self, kind: str, items: Iterable[tuple[datetime.date, object]]):
+		"""Inclui os registros (data, instância) de uma fonte"""
+		for date, instance in items:
+			self.push(kind, date, instance)
+
+	def pop_until(self, end_date: datetime.date) -> Iterator[TimelineEvent]:
+		"""Consome os registros com data até 'end_date' (incluindo os adicionados durante a iteração)"""
+		heap = self._heap
+		while heap and heap[0].date <= end_date:
+			yield heapq.heappop(heap)
+
+	def __iter__(self) -> Iterator[TimelineEvent]:
+		heap = self._heap
+		while heap:
+			yield heapq.heappop(heap)
+
+	def __len__(self):
+		return len(self._heap)
+
+	def __bool__(self):
+		return bool(self._heap)
@@ -15,6 +15,200 @@ class MoneyLC(moneyfield.fields.MoneyLC):
 		super().__init__(amount=amount, currency=currency)
 
 
+def _div_round(numerator: int, denominator: int) -> int:
+	"""Divisão inteira com arredondamento para o par mais próximo (ROUND_HALF_EVEN)"""
+	if denominator < 0:
+		numerator, denominator = -numerator, -denominator
+	quotient, remainder = divmod(numerator, denominator)
+	remainder *= 2
+	if remainder > denominator or (remainder == denominator and quotient & 1):
+		quotient += 1
+	return quotient
+
+
+class Fixed:
+	"""Valor monetário em ponto fixo (inteiro escalado por 10 ** 16) usado nos acumuladores dos relatórios.
+	Arredondamento:
+	- Conversão de Decimal/MoneyLC: arredonda na 16ª casa decimal (ROUND_HALF_EVEN).
+	- Soma e subtração: exatas.
+	- Multiplicação e divisão: resultado exato arredondado na 16ª casa decimal (ROUND_HALF_EVEN).
+	- Conversão para MoneyLC (banco de dados / templates): exata, com 16 casas decimais.
+	"""
+	__slots__ = ('raw',)
+	places = 16
+	scale = 10 ** places
+
+	def __init__(self, value=0):
+		self.raw = self.to_raw(value)
+
+	@classmethod
+	def from_raw(cls, raw: int):
+		"""Cria o valor a partir do inteiro escalado (sem conversão)"""
+		obj = object.__new__(cls)
+		obj.raw = raw
+		return obj
+
+	@classmethod
+	def of(cls, value):
+		"""Valor em ponto fixo (o próprio valor quando já convertido, já que é imutável)"""
+		return value if isinstance(value, Fixed) else cls(value)
+
+	@classmethod
+	def to_raw(cls, value) -> int:
+		if isinstance(value, Fixed):
+			return value.raw
+		elif isinstance(value, int):
+			return value * cls.scale
+		elif not isinstance(value, Decimal):
+			# MoneyLC
+			if (amount := getattr(value, 'amount', None)) is not None:
+				value = amount
+			value = Decimal(str(value) if isinstance(value, float) else value)
+		numerator, denominator = cls._integer_ratio(value)
+		return _div_round(numerator * cls.scale, denominator)
+
+	@staticmethod
+	def _integer_ratio(value: Decimal) -> tuple[int, int]:
+		try:
+			return value.as_integer_ratio()
+		except OverflowError as exc:
+			# Infinity (NaN já gera ValueError)
+			raise ValueError(f"cannot convert {value} to a fixed-point value") from exc
+
+	@staticmethod
+	def _ratio(value) -> tuple[int, int]:
+		"""Fração exata de um multiplicador/divisor"""
+		if isinstance(value, int):
+			return value, 1
+		elif isinstance(value, Fixed):
+			return value.raw, Fixed.scale
+		elif not isinstance(value, Decimal):
+			value = Decimal(getattr(value, 'amount', value))
+		return Fixed._integer_ratio(value)
+
+	@property
+	def amount(self) -> Decimal:
+		raw = self.raw
+		return Decimal((int(raw < 0), tuple(map(int, str(abs(raw)))), -self.places))
+
+	@property
+	def money(self) -> MoneyLC:
+		return MoneyLC(self.amount)
+
+	def __add__(self, other):
+		try:
+			return Fixed.from_raw(self.raw + self.to_raw(other))
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return NotImplemented
+
+	__radd__ = __add__
+
+	def __sub__(self, other):
+		try:
+			return Fixed.from_raw(self.raw - self.to_raw(other))
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return NotImplemented
+
+	def __rsub__(self, other):
+		try:
+			return Fixed.from_raw(self.to_raw(other) - self.raw)
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return NotImplemented
+
+	def __mul__(self, other):
+		if isinstance(other, int):
+			return Fixed.from_raw(self.raw * other)
+		try:
+			numerator, denominator = self._ratio(other)
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return NotImplemented
+		return Fixed.from_raw(_div_round(self.raw * numerator, denominator))
+
+	__rmul__ = __mul__
+
+	def __truediv__(self, other):
+		if isinstance(other, Fixed):
+			# razão entre valores
+			return Decimal(self.raw) / Decimal(other.raw)
+		try:
+			numerator, denominator = self._ratio(other)
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return NotImplemented
+		if numerator == 0:
+			raise ZeroDivisionError("division by zero")
+		return Fixed.from_raw(_div_round(self.raw * denominator, numerator))
+
+	def __neg__(self):
+		return Fixed.from_raw(-self.raw)
+
+	def __pos__(self):
+		return self
+
+	def __abs__(self):
+		return Fixed.from_raw(abs(self.raw))
+
+	def _compare(self, other):
+		try:
+			return self.raw - self.to_raw(other)
+		except (TypeError, ValueError, decimal.InvalidOperation):
+			return None
+
+	def __eq__(self, other):
+		if (diff := self._compare(other)) is None:
+			return NotImplemented
+		return diff == 0
+
+	def __lt__(self, other):
+		if (diff := self._compare(other)) is None:
+			return NotImplemented
+		return diff < 0
+
+	def __le__(self, other):
+		if (diff := self._compare(other)) is None:
+			return NotImplemented
+		return diff <= 0
+
+	def __gt__(self, other):
+		if (diff := self._compare(other)) is None:
+			return NotImplemented
+		return diff > 0
+
+	def __ge__(self, other):
+		if (diff := self._compare(other)) is None:
+			return NotImplemented
+		return diff >= 0
+
+	def __hash__(self):
+		# mesmo hash do Decimal/int equivalente (valores iguais comparam como iguais)
+		return hash(self.amount)
+
+	def __bool__(self):
+		return self.raw != 0
+
+	def __float__(self):
+		return self.raw / self.scale
+
+	def __int__(self):
+		quotient = abs(self.raw) // self.scale
+		return -quotient if self.raw < 0 else quotient
+
+	# imutável
+	def __copy__(self):
+		return self
+
+	def __deepcopy__(self, memo):
+		return self
+
+	def __reduce__(self):
+		return Fixed.from_raw, (self.raw,)
+
+	def __str__(self):
+		return str(self.money)
+
+	def __repr__(self):
+		return f"{type(self).__name__}('{self.amount}')"
+
+
 def as_int_desc(value) -> Decimal:
 	try:
 		value = Decimal(int(value))
@@ -36,12 +230,14 @@ def smart_desc(value) -> Decimal:
 
 class Event:
 	"""Eventos de bonificação, subscrição, dividendos, proventos, etc"""
+	__slots__ = ('title', 'quantity', 'value', 'items')
+
 	def __init__(self, title: str,
 	             quantity: Decimal = Decimal(0),
-	             value: MoneyLC = MoneyLC(0)):
+	             value: Fixed = Fixed()):
 		self.title = title
 		self.quantity = quantity
-		self.value = value
+		self.value = Fixed.of(value)
 		self.items = []
 
 	def update(self, event):
@@ -60,16 +256,18 @@ class Event:
 
 class TaxesStats:
 	"""Statísticas de impostos"""
-	def __init__(self, value=MoneyLC(0), residual=MoneyLC(0)):
-		self.value = value
+	__slots__ = ('value', 'residual', 'items', 'paid')
+
+	def __init__(self, value: Fixed = Fixed(), residual: Fixed = Fixed()):
+		self.value = Fixed.of(value)
 		# impostos residuais
-		self.residual = residual
+		self.residual = Fixed.of(residual)
 		# instâncias de registros do usuário
 		self.items = set()
 		self.paid = False
 
 	@property
-	def total(self) -> MoneyLC:
+	def total(self) -> Fixed:
 		return self.value + self.residual
 
 	def __bool__(self):
@@ -87,33 +285,36 @@ class OrderedDictResults(OrderedDict):
 
 
 class Stats:
-	def __init__(self, buy: MoneyLC = MoneyLC(0),
-	             sell: MoneyLC = MoneyLC(0),
-	             profits: MoneyLC = MoneyLC(0),
-	             losses: MoneyLC = MoneyLC(0),
-	             exempt_profit: MoneyLC = MoneyLC(0),
-	             cumulative_losses: MoneyLC = MoneyLC(0),
-	             patrimony: MoneyLC = MoneyLC(0),
-	             tax: MoneyLC = MoneyLC(0),
-	             irrf: MoneyLC = MoneyLC(0),
+	__slots__ = ('buy', 'sell', 'profits', 'losses', 'patrimony', 'tax', 'irrf', 'bonus', 'instance', 'taxes',
+	             'exempt_profit', 'compensated_losses', 'cumulative_losses', 'taxes_results')
+
+	def __init__(self, buy: Fixed = Fixed(),
+	             sell: Fixed = Fixed(),
+	             profits: Fixed = Fixed(),
+	             losses: Fixed = Fixed(),
+	             exempt_profit: Fixed = Fixed(),
+	             cumulative_losses: Fixed = Fixed(),
+	             patrimony: Fixed = Fixed(),
+	             tax: Fixed = Fixed(),
+	             irrf: Fixed = Fixed(),
 	             bonus: Event = None,
 	             instance=None):
-		self.buy = buy
-		self.sell = sell
-		self.profits = profits  # lucros
-		self.losses = losses  # prejuízos
-		self.patrimony = patrimony
-		self.tax = tax
-		self.irrf = irrf
+		self.buy = Fixed.of(buy)
+		self.sell = Fixed.of(sell)
+		self.profits = Fixed.of(profits)  # lucros
+		self.losses = Fixed.of(losses)  # prejuízos
+		self.patrimony = Fixed.of(patrimony)
+		self.tax = Fixed.of(tax)
+		self.irrf = Fixed.of(irrf)
 		self.bonus = Event("Bonificação") if bonus is None else bonus
 		self.instance = instance
 		self.taxes = TaxesStats()
 		# lucro isento (no caso de ações venda de até 20mil)
-		self.exempt_profit = exempt_profit
+		self.exempt_profit = Fixed.of(exempt_profit)
 		# prejuízos compensados
-		self.compensated_losses = MoneyLC(0)
-		self.cumulative_losses = cumulative_losses  # prejuízos acumulados
-		self.taxes_results = MoneyLC(0)
+		self.compensated_losses = Fixed()
+		self.cumulative_losses = Fixed.of(cumulative_losses)  # prejuízos acumulados
+		self.taxes_results = Fixed()
 
 	def update(self, stats):
 		"""Acrescenta os dados de outro objeto stats"""
@@ -178,13 +379,21 @@ class TransactionGroup:
 
 class Buy:
 	"""Compas"""
+	__slots__ = ('quantity', 'total', 'tax')
 
 	def __init__(self, quantity: Decimal = Decimal(0),
-	             total: MoneyLC = MoneyLC(0),
-	             tax: MoneyLC = MoneyLC(0)):
+	             total: Fixed = Fixed(),
+	             tax: Fixed = Fixed()):
 		self.quantity = quantity
-		self.total = total
-		self.tax = tax
+		self.total = Fixed.of(total)
+		self.tax = Fixed.of(tax)
+
+	def copy(self):
+		"""Cópia rasa (os valores são imutáveis)"""
+		cls = type(self)
+		buy = cls.__new__(cls)
+		buy.quantity, buy.total, buy.tax = self.quantity, self.total, self.tax
+		return buy
 
 	def update(self, buy):
 		assert isinstance(buy, type(self)), 'invalid type!'
@@ -200,7 +409,7 @@ class Buy:
 		if quantity > 0:
 			avg_price = self.total / quantity
 		else:
-			avg_price = MoneyLC(0)
+			avg_price = Fixed()
 		return avg_price
 
 	@property
@@ -210,7 +419,7 @@ class Buy:
 		if quantity > 0:
 			avg_tax = self.tax / quantity
 		else:
-			avg_tax = MoneyLC(0)
+			avg_tax = Fixed()
 		return avg_tax
 
 	def __bool__(self):
@@ -219,10 +428,12 @@ class Buy:
 
 class SellFrac:
 	"""Frações vendidas"""
+	__slots__ = ('quantity', 'total')
+
 	def __init__(self, quantity: Decimal = Decimal(0),
-	             total: MoneyLC = MoneyLC(0)):
+	             total: Fixed = Fixed()):
 		self.quantity = quantity
-		self.total = total
+		self.total = Fixed.of(total)
 
 	def update(self, sellfrac):
 		assert isinstance(sellfrac, type(self)), 'invalid type!'
@@ -233,19 +444,20 @@ class SellFrac:
 
 class Sell:
 	"""Vendas"""
+	__slots__ = ('quantity', 'profits', 'losses', 'total', 'tax', 'irrf', 'fraction')
 
 	def __init__(self, quantity: Decimal = Decimal(0),
-	             total: MoneyLC = MoneyLC(0),
-	             profits: MoneyLC = MoneyLC(0),
-	             losses: MoneyLC = MoneyLC(0),
-	             tax: MoneyLC = MoneyLC(0),
-	             irrf: MoneyLC = MoneyLC(0)):
+	             total: Fixed = Fixed(),
+	             profits: Fixed = Fixed(),
+	             losses: Fixed = Fixed(),
+	             tax: Fixed = Fixed(),
+	             irrf: Fixed = Fixed()):
 		self.quantity = quantity
-		self.profits = profits  # lucros
-		self.losses = losses  # prejuízos
-		self.total = total  # total vendas
-		self.tax = tax  # taxas
-		self.irrf = irrf
+		self.profits = Fixed.of(profits)  # lucros
+		self.losses = Fixed.of(losses)  # prejuízos
+		self.total = Fixed.of(total)  # total vendas
+		self.tax = Fixed.of(tax)  # taxas
+		self.irrf = Fixed.of(irrf)
 		self.fraction = SellFrac()
 
 	def update(self, sell):
@@ -266,7 +478,7 @@ class Sell:
 		if quantity > 0:
 			avg_price = (self.total - self.tax) / quantity
 		else:
-			avg_price = MoneyLC(0)
+			avg_price = Fixed()
 		return avg_price
 
 	def __bool__(self):
@@ -275,6 +487,7 @@ class Sell:
 
 class Period:
 	"""Compras e vendas do intervalo (sem posição)"""
+	__slots__ = ('buy', 'sell')
 
 	def __init__(self, buy: Buy = None, sell: Sell = None):
 		self.buy = Buy() if buy is None else buy
@@ -283,6 +496,8 @@ class Period:
 
 class Assets:
 	"""Ativos"""
+	__slots__ = ('items', 'ticker', 'buy', 'sell', 'credit', 'debit', 'events', 'bonus',
+	             'position', 'institution', 'instance', 'conv')
 
 	def __init__(self, ticker: str,
 	             buy: Buy = None,
@@ -349,6 +564,16 @@ class Assets:
 		self.items = []
 		self.buy = Buy()
 
+	def snapshot(self):
+		"""Cópia da posição (compras acumuladas) usada como início do período seguinte"""
+		return type(self)(
+			ticker=self.ticker,
+			institution=self.institution,
+			instance=self.instance,
+			position=self.position,
+			buy=self.buy.copy()
+		)
+
 	def __deepcopy__(self, memo):
 		memo[id(self)] = cpy = type(self)(
 			ticker=self.ticker,
@@ -41,6 +41,18 @@ $(function () {
             $form.data('$submitter', null);
         }
     });
+    // registros das movimentações (proventos) carregados somente quando expandidos
+    $(".irpfreport button.earnings-items").click(function () {
+        var $el = $(this);
+        if (!$el.data("loaded")) {
+            $el.data("loaded", true);
+            $($el.data("target")).load($el.data("url"), function (response, status) {
+                if (status === "error") {
+                    $el.data("loaded", false);
+                }
+            });
+        }
+    });
     $('.irpfreport [data-toggle="popover"]').popover({
         animation: false
     }).on("shown.bs.popover", function () {
@@ -1,7 +1,7 @@
 from django import template
 from django.utils.formats import number_format
 from xadmin.util import boolean_icon as xadmin_boolean_icon
-from irpf.report.utils import smart_desc as irpf_smart_desc, as_int_desc as irpf_as_int_desc
+from irpf.report.utils import smart_desc as irpf_smart_desc, as_int_desc as irpf_as_int_desc, Fixed
 
 register = template.Library()
 
@@ -9,6 +9,8 @@ register = template.Library()
 @register.filter
 def moneyformat(value):
 	"""money format"""
+	if isinstance(value, Fixed):
+		value = value.amount
 	return number_format(value, decimal_pos=2)
 
 
@@ -1,3 +1,611 @@
-from django.test import TestCase
+import copy
+import datetime
+import io
+import json
+import pickle
+import tempfile
+import zipfile
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+from correpy.domain.entities.brokerage_note import BrokerageNote
+from correpy.domain.entities.security import Security
+from correpy.domain.entities.transaction import Transaction
+from correpy.domain.enums import TransactionType
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.core.files import File
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from irpf.benchmark.generator import PortfolioGenerator
+from irpf.management.commands.import_negotiation import Command as ImportNegotiationCommand
+from irpf.models import Asset, Negotiation, Earnings, Position, TaxRate, ImportJob, Institution, ReportDirtyMonth, \
+	BrokerageNote as IrpfBrokerageNote
+from irpf.notes import NoteSerializer, iter_note_files
+from irpf.permissions import permission_models
+from irpf.plugins import BrokerageNoteAdminPlugin
+from irpf.report.earnings import EarningsReport, EarningsReportMonth
+from irpf.report.negotiation import NegotiationReportMonth
+from irpf.report.stats import StatsReports
+from irpf.report.utils import Buy, Fixed, MoneyLC
+from irpf.utils import MonthYearDates
+
+User = get_user_model()
+
+# relatórios mensais em cache na memória (o cache 'reports' padrão é persistente)
+TEST_CACHES = {
+	'default': {'BACKEND': "django.core.cache.backends.locmem.LocMemCache"},
+	'reports': {'BACKEND': "django.core.cache.backends.locmem.LocMemCache", 'LOCATION': "reports"},
+}
+
+
+class FixedTestCase(SimpleTestCase):
+	"""Aritmética em ponto fixo dos acumuladores dos relatórios"""
+
+	def test_conversion_rounding_half_even(self):
+		self.assertEqual(Fixed(Decimal('0.00000000000000005')).raw, 0)
+		self.assertEqual(Fixed(Decimal('0.00000000000000015')).raw, 2)
+		self.assertEqual(Fixed(Decimal('-0.00000000000000025')).raw, -2)
+		self.assertEqual(Fixed(MoneyLC(Decimal('7.123'))).amount, Decimal('7.123'))
+
+	def test_add_sub_exact(self):
+		total = Fixed()
+		for _ in range(10):
+			total += MoneyLC(Decimal('0.1'))
+		self.assertEqual(total, Decimal('1'))
+		self.assertEqual(5 - Fixed(2), Fixed(3))
+		self.assertEqual(sum([Fixed(1), Fixed(2)]), 3)
+
+	def test_mul_div_rounding(self):
+		self.assertEqual(Fixed(1) / 3, Decimal('0.3333333333333333'))
+		self.assertEqual(Fixed(2) / Decimal('3'), Decimal('0.6666666666666667'))
+		self.assertEqual(Fixed(Decimal('1E-16')) / 2, 0)
+		self.assertEqual(Fixed(Decimal('3E-16')) / 2, Decimal('2E-16'))
+		self.assertEqual(Decimal('0.15') * Fixed(Decimal('100.01')), Decimal('15.0015'))
+		self.assertEqual(Fixed(1) / Fixed(4), Decimal('0.25'))
+		with self.assertRaises(ZeroDivisionError):
+			Fixed(1) / 0
+
+	def test_money_boundary(self):
+		value = Fixed(Decimal('1234.5678'))
+		self.assertIsInstance(value.money, MoneyLC)
+		self.assertEqual(value.money.amount, Decimal('1234.5678'))
+		self.assertEqual(value.amount.as_tuple().exponent, -Fixed.places)
+		self.assertEqual(str(value), str(value.money))
+
+	def test_compare(self):
+		self.assertTrue(Fixed(1) > MoneyLC(0))
+		self.assertTrue(Fixed(-1) < 0)
+		self.assertFalse(Fixed())
+		self.assertNotEqual(Fixed(1), None)
+
+	def test_hash_equivalent_values(self):
+		self.assertEqual(hash(Fixed(3)), hash(3))
+		self.assertEqual(hash(Fixed(Decimal('1.25'))), hash(Decimal('1.25')))
+		self.assertIn(Fixed(2), {2, Decimal('2.5')})
+		self.assertEqual({Decimal('2.5'): 1}[Fixed(Decimal('2.5'))], 1)
+
+	def test_invalid_values(self):
+		for value in (Decimal('Infinity'), Decimal('-Infinity'), Decimal('NaN')):
+			with self.assertRaises(ValueError):
+				Fixed(value)
+		self.assertEqual(Fixed(1).__add__(Decimal('Infinity')), NotImplemented)
+
+	def test_immutable_copy_pickle(self):
+		value = Fixed(Decimal('3.3'))
+		self.assertIs(copy.deepcopy(value), value)
+		self.assertEqual(pickle.loads(pickle.dumps(value)), value)
+
+
+class ReportObjectsTestCase(SimpleTestCase):
+	"""Objetos (slots) de resultado dos relatórios"""
+
+	def test_buy_copy_subclass(self):
+		class PositionBuy(Buy):
+			__slots__ = ()
+
+		buy = PositionBuy(quantity=Decimal(10), total=Fixed(100), tax=Fixed(1))
+		other = buy.copy()
+		self.assertIs(type(other), PositionBuy)
+		self.assertIsNot(other, buy)
+		self.assertEqual((other.quantity, other.total, other.tax), (buy.quantity, buy.total, buy.tax))
+		other.update(PositionBuy(quantity=Decimal(1), total=Fixed(10)))
+		self.assertEqual(buy.quantity, 10)
+		self.assertEqual(buy.total, 100)
+
+
+class NoteSerializerTestCase(SimpleTestCase):
+	"""Serialização (cache persistente) das notas de corretagem analisadas"""
+
+	def test_dump_load(self):
+		note = BrokerageNote(reference_id=1, reference_date=datetime.date(2023, 1, 2),
+		                     settlement_fee=Decimal("1.23"), emoluments=Decimal("0.05"))
+		note.transactions.append(Transaction(transaction_type=TransactionType.SELL,
+		                                     amount=Decimal(10),
+		                                     unit_price=Decimal("20.5"),
+		                                     security=Security("PETR4")))
+		serializer = NoteSerializer()
+		notes = serializer.load(json.loads(json.dumps(serializer.dump([note]))))
+		self.assertEqual(notes, [note])
+		self.assertEqual(notes[0].transactions[0].source_withheld_taxes,
+		                 note.transactions[0].source_withheld_taxes)
+
+	def test_iter_note_files(self):
+		buffer = io.BytesIO()
+		with zipfile.ZipFile(buffer, "w") as zf:
+			zf.writestr("notas/a.pdf", b"%PDF-a")
+			zf.writestr("notas/leiame.txt", b"texto")
+		files = [("notas.zip", buffer), ("b.pdf", io.BytesIO(b"%PDF-b"))]
+		self.assertEqual(list(iter_note_files(files)), [("a.pdf", b"%PDF-a"), ("b.pdf", b"%PDF-b")])
+
+	def test_load_not_allowed(self):
+		with self.assertRaises(ValueError):
+			NoteSerializer().load({'__class__': "os.system", 'fields': {}})
+
+
+@override_settings(CACHES=TEST_CACHES)
+class ReportQueryBudgetTestCase(TestCase):
+	"""O número de consultas dos relatórios não pode crescer com o volume de dados
+	(ativos, negociações ou meses do período). Compara carteiras sintéticas de tamanhos diferentes.
+	"""
+	portfolios = {
+		# eventos (desdobramentos, bonificações e subscrições) proporcionais ao número de ativos
+		'small': dict(tickers=4, trades=4, code_prefix="S", splits=4, bonus=4, subscriptions=4),
+		'large': dict(tickers=24, trades=20, code_prefix="L", splits=24, bonus=24, subscriptions=24),
+		# sem eventos (bonificações, subscrições, etc.) que geram consultas próprias
+		'plain': dict(tickers=6, trades=12, code_prefix="P", splits=0, bonus=0, subscriptions=0,
+		              conversions=0, refunds=0),
+	}
+	# consultas extras permitidas para cada mês adicional do período
+	month_queries = {
+		NegotiationReportMonth: 0,
+		EarningsReportMonth: 1,
+		StatsReports: 0,
+	}
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.year = datetime.date.today().year - 1
+		cls.users = {}
+		for name, options in cls.portfolios.items():
+			user = User.objects.create_superuser(f"budget-{name}", f"{name}@localhost", "budget")
+			PortfolioGenerator(user, years=(cls.year,), **options).generate()
+			cls.users[name] = user
+
+	def get_months(self, month: int = None) -> list:
+		now = datetime.date.today()
+		if month is None:
+			return MonthYearDates(1, self.year).get_year_month_range(now)
+		return [MonthYearDates(month, self.year).get_month_range(now)]
+
+	def count_queries(self, func) -> int:
+		"""Consultas da segunda execução (a primeira preenche os caches de processo)"""
+		func()
+		caches['reports'].clear()
+		with CaptureQueriesContext(connection) as context:
+			func()
+		return len(context.captured_queries)
+
+	def negotiation_report(self, user, months: list):
+		reports = NegotiationReportMonth(user, Negotiation)
+		reports.generate(months, consolidation=Position.CONSOLIDATION_YEARLY,
+		                 institution=None, categories=(), asset=None)
+		return reports
+
+	def earnings_report(self, user, months: list):
+		reports = EarningsReportMonth(user, Earnings)
+		reports.generate(months, consolidation=Position.CONSOLIDATION_YEARLY,
+		                 institution=None, categories=(), asset=None)
+		return reports
+
+	def stats_report(self, user, months: list):
+		reports = self.negotiation_report(user, months)
+
+		def generate():
+			StatsReports(user, reports).generate()
+
+		return generate
+
+	def assertSameQueries(self, func):
+		small = self.count_queries(lambda: func(self.users['small']))
+		large = self.count_queries(lambda: func(self.users['large']))
+		self.assertEqual(small, large, "consultas crescem com o número de ativos/negociações")
+
+	def assertMonthQueries(self, report_class, func):
+		user = self.users['plain']
+		months = self.get_months()
+		month = self.count_queries(lambda: func(user, self.get_months(12)))
+		year = self.count_queries(lambda: func(user, months))
+		self.assertLessEqual(year, month + self.month_queries[report_class] * (len(months) - 1),
+		                     "consultas crescem com o número de meses")
+
+	def test_negotiation_report_scale(self):
+		self.assertSameQueries(lambda user: self.negotiation_report(user, self.get_months()))
+
+	def test_negotiation_report_months(self):
+		self.assertMonthQueries(NegotiationReportMonth, self.negotiation_report)
+
+	def test_earnings_report_scale(self):
+		# ativos que não pertencem à carteira também não podem gerar consultas
+		user, months = self.users['small'], self.get_months()
+		before = self.count_queries(lambda: self.earnings_report(user, months))
+		Asset.objects.bulk_create([Asset(code=f"XBGT{index}", name=f"BUDGET {index}", category=Asset.CATEGORY_STOCK)
+		                           for index in range(3, 8)])
+		after = self.count_queries(lambda: self.earnings_report(user, months))
+		self.assertEqual(before, after, "consultas crescem com o número de ativos")
+		self.assertSameQueries(lambda _user: self.earnings_report(_user, months))
+
+	def test_earnings_report_aggregate(self):
+		"""Totais do banco de dados iguais aos calculados com os registros"""
+		user, months = self.users['small'], self.get_months()
+		reports = {}
+		for aggregate in (True, False):
+			report = EarningsReportMonth(user, Earnings)
+			report.generate(months, consolidation=Position.CONSOLIDATION_YEARLY,
+			                institution=None, categories=(), asset=None, aggregate=aggregate)
+			reports[aggregate] = {
+				asset.ticker: [(kind, event.quantity, event.value)
+				               for kind, event in [*asset.credit.items(), *asset.debit.items()]]
+				for asset in report.compile()
+			}
+		self.assertTrue(reports[True])
+		self.assertEqual(reports[True], reports[False])
+
+	def test_earnings_report_months(self):
+		self.assertMonthQueries(EarningsReportMonth, self.earnings_report)
+
+	def test_stats_report_scale(self):
+		months = self.get_months()
+		small = self.count_queries(self.stats_report(self.users['small'], months))
+		large = self.count_queries(self.stats_report(self.users['large'], months))
+		self.assertEqual(small, large, "consultas crescem com o número de ativos/negociações")
+
+	def test_stats_report_months(self):
+		user = self.users['plain']
+		months = self.get_months()
+		month = self.count_queries(self.stats_report(user, self.get_months(12)))
+		year = self.count_queries(self.stats_report(user, months))
+		self.assertLessEqual(year, month + self.month_queries[StatsReports] * (len(months) - 1),
+		                     "consultas crescem com o número de meses")
+
+	def test_report_view_scale(self):
+		"""Relatório completo pela view (formulário, plugins e template)"""
+		url = reverse("xadmin:reportirpf", kwargs={"model_app_label": "irpf.negotiation"})
+		data = {
+			'consolidation': Position.CONSOLIDATION_YEARLY,
+			'dates_0': 12,
+			'dates_1': self.year
+		}
+
+		def request(user):
+			self.client.force_login(user)
+			response = self.client.get(url, data)
+			self.assertEqual(response.status_code, 200)
+
+		self.assertSameQueries(request)
+
+	def test_report_view_save_position_scale(self):
+		"""Salvamento em massa de posições e estatísticas"""
+		url = reverse("xadmin:reportirpf", kwargs={"model_app_label": "irpf.negotiation"})
+		data = {
+			'consolidation': Position.CONSOLIDATION_YEARLY,
+			'dates_0': 12,
+			'dates_1': self.year,
+			'position': 1
+		}
+
+		def request(user):
+			self.client.force_login(user)
+			response = self.client.get(url, data)
+			self.assertEqual(response.status_code, 200)
+
+		self.assertSameQueries(request)
+		self.assertTrue(Position.objects.filter(user=self.users['large'], date__year=self.year).exists())
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MonthsCacheTestCase(TestCase):
+	"""Meses calculados reaproveitados até que um registro do mês (ou anterior) seja alterado"""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.year = datetime.date.today().year - 1
+		cls.user = User.objects.create_superuser("months", "months@localhost", "months")
+		cls.generator = PortfolioGenerator(cls.user, years=(cls.year,), tickers=3, trades=12, code_prefix="M",
+		                                   splits=0, bonus=0, subscriptions=0, conversions=0, refunds=0)
+		cls.generator.generate()
+
+	def setUp(self):
+		caches['reports'].clear()
+		self.months = MonthYearDates(1, self.year).get_year_month_range(datetime.date.today())
+		self.generate()
+
+	def generate(self) -> NegotiationReportMonth:
+		reports = NegotiationReportMonth(self.user, Negotiation)
+		reports.generate(self.months, consolidation=Position.CONSOLIDATION_YEARLY,
+		                 institution=None, categories=(), asset=None)
+		return reports
+
+	def get_cached(self) -> list:
+		reports = NegotiationReportMonth(self.user, Negotiation)
+		reports.options.update(institution=None, categories=(), asset=None)
+		return sorted(reports.get_months_cache(self.months).get_many())
+
+	def get_negotiation(self) -> Negotiation:
+		return Negotiation.objects.filter(user=self.user, date__month__gte=3).order_by('date').first()
+
+	def assertCachedBefore(self, date: datetime.date):
+		self.assertEqual(self.get_cached(), [start_date for start_date, _ in self.months
+		                                     if start_date < date.replace(day=1)])
+
+	def test_reused(self):
+		self.assertEqual(self.get_cached(), [start_date for start_date, _ in self.months])
+		with CaptureQueriesContext(connection) as context:
+			self.generate()
+		queries = [query['sql'] for query in context.captured_queries]
+		self.assertFalse([sql for sql in queries if Negotiation._meta.db_table in sql],
+		                 "meses em cache recalculados")
+
+	def test_invalidated_by_update(self):
+		negotiation = self.get_negotiation()
+		Negotiation.objects.filter(pk=negotiation.pk).update(quantity=negotiation.quantity + 1)
+		self.assertCachedBefore(negotiation.date)
+
+	def test_invalidated_by_batch_delete(self):
+		negotiation = self.get_negotiation()
+		Negotiation.objects.filter(pk=negotiation.pk).delete()
+		self.assertCachedBefore(negotiation.date)
+		self.assertTrue(ReportDirtyMonth.objects.filter(user=self.user,
+		                                                date=negotiation.date.replace(day=1)).exists())
+
+	def test_invalidated_by_back_dated_save(self):
+		negotiation = self.get_negotiation()
+		Negotiation.objects.create(user=self.user, date=negotiation.date, kind=Negotiation.KIND_BUY,
+		                           code=negotiation.code, asset=negotiation.asset, quantity=Decimal(1),
+		                           price=Decimal(1), total=Decimal(1),
+		                           institution_name=negotiation.institution_name)
+		self.assertCachedBefore(negotiation.date)
+
+	def test_invalidated_by_asset_change(self):
+		Asset.objects.filter(pk=self.generator.assets[0].pk).update(category=Asset.CATEGORY_OTHERS)
+		self.assertEqual(self.get_cached(), [])
+
+
+class ReportDirtyQuerySetTestCase(TestCase):
+	"""Meses registrados pelas alterações em lote (mesmas datas do 'save')"""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_superuser("dirty", "dirty@localhost", "dirty")
+		cls.asset = Asset.objects.create(code="DRTY3", name="DIRTY", category=Asset.CATEGORY_STOCK)
+
+	def get_dirty(self, position: bool) -> list:
+		return list(ReportDirtyMonth.objects.filter(user=self.user, position=position)
+		            .order_by('date').values_list('date', flat=True))
+
+	def test_update_min_date(self):
+		for day in (20, 5):
+			Negotiation.objects.create(user=self.user, date=datetime.date(2023, 3, day), kind=Negotiation.KIND_BUY,
+			                           code=self.asset.code, asset=self.asset, quantity=Decimal(day),
+			                           price=Decimal(1), total=Decimal(day), institution_name="CORRETORA")
+		ReportDirtyMonth.objects.all().delete()
+		Negotiation.objects.filter(user=self.user).update(institution_name="OUTRA")
+		self.assertEqual(self.get_dirty(False), [datetime.date(2023, 3, 1)])
+
+	def test_update_position_same_as_save(self):
+		position = Position.objects.create(user=self.user, asset=self.asset, date=datetime.date(2023, 1, 31),
+		                                   quantity=Decimal(1), avg_price=Decimal(1), total=Decimal(1),
+		                                   tax=Decimal(0))
+		saved = self.get_dirty(True)
+		self.assertEqual(saved, [datetime.date(2023, 2, 1)])
+		ReportDirtyMonth.objects.all().delete()
+		Position.objects.filter(pk=position.pk).update(is_valid=False)
+		self.assertEqual(self.get_dirty(True), saved)
+
+
+class EarningsReportTestCase(TestCase):
+	"""Proventos agrupados pelo código (independente do ativo relacionado)"""
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_superuser("earnings", "earnings@localhost", "earnings")
+		cls.year = datetime.date.today().year - 1
+		cls.asset = Asset.objects.create(code="ERNG3", name="EARNINGS", category=Asset.CATEGORY_STOCK)
+		cls.other = Asset.objects.create(code="ERNG4", name="EARNINGS PN", category=Asset.CATEGORY_STOCK)
+		options = dict(user=cls.user, date=datetime.date(cls.year, 6, 1), flow=Earnings.FLOW_CREDIT,
+		               kind="Dividendo", institution_name="CORRETORA", quantity=Decimal(10))
+		# sem o ativo relacionado (FK nula)
+		Earnings.objects.create(code="ERNG3", asset=None, total=Decimal(10), **options)
+		# relacionado a um ativo com outro código
+		Earnings.objects.create(code="ERNG3", asset=cls.other, total=Decimal(5), **options)
+
+	def get_report(self, **options) -> dict:
+		report = EarningsReportMonth(self.user, Earnings)
+		report.generate([MonthYearDates(6, self.year).get_month_range(datetime.date.today())],
+		                consolidation=Position.CONSOLIDATION_YEARLY, institution=None, categories=(),
+		                asset=None, **options)
+		return {asset.ticker: asset for asset in report.compile()}
+
+	def test_group_by_code(self):
+		for aggregate in (True, False):
+			assets = self.get_report(aggregate=aggregate)
+			self.assertEqual(list(assets), [self.asset.code])
+			asset = assets[self.asset.code]
+			self.assertEqual(asset.instance, self.asset)
+			event = asset.credit[Earnings.get_kind_slug("Dividendo")]
+			self.assertEqual(event.quantity, 20)
+			self.assertEqual(event.value, Decimal(15))
+
+	def test_items_same_key_as_totals(self):
+		Earnings.objects.create(user=self.user, date=datetime.date(self.year, 6, 2), flow=Earnings.FLOW_CREDIT,
+		                        kind="Dividendo", institution_name="CORRETORA", quantity=Decimal(1),
+		                        code=" erng3 ", total=Decimal(1))
+		asset = self.get_report()[self.asset.code]
+		kind_slug = Earnings.get_kind_slug("Dividendo")
+		event = asset.credit[kind_slug]
+		start_date, end_date = MonthYearDates(6, self.year).get_month_range(datetime.date.today())
+		items = EarningsReport(self.user, Earnings).get_items(asset.ticker, Earnings.FLOW_CREDIT, kind_slug,
+		                                                      start_date, end_date, institution=None)
+		self.assertEqual(len(items), 3)
+		self.assertEqual(sum(item.quantity for item in items), event.quantity)
+		self.assertEqual(event.value, Decimal(16))
+
+
+class BrokerageNoteTransactionsTestCase(TestCase):
+	"""Negociações criadas a partir das transações da nota de corretagem"""
+
+	class Plugin(BrokerageNoteAdminPlugin):
+		guardian_permissions_models = permission_models
+		is_save_transactions = True
+
+		def __init__(self, user):
+			self.user = user
+			self.setup()
+
+	@classmethod
+	def setUpTestData(cls):
+		cls.user = User.objects.create_superuser("note", "note@localhost", "note")
+		cls.institution = Institution.objects.create(name="CORRETORA NOTA", cnpj="62.169.875/0001-79")
+		cls.asset = Asset.objects.create(code="NOTA3", name="NOTA", category=Asset.CATEGORY_STOCK)
+		cls.date = datetime.date(2023, 1, 2)
+
+	def test_duplicate_fingerprint(self):
+		# mesma negociação gravada com outra grafia da corretora (não relacionada à nota)
+		existing = Negotiation.objects.create(user=self.user, date=self.date, kind=Negotiation.KIND_BUY,
+		                                      code=self.asset.code, asset=self.asset, quantity=Decimal(10),
+		                                      price=Decimal(10), total=Decimal(100),
+		                                      institution_name=" corretora nota ")
+		self.assertIsNotNone(existing.fingerprint)
+		instance = IrpfBrokerageNote.objects.create(
+			user=self.user, institution=self.institution, note="notes/nota.pdf", reference_id=1,
+			reference_date=self.date, **{name: Decimal(0) for name in IrpfBrokerageNote.note_fields
+			                             if name not in ('reference_id', 'reference_date')})
+		note = BrokerageNote(reference_id=1, reference_date=self.date,
+		                     settlement_fee=Decimal("1.23"), emoluments=Decimal("0.05"))
+		note.transactions.append(Transaction(transaction_type=TransactionType.BUY,
+		                                     amount=Decimal(10),
+		                                     unit_price=Decimal(10),
+		                                     security=Security(self.asset.code)))
+		self.Plugin(self.user)._add_transactions(note, instance)
+		negotiation = Negotiation.objects.get(brokerage_note=instance)
+		self.assertIsNone(negotiation.fingerprint)
+		self.assertEqual(Negotiation.objects.filter(user=self.user).count(), 2)
+
+
+class CnpjDigitsTestCase(TestCase):
+	"""Coluna com os números do cnpj (busca indexada)"""
+
+	def test_save_and_bulk_create(self):
+		institution = Institution.objects.create(name="CORRETORA", cnpj="62.169.875/0001-79")
+		self.assertEqual(Institution.objects.get(cnpj_digits="62169875000179"), institution)
+		institution.cnpj = "00.000.000/0001-91"
+		institution.save()
+		self.assertEqual(Institution.objects.get(pk=institution.pk).cnpj_digits, "00000000000191")
+		Asset.objects.bulk_create([Asset(code="CNPJ3", name="CNPJ", cnpj="11.222.333/0001-81")])
+		self.assertTrue(Asset.objects.filter(cnpj_digits="11222333000181").exists())
+
+
+class OwnerPermissionBackendTestCase(TestCase):
+	"""Permissões de objeto pelo dono do registro"""
+
+	@classmethod
+	def setUpTestData(cls):
+		permission = Permission.objects.get(content_type__app_label="irpf", codename="view_taxrate")
+		cls.owner = User.objects.create_user("owner", "owner@localhost", "owner")
+		cls.other = User.objects.create_user("other", "other@localhost", "other")
+		for user in (cls.owner, cls.other):
+			user.user_permissions.add(permission)
+		cls.tax_rate = TaxRate.objects.create(user=cls.owner)
+
+	def test_owner_has_model_perms_on_object(self):
+		owner = User.objects.get(pk=self.owner.pk)
+		self.assertTrue(owner.has_perm("irpf.view_taxrate", self.tax_rate))
+		# sem permissão de modelo não existe permissão de objeto
+		self.assertFalse(owner.has_perm("irpf.delete_taxrate", self.tax_rate))
+
+	def test_other_user_without_perms(self):
+		other = User.objects.get(pk=self.other.pk)
+		self.assertFalse(other.has_perm("irpf.view_taxrate", self.tax_rate))
+
+
+class ImportNegotiationTestCase(TestCase):
+	"""Importação em lotes da planilha de negociações"""
+
+	@classmethod
+	def setUpTestData(cls):
+		owner = User.objects.create_superuser("import-owner", "import-owner@localhost", "import")
+		cls.generator = PortfolioGenerator(owner, tickers=3, trades=6, code_prefix="I", splits=0, bonus=0,
+		                                   subscriptions=0, conversions=0, refunds=0)
+		cls.generator.generate()
+		cls.user = User.objects.create_superuser("import", "import@localhost", "import")
+
+	def import_negotiation(self, filepath, batch_size: int = 4) -> dict:
+		command = ImportNegotiationCommand()
+		command.batch_size = batch_size
+		with open(filepath, "rb") as fp:
+			command.handle(filepath=fp, user=self.user, verbosity=0)
+		return command.counters
+
+	def test_import_deduplication(self):
+		with tempfile.TemporaryDirectory() as tmpdir:
+			filepath = self.generator.write_negotiation_xlsx(Path(tmpdir, "negotiation.xlsx"))
+			total = len(self.generator.negotiations)
+			counters = self.import_negotiation(filepath)
+			self.assertEqual(counters['read'], total)
+			self.assertEqual(counters['inserted'] + counters['skipped'], total)
+			queryset = Negotiation.objects.filter(user=self.user)
+			self.assertEqual(queryset.count(), counters['inserted'])
+			self.assertTrue(queryset.filter(asset__isnull=False).exists())
+			# reimportação do mesmo arquivo
+			counters = self.import_negotiation(filepath)
+			self.assertEqual(counters['inserted'], 0)
+			self.assertEqual(counters['skipped'], total)
+
+	def test_row_converters(self):
+		command = ImportNegotiationCommand()
+		command.setup()
+		fields = command.get_fields_map()
+		headers = ["Data do Negócio", "Código de Negociação", "Valor"]
+		converters, defaults = command.compile_converters([(index, fields[header])
+		                                                   for index, header in enumerate(headers)])
+		# coluna 'Preço' ausente
+		self.assertEqual(defaults, {'price': Decimal(0)})
+		values = {name: convert(value) for (_, name, convert), value in
+		          zip(converters, ["02/01/2023", "ABCD3F", "1,5"])}
+		self.assertEqual(values, {'date': datetime.date(2023, 1, 2), 'code': "ABCD3",
+		                          'total': Decimal("1.5")})
+		self.assertEqual(converters[0][2].cache_info().currsize, 1)
+
+	def test_import_job_worker(self):
+		with tempfile.TemporaryDirectory() as tmpdir, override_settings(MEDIA_ROOT=tmpdir):
+			filepath = self.generator.write_negotiation_xlsx(Path(tmpdir, "negotiation.xlsx"))
+			with open(filepath, "rb") as fp:
+				job = ImportJob.objects.create(user=self.user, model=Negotiation._meta.label_lower,
+				                               filestream=File(fp, name="negotiation.xlsx"))
+			call_command("import_worker", once=True, stdout=io.StringIO())
+			job.refresh_from_db()
+			self.assertEqual(job.status, ImportJob.STATUS_DONE)
+			self.assertEqual(job.read, len(self.generator.negotiations))
+			self.assertEqual(job.inserted, Negotiation.objects.filter(user=self.user).count())
+			self.assertEqual(job.errors, 0)
+			self.assertIsNone(ImportJob.claim())
+
+	def test_fingerprint_normalization(self):
+		asset = self.generator.assets[0]
+		data = dict(user=self.user, date=datetime.date(2023, 1, 2), kind=Negotiation.KIND_BUY,
+		            code=asset.code, quantity=Decimal(10), price=Decimal("10.5"), total=Decimal(105),
+		            institution_name=self.generator.institution.name)
+		negotiation = Negotiation(**data)
+		other = Negotiation(**dict(data, kind=data['kind'].upper(), code=f" {asset.code.lower()} ",
+		                           price=Decimal("10.50000")))
+		self.assertEqual(negotiation.get_fingerprint(), other.get_fingerprint())
+		negotiation.save()
+		other.save()
+		# duplicata cadastrada manualmente
+		self.assertIsNotNone(negotiation.fingerprint)
+		self.assertIsNone(other.fingerprint)
@@ -1,8 +1,13 @@
+import io
+import zipfile
+
 import django.forms as django_forms
 from django.apps import apps
-from django.core.management import get_commands, load_command_class
+from django.core.files.base import ContentFile
+from django.core.management import get_commands
 from django.http import Http404
 
+from irpf.models import ImportJob
 from irpf.views.base import AdminFormView
 from xadmin.widgets import AdminFileWidget
 
@@ -13,12 +18,39 @@ class ImportListForm(django_forms.Form):
 	                                    widget=AdminFileWidget)
 
 
+class MultipleFileInput(AdminFileWidget):
+	allow_multiple_selected = True
+
+	def __init__(self, attrs=None):
+		super().__init__(attrs=dict(attrs or {}, multiple=True))
+
+	def value_from_datadict(self, data, files, name):
+		return files.getlist(name)
+
+
+class MultipleFileField(django_forms.FileField):
+	"""Campo que recebe vários arquivos (lista)"""
+	widget = MultipleFileInput
+
+	def clean(self, data, initial=None):
+		if not data and self.required:
+			raise django_forms.ValidationError(self.error_messages['required'], code='required')
+		single_file_clean = super().clean
+		return [single_file_clean(item, initial) for item in data]
+
+
+class ImportBrokerageNoteForm(django_forms.Form):
+	filestream = MultipleFileField(label="Arquivos",
+	                               help_text="notas de corretagem em pdf ou arquivos zip (com vários pdfs)")
+
+
 class AdminImportListModelView(AdminFormView):
 	"""View that imports data through the import command"""
 	template_name = "irpf/adminx_import_listmodel_view.html"
 	form_class = ImportListForm
 	title = "Importação de dados"
 	form_method_post = True
+	job_model = ImportJob
 
 	def init_request(self, *args, **kwargs):
 		super().init_request(*args, **kwargs)
@@ -27,9 +59,11 @@ class AdminImportListModelView(AdminFormView):
 		if not self.admin_site.get_registry(self.import_model, None):
 			raise Http404
 		self.import_model_opts = self.import_model._meta
+		if f"import_{self.import_model_opts.model_name}" not in get_commands():
+			raise Http404
 
 	def get_success_url(self):
-		return self.get_model_url(self.import_model, "changelist")
+		return self.get_model_url(self.job_model, "changelist")
 
 	def get_media(self):
 		media = super().get_media()
@@ -43,17 +77,43 @@ class AdminImportListModelView(AdminFormView):
 		context['verbose_name'] = getattr(self.import_model_opts, "verbose_name_plural", None)
 		return context
 
+	def get_import_file(self, form):
+		"""Arquivo guardado para a importação"""
+		return form.cleaned_data["filestream"]
+
 	def form_valid(self, form):
-		filestream = form.cleaned_data["filestream"]
-		command_name = f"import_{self.import_model_opts.model_name.lower()}"
-		command_app = get_commands()[command_name]
-		try:
-			command = load_command_class(command_app, command_name)
-			command.handle(filepath=filestream.file,
-			               user=self.user)
-			self.message_user(f"Dados importados com sucesso!",
-			                  level='success')
-		except Exception as exc:
-			self.message_user(f"Falha na importação de dados: {exc}",
-			                  level='error')
+		"""Coloca a importação na fila (executada pelo comando 'import_worker')"""
+		job = self.job_model.objects.create(
+			user=self.user,
+			model=self.import_model_opts.label_lower,
+			filestream=self.get_import_file(form)
+		)
+		self.message_user(f"Importação de {self.import_model_opts.verbose_name_plural} "
+		                  f"colocada na fila ({job.get_status_display()}).",
+		                  level='success')
 		return super().form_valid(form)
+
+
+class AdminImportBrokerageNoteView(AdminImportListModelView):
+	"""Importação em massa de notas de corretagem (vários pdfs ou zip)"""
+	form_class = ImportBrokerageNoteForm
+	title = "Importação de notas de corretagem"
+
+	def get_import_file(self, form):
+		files = form.cleaned_data["filestream"]
+		if len(files) == 1:
+			return files[0]
+		# vários arquivos são guardados em um único zip (uma importação)
+		buffer = io.BytesIO()
+		with zipfile.ZipFile(buffer, "w") as zf:
+			for index, upload in enumerate(files):
+				if zipfile.is_zipfile(upload):
+					upload.seek(0)
+					with zipfile.ZipFile(upload) as upload_zf:
+						for info in upload_zf.infolist():
+							if not info.is_dir():
+								zf.writestr(f"{index}/{info.filename}", upload_zf.read(info))
+				else:
+					upload.seek(0)
+					zf.writestr(f"{index}/{upload.name}", upload.read())
+		return ContentFile(buffer.getvalue(), name="notas.zip")
@@ -4,15 +4,19 @@ from datetime import datetime
 import django.forms as django_forms
 import time
 from django.apps import apps
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest
+from django.template.response import TemplateResponse
 from django.utils.datastructures import MultiValueDict
 from django.utils.formats import date_format
 from django.utils.safestring import mark_safe
 from xadmin.views import filter_hook
+from xadmin.views.base import CommAdminView
 from xadmin.widgets import AdminSelectWidget, AdminSelectMultiple
 
-from irpf.models import Institution, Asset, Position
+from irpf.models import Institution, Asset, Position, Earnings
 from irpf.report.base import BaseReportMonth
+from irpf.report.earnings import EarningsReport
+from irpf.report.profiler import ReportProfiler, null_profiler
 from irpf.utils import MonthYearDates
 from irpf.views.base import AdminFormView
 from irpf.widgets import MonthYearWidgetNavigator, MonthYearNavigatorField
@@ -63,6 +67,8 @@ class ReportIRPFFAdminView(AdminFormView):
 		self.model_app_label = self.kwargs['model_app_label']
 		self.reports: BaseReportMonth = None
 		self.ts = None
+		# perfil de tempo/consultas por fase (debug 'ts')
+		self.profiler: ReportProfiler = None
 		self.model = apps.get_model(*self.model_app_label.split('.', 1))
 		if not self.admin_site.get_registry(self.model, None):
 			raise Http404
@@ -137,24 +143,38 @@ class ReportIRPFFAdminView(AdminFormView):
 		else:
 			months = []
 
+		options = dict(consolidation=consolidation,
+		               institution=institution,
+		               categories=categories,
+		               asset=asset)
+		if self.profiler:
+			options['profiler'] = self.profiler
 		reports = self.report_object()
-		reports.generate(
-			months,
-			consolidation=consolidation,
-			institution=institution,
-			categories=categories,
-			asset=asset
-		)
+		reports.generate(months, **options)
 		return reports
 
 	@filter_hook
 	def form_valid(self, form):
 		ts = time.time()
-		self.reports = self.report_generate(form)
-		if form.cleaned_data['ts']:  # tempo da operação
-			self.ts = time.time() - ts
-		form.data = self.get_form_data(form, self.reports.start_date, self.reports.end_date)
-		return self.render_to_response(self.get_context_data(form=form))
+		if form.cleaned_data['ts']:
+			self.profiler = ReportProfiler(self.user, model=self.model_app_label)
+		profiler = self.profiler or null_profiler
+		with profiler:
+			with profiler.phase('report'):
+				self.reports = self.report_generate(form)
+			if form.cleaned_data['ts']:  # tempo da operação
+				self.ts = time.time() - ts
+			form.data = self.get_form_data(form, self.reports.start_date, self.reports.end_date)
+			with profiler.phase('context'):
+				context = self.get_context_data(form=form)
+			response = self.render_to_response(context)
+			if self.profiler and hasattr(response, 'render'):
+				# o tempo de renderização aparece somente no log
+				with profiler.phase('render'):
+					response.render()
+		if self.profiler:
+			self.profiler.log()
+		return response
 
 	@filter_hook
 	def get_form_data(self, form, start_date: date, end_date: date) -> MultiValueDict:
@@ -185,6 +205,8 @@ class ReportIRPFFAdminView(AdminFormView):
 				'end_date': self.reports.end_date,
 				'results': results,
 				'ts': self.ts,
+				# avaliado durante a renderização (inclui a montagem do contexto)
+				'profile': self.profiler,
 			}
 		return context
 
@@ -198,3 +220,31 @@ class ReportIRPFFAdminView(AdminFormView):
 		else:
 			response = super().get(request, *args, **kwargs)
 		return response
+
+
+class ReportEarningsItemsForm(django_forms.Form):
+	code = django_forms.CharField(max_length=512)
+	flow = django_forms.ChoiceField(choices=Earnings.FLOW_CHOICES)
+	kind = django_forms.SlugField(max_length=256, allow_unicode=True)
+	start_date = django_forms.DateField()
+	end_date = django_forms.DateField()
+	institution = django_forms.ModelChoiceField(Institution.objects.all(),
+	                                            required=False)
+
+
+class ReportEarningsItemsAdminView(CommAdminView):
+	"""Registros de um tipo de movimentação do ativo (carregados via ajax pelo relatório)"""
+	template_name = "irpf/adminx_report_irpf_earnings_items.html"
+	report_class = EarningsReport
+	model = Earnings
+
+	def get(self, request, *args, **kwargs):
+		form = ReportEarningsItemsForm(request.GET)
+		if not form.is_valid():
+			return HttpResponseBadRequest(form.errors.as_text())
+		data = form.cleaned_data
+		report = self.report_class(self.user, self.model)
+		items = report.get_items(data['code'], data['flow'], data['kind'],
+		                         data['start_date'], data['end_date'],
+		                         institution=data['institution'])
+		return TemplateResponse(request, self.template_name, {'items': items})